@@ -1,287 +1,320 @@
+"""Room and faculty analytics over a timetable's occupancy tensors.
+
+Every placed session becomes a (entity, day, slot) block in boolean arrays
+of shape rooms x days x slots and faculty x days x slots. Utilization, peak
+days and free-slot gaps are then reductions over those arrays instead of
+walks over worksheet cells. The sessions come from the generator's schedule
+(file or in-memory columns) or, for uploaded workbooks, from one read of
+every timetable sheet.
+"""
+import numpy as np
 import pandas as pd
-from datetime import datetime, time
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Border, Side, Alignment, Font
-
-def get_time_slot(slot_num):
-    """Convert slot number to time range string"""
-    # Start from 9:00 AM, each slot is 30 minutes
-    start_hour = 9 + (slot_num - 1) // 2
-    start_min = "30" if (slot_num - 1) % 2 else "00"
-    end_hour = 9 + slot_num // 2
-    end_min = "00" if slot_num % 2 else "30"
-    
-    return f"{start_hour:02d}:{start_min}-{end_hour:02d}:{end_min}"
-
-def parse_cell_contents(cell_value):
-    """Parse contents from timetable cell"""
-    if not cell_value or 'BREAK' in str(cell_value):
-        return None
-        
-    parts = str(cell_value).strip().split('\n')
-    if len(parts) >= 3:
-        course_parts = parts[0].split()
-        return {
-            'course_code': course_parts[0] if course_parts else '',
-            'type': course_parts[1] if len(course_parts) > 1 else '',
-            'room': parts[1].strip(),
-            'faculty': parts[2].strip()
-        }
-    return None
-
-def extract_timetable_data(sheet, dept):
-    """Extract timetable data from worksheet"""
-    if sheet['A2'].value not in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
-        return None
-        
-    slots_data = []
-    for row in range(2, 7):  # Monday to Friday
-        day = sheet.cell(row=row, column=1).value
-        day_slots = []
-        
-        # Process each timeslot
-        for col in range(2, sheet.max_column + 1):
-            cell = sheet.cell(row=row, column=col).value
-            if cell:
-                # Parse cell content (Course\nRoom\nFaculty)
-                parts = str(cell).strip().split('\n')
-                if len(parts) >= 3:
-                    day_slots.append({
-                        'course': parts[0].strip(),
-                        'room': parts[1].strip(),
-                        'faculty': parts[2].strip(),
-                        'slot': col-1
-                    })
-        slots_data.append({
-            'day': day,
-            'slots': day_slots
-        })
-    
-    return slots_data
-
-def generate_room_usage_report(timetable_files, rooms_df):
+from openpyxl.styles import PatternFill, Font
+from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.chart import LineChart, Reference, Series
+from openpyxl.utils import get_column_letter
+import schedule_store
+import timetable_reader
+import timetable_generator_0 as generator
+from room_index import normalize_room_type
+
+TEACHING_TYPES = ['LEC', 'LAB', 'TUT']  # Session types counted towards faculty load
+
+def expand_slots(schedule, rows):
+    """(position in rows, day, slot) for every slot each listed session covers, as flat arrays"""
+    duration = schedule['duration'][rows].astype(np.int64)
+    which = np.repeat(np.arange(len(rows)), duration)
+    # Offset of each expanded slot within its session: 0..duration-1
+    offset = np.arange(len(which)) - np.repeat(np.cumsum(duration) - duration, duration)
+    return which, schedule['day'][rows][which].astype(np.int64), schedule['start_slot'][rows][which] + offset
+
+def session_seats(schedule, batch_info):
+    """Students each session seats, sized the way the generator sizes its rooms"""
+    return np.array([generator.get_required_capacity(batch_info, department, semester, code)
+                     for department, semester, code in zip(schedule['department'].tolist(),
+                                                           schedule['semester'].tolist(),
+                                                           schedule['code'].tolist())], dtype=float)
+
+def build_occupancy(schedule, hour_slots=2, seats=None):
+    """Room and faculty occupancy tensors for a schedule dict.
+
+    Returns a dict with the day and slot labels, the room and faculty ids
+    along the first axis of 'room_busy' and 'faculty_busy' (bool, entity x
+    day x slot), per faculty teaching session counts by day and type, and
+    the free-slot text of every room and faculty member. With per-session
+    `seats` (see session_seats) it also holds 'room_seats', the students in
+    each room and slot, a paired lab booking splitting them over its rooms.
+    """
+    days = [str(day) for day in schedule['days'].tolist()]
+    time_slots = [str(slot) for slot in schedule['time_slots'].tolist()]
+    shape = (len(days), len(time_slots))
+
+    # Paired lab bookings name both rooms ("R1+R2"): one (session, room) entry per room
+    bookings = [(idx, room) for idx, rooms in enumerate(schedule['room'].tolist())
+                for room in rooms.split('+') if room]
+    rooms = sorted({room for _, room in bookings})
+    room_ids = {room: idx for idx, room in enumerate(rooms)}
+    booked_rows = np.array([idx for idx, _ in bookings], dtype=np.int64)
+    booked_room = np.array([room_ids[room] for _, room in bookings], dtype=np.int64)
+    room_busy = np.zeros((len(rooms),) + shape, dtype=bool)
+    which, day, slot = expand_slots(schedule, booked_rows)
+    room_busy[booked_room[which], day, slot] = True
+    room_seats = None
+    if seats is not None:
+        share = seats / np.maximum(np.bincount(booked_rows, minlength=len(seats)), 1)
+        room_seats = np.zeros(room_busy.shape)
+        # Basket courses may share a room, so seats add up
+        np.add.at(room_seats, (booked_room[which], day, slot), share[booked_rows][which])
+
+    session_types = schedule['type']
+    teaching_rows = np.flatnonzero(np.isin(session_types, TEACHING_TYPES) & (schedule['faculty'] != ''))
+    faculty, faculty_idx = np.unique(schedule['faculty'][teaching_rows], return_inverse=True)
+    faculty_busy = np.zeros((len(faculty),) + shape, dtype=bool)
+    which, day, slot = expand_slots(schedule, teaching_rows)
+    faculty_busy[faculty_idx[which], day, slot] = True
+
+    classes = np.zeros((len(faculty), len(days)), dtype=np.int64)
+    np.add.at(classes, (faculty_idx, schedule['day'][teaching_rows].astype(np.int64)), 1)
+    teaching_types = session_types[teaching_rows]
+    type_idx = np.select([teaching_types == name for name in TEACHING_TYPES], range(len(TEACHING_TYPES)))
+    type_counts = np.zeros((len(faculty), len(TEACHING_TYPES)), dtype=np.int64)
+    np.add.at(type_counts, (faculty_idx, type_idx), 1)
+
+    # Courses per faculty in schedule order, each with the department teaching it
+    courses = {}
+    for name, code, department in zip(schedule['faculty'][teaching_rows].tolist(),
+                                      schedule['code'][teaching_rows].tolist(),
+                                      schedule['department'][teaching_rows].tolist()):
+        courses.setdefault(name, {})[code] = department
+
+    # Free intervals of rooms and faculty in one run-length pass
+    free_text = free_slot_text(np.concatenate([room_busy, faculty_busy]), days, time_slots)
+
+    return {
+        'days': days,
+        'hour_slots': hour_slots,
+        'time_slots': time_slots,
+        'rooms': rooms,
+        'room_busy': room_busy,
+        'room_free_slots': free_text[:len(rooms)],
+        'room_seats': room_seats,
+        'faculty': faculty.tolist(),
+        'faculty_busy': faculty_busy,
+        'faculty_free_slots': free_text[len(rooms):],
+        'faculty_classes': classes,       # faculty x day teaching sessions
+        'faculty_types': type_counts,     # faculty x TEACHING_TYPES sessions
+        'faculty_courses': courses
+    }
+
+def free_runs(busy):
+    """Run-length encode the free slots of an entity x day x slot tensor.
+
+    Returns one (entity, day, first slot, last slot) row per free run,
+    ordered by entity, day and slot.
+    """
+    free = np.pad(~busy, ((0, 0), (0, 0), (1, 1))).astype(np.int8)
+    edges = np.diff(free, axis=2)
+    starts = np.argwhere(edges == 1)            # Runs open where a busy slot turns free...
+    ends = np.argwhere(edges == -1)[:, 2] - 1   # ...and close before the next busy slot, in the same order
+    return np.column_stack([starts, ends])
+
+def free_slot_text(busy, days, time_slots):
+    """Per entity, one "Day: 09:00-10:30, 14:00-18:30" line for every day with free time"""
+    runs = free_runs(busy)
+    lines = [[] for _ in range(busy.shape[0])]
+    if not len(runs):
+        return [''] * busy.shape[0]
+    starts = np.array([label.split('-')[0] for label in time_slots])
+    ends = np.array([label.split('-')[-1] for label in time_slots])
+    ranges = np.char.add(np.char.add(starts[runs[:, 2]], '-'), ends[runs[:, 3]]).astype(object)
+    ranges[(runs[:, 2] == 0) & (runs[:, 3] == len(time_slots) - 1)] = 'All day'
+    # Runs are grouped by (entity, day); split where that pair changes
+    key = runs[:, 0] * len(days) + runs[:, 1]
+    for group in np.split(np.arange(len(runs)), np.flatnonzero(np.diff(key)) + 1):
+        entity, day = runs[group[0], :2]
+        lines[entity].append(f"{days[day]}: {', '.join(ranges[group])}")
+    return ["\n".join(entity_lines) for entity_lines in lines]
+
+def generate_room_usage_report(occupancy, rooms_df):
     """Generate room usage analytics"""
     wb = Workbook()
     ws = wb.active
     ws.title = "Room Usage Analysis"
-    
-    headers = ['Room', 'Type', 'Capacity', 'Total Hours Used', 'Utilization %', 
+
+    headers = ['Room', 'Type', 'Capacity', 'Total Hours Used', 'Utilization %',
               'Peak Usage Day', 'Peak Hours', 'Free Time Slots']
     ws.append(headers)
 
-    # Track usage by day and time
-    room_usage = {}  # {room_id: {day: set(time_slots)}}
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-
-    for file in timetable_files:
-        try:
-            # Read Excel file
-            df = pd.read_excel(file, header=0)
-            
-            # Validate DataFrame structure
-            if df.empty or df.shape[0] < 7 or df.shape[1] < 20:
-                print(f"Skipping {file} - Invalid format")
-                continue
-            
-            # Get time slots from header row
-            time_slots = df.columns[1:].tolist()
-            
-            # Process days (rows 1-5 contain the actual schedule)
-            for row in range(0, 5):  # Process Monday to Friday
-                day = str(df.iloc[row, 0])  # Get day name from first column
-                if not day in days:
-                    continue
-                    
-                # Process each time slot
-                for col in range(1, df.shape[1]):  # Skip first column (day names)
-                    try:
-                        cell_data = parse_cell_contents(df.iloc[row, col])
-                        if cell_data and cell_data['room']:
-                            room = cell_data['room']
-                            if room not in room_usage:
-                                room_usage[room] = {d: set() for d in days}
-                            room_usage[room][day].add(col)
-                    except IndexError as ie:
-                        print(f"Index error in file {file} at row {row}, col {col}: {str(ie)}")
-                        continue
-                    except Exception as e:
-                        print(f"Error processing cell in file {file} at row {row}, col {col}: {str(e)}")
-                        continue
-                        
-        except Exception as e:
-            print(f"Error processing file {file}: {str(e)}")
-            continue
+    busy = occupancy['room_busy']
+    days = occupancy['days']
+    per_day = busy.sum(axis=2)                  # room x day used slots
+    total_used = per_day.sum(axis=1)
+    peak_day = per_day.argmax(axis=1)
+    total_slots = busy.shape[1] * busy.shape[2]
+    free_slots = occupancy['room_free_slots']
+    hour_slots = occupancy['hour_slots']
+    room_ids = {room: idx for idx, room in enumerate(occupancy['rooms'])}
 
-    # Generate statistics
-    total_slots = 19 * 5  # 19 slots per day * 5 days
-    
-    for _, room in rooms_df.iterrows():
-        room_id = room['id']
-        if room_id in room_usage:
-            # Calculate total used slots
-            total_used = sum(len(slots) for slots in room_usage[room_id].values())
-            
-            # Find peak usage day
-            peak_day = max(days, key=lambda d: len(room_usage[room_id][d]))
-            peak_slots = len(room_usage[room_id][peak_day])
-            
-            # Get free time slots
-            free_slots = []
-            for day in days:
-                used = sorted(room_usage[room_id][day])
-                if not used:
-                    free_slots.append(f"{day}: All day")
-                else:
-                    gaps = []
-                    prev = 0
-                    for slot in used:
-                        if slot - prev > 1:
-                            gaps.append(f"{get_time_slot(prev+1)}-{get_time_slot(slot-1)}")
-                        prev = slot
-                    if prev < 19:
-                        gaps.append(f"{get_time_slot(prev+1)}-18:30")
-                    if gaps:
-                        free_slots.append(f"{day}: {', '.join(gaps)}")
-            
-            utilization = (total_used / total_slots) * 100
-            
+    for room in rooms_df.itertuples(index=False):
+        idx = room_ids.get(room.id)
+        if idx is not None and total_used[idx]:
             ws.append([
-                room_id,
-                room['type'],
-                room['capacity'],
-                f"{total_used/2:.1f} hours",
-                f"{utilization:.1f}%", 
-                peak_day,
-                f"{peak_slots/2:.1f} hours",
-                "\n".join(free_slots)
+                room.id,
+                room.type,
+                room.capacity,
+                f"{total_used[idx] / hour_slots:.1f} hours",
+                f"{total_used[idx] / total_slots * 100:.1f}%",
+                days[peak_day[idx]],
+                f"{per_day[idx, peak_day[idx]] / hour_slots:.1f} hours",
+                free_slots[idx]
             ])
         else:
             # Room never used
-            ws.append([
-                room_id,
-                room['type'], 
-                room['capacity'],
-                "0 hours",
-                "0%",
-                "N/A",
-                "0 hours",
-                "All slots free"
-            ])
+            ws.append([room.id, room.type, room.capacity, "0 hours", "0%", "N/A", "0 hours", "All slots free"])
 
     return wb
 
-def generate_faculty_schedule_report(timetable_files, faculty_df):
+def generate_faculty_schedule_report(occupancy, faculty_df):
     """Generate faculty schedule analytics"""
     wb = Workbook()
     ws = wb.active
     ws.title = "Faculty Analysis"
-    
-    headers = ['Faculty', 'Total Teaching Hours', 'Classes Per Day', 
+
+    headers = ['Faculty', 'Total Teaching Hours', 'Classes Per Day',
               'Peak Teaching Day', 'Course Distribution', 'Free Time Slots']
     ws.append(headers)
 
-    faculty_schedule = {}  # {faculty: {day: {slot: course_info}}}
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-
-    for file in timetable_files:
-        try:
-            df = pd.read_excel(file, header=0)
-            sheet_name = df.iloc[0,0].split('_')  # Get department and semester from sheet name
-            dept = sheet_name[0] if len(sheet_name) > 0 else ''
-            
-            for row in range(1, 6):  # Skip header row, process 5 days
-                day = str(df.iloc[row, 0])
-                if day not in days:
-                    continue
-                    
-                for col in range(1, df.shape[1]):
-                    cell_data = parse_cell_contents(df.iloc[row, col])
-                    if cell_data:
-                        faculty = cell_data['faculty']
-                        if faculty:
-                            if faculty not in faculty_schedule:
-                                faculty_schedule[faculty] = {d: {} for d in days}
-                            
-                            faculty_schedule[faculty][day][col] = {
-                                'course': cell_data['course_code'],
-                                'type': cell_data['type'],
-                                'dept': dept
-                            }
-
-        except Exception as e:
-            print(f"Error processing {file}: {str(e)}")
-            continue
+    busy = occupancy['faculty_busy']
+    days = occupancy['days']
+    classes = occupancy['faculty_classes']
+    types = occupancy['faculty_types']
+    total_hours = busy.sum(axis=(1, 2)) / occupancy['hour_slots']
+    active_days = (classes > 0).sum(axis=1)
+    avg_classes = np.divide(classes.sum(axis=1), active_days, out=np.zeros(len(classes)), where=active_days > 0)
+    peak_day = classes.argmax(axis=1)
+    free_slots = occupancy['faculty_free_slots']
+    faculty_ids = {name: idx for idx, name in enumerate(occupancy['faculty'])}
 
-    # Generate statistics for each faculty
-    for _, faculty in faculty_df.iterrows():
-        name = faculty['Name']
-        if name in faculty_schedule:
-            schedule = faculty_schedule[name]
-            
-            # Calculate workload
-            total_hours = 0
-            course_types = {'LEC': 0, 'LAB': 0, 'TUT': 0}
-            courses_handled = {}  # {course: department}
-            
-            for day, slots in schedule.items():
-                for _, info in slots.items():
-                    if info['type'] == 'LEC':
-                        total_hours += 1.5  # 1.5 hours for lecture
-                    elif info['type'] == 'LAB':
-                        total_hours += 2  # 2 hours for lab
-                    elif info['type'] == 'TUT':
-                        total_hours += 1  # 1 hour for tutorial
-                        
-                    course_types[info['type']] += 1
-                    courses_handled[info['course']] = info['dept']
-            
-            # Calculate peak day
-            peak_day = max(days, key=lambda d: len(schedule[d]))
-            peak_slots = len(schedule[peak_day])
-            
-            # Calculate average classes per day
-            active_days = sum(1 for d in days if schedule[d])
-            avg_classes = len([s for d in days for s in schedule[d]])/active_days if active_days else 0
-            
-            # Format course distribution
-            course_dist = [
-                f"{len(courses_handled)} courses ({', '.join(f'{c}({d})' for c,d in courses_handled.items())})",
-                f"LEC: {course_types['LEC']}, LAB: {course_types['LAB']}, TUT: {course_types['TUT']}"
-            ]
-            
-            # Get free time slots
-            free_slots = []
-            for day in days:
-                used_slots = sorted(schedule[day].keys())
-                if not used_slots:
-                    free_slots.append(f"{day}: All day")
-                else:
-                    gaps = []
-                    prev = 0
-                    for slot in used_slots:
-                        if slot - prev > 1:
-                            gaps.append(f"{get_time_slot(prev+1)}-{get_time_slot(slot-1)}")
-                        prev = slot
-                    if prev < 19:
-                        gaps.append(f"{get_time_slot(prev+1)}-18:30")
-                    if gaps:
-                        free_slots.append(f"{day}: {', '.join(gaps)}")
-            
-            ws.append([
-                name,
-                f"{total_hours:.1f} hours",
-                f"{avg_classes:.1f}",
-                f"{peak_day} ({peak_slots} classes)",
-                "\n".join(course_dist),
-                "\n".join(free_slots)
-            ])
-        else:
+    for name in faculty_df['Name'].tolist():
+        idx = faculty_ids.get(name)
+        if idx is None:
             ws.append([name, "0 hours", "0", "N/A", "No courses", "All slots free"])
+            continue
+        courses = occupancy['faculty_courses'][name]
+        course_dist = [
+            f"{len(courses)} courses ({', '.join(f'{c}({d})' for c, d in courses.items())})",
+            ', '.join(f"{t}: {n}" for t, n in zip(TEACHING_TYPES, types[idx].tolist()))
+        ]
+        ws.append([
+            name,
+            f"{total_hours[idx]:.1f} hours",
+            f"{avg_classes[idx]:.1f}",
+            f"{days[peak_day[idx]]} ({classes[idx, peak_day[idx]]} classes)",
+            "\n".join(course_dist),
+            free_slots[idx]
+        ])
 
     return wb
 
-def generate_analytics_report(timetable_files):
-    """Generate combined analytics report"""
+def add_room_demand_sheets(wb, occupancy, rooms_df):
+    """Room heatmap, capacity waste and peak concurrent demand sheets.
+
+    All three come from one pass over the room tensors lined up with
+    rooms.csv: seat use per room and slot, its sums per room and its sums
+    per room type.
+    """
+    days, time_slots = occupancy['days'], occupancy['time_slots']
+    num_days, num_slots = len(days), len(time_slots)
+    room_ids = {room: idx for idx, room in enumerate(occupancy['rooms'])}
+    position = np.array([room_ids.get(room_id, -1) for room_id in rooms_df['id'].tolist()], dtype=np.int64)
+    known = position >= 0
+    capacity = rooms_df['capacity'].to_numpy(dtype=float)
+    busy = np.zeros((len(rooms_df), num_days, num_slots), dtype=bool)
+    busy[known] = occupancy['room_busy'][position[known]]
+    seats = np.zeros(busy.shape)
+    if occupancy['room_seats'] is not None:
+        seats[known] = occupancy['room_seats'][position[known]]
+
+    # Heatmap: share of each room's seats in use, per (day, slot)
+    flat_busy = busy.reshape(len(rooms_df), -1)
+    fill = np.divide(seats, capacity[:, None, None], out=np.zeros(seats.shape),
+                     where=capacity[:, None, None] > 0).reshape(len(rooms_df), -1)
+    heat = np.where(flat_busy, np.rint(fill * 100), np.nan)
+    ws = wb.create_sheet("Room Heatmap")
+    ws.append(['Room', 'Type', 'Capacity'] +
+              [f"{day[:3]} {label.split('-')[0]}" for day in days for label in time_slots])
+    for room_id, room_type, room_capacity, row in zip(rooms_df['id'].tolist(), rooms_df['type'].tolist(),
+                                                      rooms_df['capacity'].tolist(), heat.tolist()):
+        ws.append([room_id, room_type, room_capacity] + [None if np.isnan(v) else int(v) for v in row])
+    if len(rooms_df):
+        # Seat use % of occupied slots, white (empty room) to red (full or over capacity)
+        ws.conditional_formatting.add(
+            f"D2:{get_column_letter(3 + num_days * num_slots)}{len(rooms_df) + 1}",
+            ColorScaleRule(start_type='num', start_value=0, start_color='FFFFFF',
+                           mid_type='num', mid_value=50, mid_color='FFEB84',
+                           end_type='num', end_value=100, end_color='F8696B'))
+    ws.freeze_panes = 'D2'
+
+    # Capacity waste: empty seats while a room is booked
+    booked_slots = flat_busy.sum(axis=1)
+    seat_slots = seats.reshape(len(rooms_df), -1).sum(axis=1)
+    avg_students = np.divide(seat_slots, booked_slots, out=np.zeros(len(rooms_df)), where=booked_slots > 0)
+    seat_use = np.divide(seat_slots, capacity * booked_slots, out=np.zeros(len(rooms_df)),
+                         where=capacity * booked_slots > 0)
+    overflow = np.maximum(seats.reshape(len(rooms_df), -1).max(axis=1, initial=0) - capacity, 0)
+    ws = wb.create_sheet("Capacity Waste")
+    ws.append(['Room', 'Type', 'Capacity', 'Booked Hours', 'Avg Students', 'Avg Empty Seats',
+               'Seat Utilization %', 'Empty Seat Hours', 'Max Overflow'])
+    for idx, room in enumerate(rooms_df.itertuples(index=False)):
+        if not booked_slots[idx]:
+            ws.append([room.id, room.type, room.capacity, 0, 0, room.capacity, "0%", 0, 0])
+            continue
+        ws.append([
+            room.id,
+            room.type,
+            room.capacity,
+            float(booked_slots[idx] / occupancy['hour_slots']),
+            round(float(avg_students[idx]), 1),
+            round(float(capacity[idx] - avg_students[idx]), 1),
+            f"{seat_use[idx] * 100:.1f}%",
+            round(float(capacity[idx] * booked_slots[idx] - seat_slots[idx]) / occupancy['hour_slots'], 1),
+            int(overflow[idx])
+        ])
+
+    # Peak concurrent demand: rooms of each type in use at once, per (day, slot)
+    room_types = [normalize_room_type(room_type) for room_type in rooms_df['type'].tolist()]
+    types = sorted(set(room_types))
+    type_idx = np.array([types.index(room_type) for room_type in room_types], dtype=np.int64)
+    demand = np.zeros((len(types), num_days * num_slots), dtype=np.int64)
+    np.add.at(demand, type_idx, flat_busy)
+    rooms_per_type = np.bincount(type_idx, minlength=len(types))
+    peak = demand.argmax(axis=1) if len(types) else np.array([], dtype=np.int64)
+    ws = wb.create_sheet("Peak Demand")
+    ws.append(['Room Type', 'Rooms', 'Peak Concurrent', 'Peak At'] +
+              [f"{day[:3]} {label.split('-')[0]}" for day in days for label in time_slots])
+    for idx, room_type in enumerate(types):
+        day, slot = divmod(int(peak[idx]), num_slots)
+        ws.append([room_type, int(rooms_per_type[idx]), int(demand[idx, peak[idx]]),
+                   f"{days[day]} {time_slots[slot]}"] + demand[idx].tolist())
+    if types:
+        chart = LineChart()
+        chart.title = "Rooms in use by type"
+        chart.y_axis.title = "Rooms"
+        chart.height, chart.width = 8, 30
+        for row, room_type in enumerate(types, 2):
+            values = Reference(ws, min_col=5, max_col=4 + num_days * num_slots, min_row=row)
+            chart.series.append(Series(values, title=room_type))
+        chart.set_categories(Reference(ws, min_col=5, max_col=4 + num_days * num_slots, min_row=1))
+        ws.add_chart(chart, f"A{len(types) + 4}")
+
+def generate_analytics_report(timetable_files=(), schedule_file=None, schedule=None):
+    """Generate combined analytics report.
+
+    Uses the generator's schedule columns when given, else its schedule
+    file, and only parses the Excel workbooks when neither is available.
+    The sessions are read once and shared by both reports.
+    """
     try:
         rooms_df = pd.read_csv('rooms.csv')
         faculty_df = pd.read_csv('tt data/FACULTY.csv')
@@ -289,34 +322,36 @@ def generate_analytics_report(timetable_files):
         print(f"Error loading data files: {e}")
         return None
 
+    if schedule is None:
+        schedule = schedule_store.load_schedule(schedule_file) if schedule_file else \
+            timetable_reader.schedule_columns(timetable_reader.read_timetables(timetable_files))
+    occupancy = build_occupancy(schedule, timetable_reader.load_duration_constants()['hour_slots'],
+                                session_seats(schedule, generator.load_batch_data()))
+
     # Generate reports
-    wb = generate_room_usage_report(timetable_files, rooms_df)
-    faculty_wb = generate_faculty_schedule_report(timetable_files, faculty_df)
-    
+    wb = generate_room_usage_report(occupancy, rooms_df)
+    faculty_wb = generate_faculty_schedule_report(occupancy, faculty_df)
+
     # Copy faculty sheet to main workbook
     faculty_sheet = faculty_wb.active
     ws = wb.create_sheet("Faculty Analysis")
-    
+
     # Copy headers and data
-    for row in faculty_sheet.iter_rows():
-        ws.append([cell.value for cell in row])
-    
+    for row in faculty_sheet.iter_rows(values_only=True):
+        ws.append(row)
+
+    add_room_demand_sheets(wb, occupancy, rooms_df)
+
     # Format workbook
     for sheet in wb.worksheets:
         # Format headers
         for cell in sheet[1]:
             cell.font = Font(bold=True)
             cell.fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-            
+
         # Adjust column widths
         for col in sheet.columns:
-            max_length = 0
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
+            max_length = max(len(str(cell.value)) for cell in col)
             sheet.column_dimensions[col[0].column_letter].width = max_length + 2
 
     return wb
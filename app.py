@@ -1,15 +1,16 @@
 from flask import Flask, render_template, request, send_file, flash, redirect, url_for, session, jsonify
 import os
 from werkzeug.utils import secure_filename
-import timetable_generator_0 as generator
 import pandas as pd
-import csv
-from zipfile import ZipFile
 import time
 import shutil
 import glob
+import tempfile
 import faculty_timetable as ft
-from openpyxl import load_workbook
+import schedule_store
+import job_queue
+import input_cache
+import run_metrics
 import json
 from datetime import datetime
 from werkzeug.serving import WSGIRequestHandler
@@ -23,11 +24,24 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOADED_TIMETABLE'] = None  # Add new session key for tracking uploaded timetable
 app.config['TIMEOUT'] = 300  # 5 minutes timeout
+app.config['ZIP_SPOOL_SIZE'] = 8 * 1024 * 1024  # Faculty zips larger than this are spooled to disk
+app.config['JOB_WORKERS'] = 2  # Generation jobs that may run at the same time
+# Seeded runs per /generate, best one is kept; concurrent jobs share the cores
+app.config['GENERATION_RUNS'] = max(1, (os.cpu_count() or 1) // app.config['JOB_WORKERS'])
 
 # Ensure upload folder exists
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'])
 
+_job_queue = None
+
+def get_job_queue():
+    """Background generation queue, started on first use so worker imports stay cheap"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = job_queue.JobQueue(app.config['JOB_WORKERS'])
+    return _job_queue
+
 @app.route('/')
 def index():
     courses_uploaded = os.path.exists('tt data/combined.csv')
@@ -37,12 +51,11 @@ def index():
     
     if courses_uploaded:
         try:
-            df = pd.read_csv('tt data/combined.csv', encoding='utf-8-sig')
-            courses = df.to_dict('records')
-            departments = sorted(df['Department'].unique())
-            
-            # Custom sorting for semesters 
-            semesters = sorted(df['Semester'].unique())
+            # Parsed once per file version, not on every page load or poll
+            listing = input_cache.course_listing()
+            courses = listing['courses']
+            departments = listing['departments']
+            semesters = listing['semesters']
         except Exception as e:
             print(f"Error loading data: {str(e)}")
             courses_uploaded = False
@@ -64,10 +77,8 @@ def index():
 @app.route('/view-courses')
 def view_courses():
     try:
-        df = pd.read_csv('tt data/combined.csv', encoding='utf-8-sig')
-        courses = df.to_dict('records')
-        departments = sorted(df['Department'].unique())
-        return render_template('courses.html', courses=courses, departments=departments)
+        listing = input_cache.course_listing()
+        return render_template('courses.html', courses=listing['courses'], departments=listing['departments'])
     except:
         flash('No courses data available. Please upload a file first.')
         return redirect(url_for('index'))
@@ -101,6 +112,7 @@ def upload_file():
         # Clean semester data to remove section information
         df['Semester'] = df['Semester'].astype(str).str.extract('(\d+)').astype(int)
         df.to_csv('tt data/combined.csv', index=False)
+        input_cache.refresh('courses')
             
         return {'success': True}
     except Exception as e:
@@ -118,9 +130,7 @@ def upload_rooms():
     try:
         file.save('rooms.csv')
         # Validate room data
-        with open('rooms.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            rooms = list(reader)
+        input_cache.refresh('rooms')
         return {'success': True}
     except Exception as e:
         return {'success': False, 'error': str(e)}
@@ -140,7 +150,7 @@ def upload_batches():
         file.save('tt data/updated_batches.csv')
         
         # Validate batch data
-        df = pd.read_csv('tt data/updated_batches.csv')
+        df = input_cache.refresh('batches')
         required_columns = ['Department', 'Semester', 'Total_Students', 'MaxBatchSize']
         if not all(col in df.columns for col in required_columns):
             return {'success': False, 'error': 'Invalid batch file format'}
@@ -164,7 +174,7 @@ def upload_reserved():
         file.save('tt data/reserved_slots.csv')
         
         # Validate reserved slots data
-        df = pd.read_csv('tt data/reserved_slots.csv')
+        df = input_cache.refresh('reserved')
         required_columns = ['Day', 'Start Time', 'End Time', 'Semester']
         if not all(col in df.columns for col in required_columns):
             return {'success': False, 'error': 'Invalid reserved slots file format'}
@@ -188,7 +198,7 @@ def upload_faculty():
         file.save('tt data/FACULTY.csv')
         
         # Validate faculty data structure
-        df = pd.read_csv('tt data/FACULTY.csv')
+        df = input_cache.refresh('faculty')
         required_columns = ['Faculty ID', 'Name', 'Preferred Days', 'Preferred Times']
         if not all(col in df.columns for col in required_columns):
             return {'success': False, 'error': 'Invalid faculty file format'}
@@ -212,7 +222,7 @@ def upload_elective_registrations():
         file.save('tt data/elective_registrations.csv')
         
         # Validate elective registration data
-        df = pd.read_csv('tt data/elective_registrations.csv')
+        df = input_cache.refresh('electives')
         required_columns = ['Course Code', 'Total Students']
         if not all(col in df.columns for col in required_columns):
             return {'success': False, 'error': 'Invalid elective registrations file format'}
@@ -238,41 +248,62 @@ def generate():
             missing_files.append(file_name)
     
     if missing_files:
-        flash(f'Missing required files: {", ".join(missing_files)}')
-        return redirect(url_for('index'))
+        return jsonify({'success': False, 'error': f'Missing required files: {", ".join(missing_files)}'})
     
     try:
-        # Generate timetables and get list of generated files
-        timetable_files = generator.generate_all_timetables()
-        
-        if not timetable_files:
-            flash('No timetables were generated')
-            return redirect(url_for('index'))
+        # Generation runs in the background; the page polls /jobs/<job_id>
+        job_id = get_job_queue().submit(runs=app.config['GENERATION_RUNS'],
+                                        workers=app.config['GENERATION_RUNS'])
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id),
+            'download_url': url_for('job_download', job_id=job_id)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Error generating timetables: {str(e)}'})
 
-        # Create a unique zip filename using timestamp
-        timestamp = int(time.time())
-        zip_filename = f'timetables_{timestamp}.zip'
-        
-        # Create zip file containing all timetables
-        with ZipFile(zip_filename, 'w') as zipf:
-            for file in timetable_files:
-                if os.path.exists(file):
-                    zipf.write(file)
-                    try:
-                        os.remove(file)
-                    except:
-                        pass
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    job.pop('result_path')
+    return jsonify({'success': True, **job})
 
-        return send_file(
-            zip_filename,
-            as_attachment=True,
-            download_name='department_timetables.zip',
-            mimetype='application/zip'
-        )
-        
-    except Exception as e:
-        flash(f'Error generating timetables: {str(e)}')
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None or job['status'] != 'done' or not os.path.exists(job['result_path']):
+        flash('Timetables are not ready yet')
         return redirect(url_for('index'))
+    return send_file(
+        job['result_path'],
+        as_attachment=True,
+        download_name=job_queue.ZIP_NAME,
+        mimetype='application/zip'
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Phase timings and placement counters of the latest generation run"""
+    if not os.path.exists(run_metrics.METRICS_FILE):
+        return jsonify({'success': False, 'error': 'No generation run has finished yet'}), 404
+    try:
+        return jsonify({'success': True, **run_metrics.load_metrics()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Could not read metrics: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>/metrics')
+def job_metrics(job_id):
+    """Metrics of one finished generation job"""
+    job = get_job_queue().get(job_id)
+    if job is None or job['status'] != 'done':
+        return jsonify({'success': False, 'error': 'Job has not finished'}), 404
+    metrics_path = os.path.join(os.path.dirname(job['result_path']), run_metrics.METRICS_FILE)
+    if not os.path.exists(metrics_path):
+        return jsonify({'success': False, 'error': 'No metrics recorded for this job'}), 404
+    return jsonify({'success': True, **run_metrics.load_metrics(metrics_path)})
 
 @app.route('/faculty-view')
 def faculty_view():
@@ -280,35 +311,11 @@ def faculty_view():
     faculty_list = set()
     timetables_uploaded = False
 
-    # Check if directory exists and has Excel files
-    if os.path.exists(upload_dir) and glob.glob(os.path.join(upload_dir, '*.xlsx')):
+    # Faculty names come from the index built when the timetables were uploaded
+    if os.path.exists(upload_dir) and ft.index_sources(upload_dir):
         timetables_uploaded = True
         try:
-            for file in glob.glob(os.path.join(upload_dir, '*.xlsx')):
-                try:
-                    wb = load_workbook(file, read_only=True)
-                    for sheet in wb.worksheets:
-                        # Skip sheets that don't look like timetables
-                        if not sheet['A2'].value in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
-                            continue
-                        
-                        # Scan cells for faculty names
-                        for row in range(2, 7):  # 5 days
-                            for col in range(2, sheet.max_column + 1):
-                                cell = sheet.cell(row=row, column=col).value
-                                if cell:
-                                    # Faculty name is typically the last line
-                                    lines = str(cell).strip().split('\n')
-                                    if len(lines) >= 3:
-                                        faculty = lines[2].strip()
-                                        # Clean faculty name to remove any course code prefixes
-                                        faculty = faculty.split('/')[-1].strip()  # Take last name if multiple
-                                        if '(' in faculty:  # Remove anything in parentheses
-                                            faculty = faculty.split('(')[0].strip()
-                                        if faculty and faculty != '-':
-                                            faculty_list.add(faculty)
-                finally:
-                    wb.close()  # Ensure workbook is closed
+            faculty_list = set(ft.load_faculty_index(upload_dir)['faculty'])
         except Exception as e:
             print(f"Error reading timetables: {str(e)}")
 
@@ -341,7 +348,7 @@ def upload_dept_timetables():
         
         # Save new files
         for file in files:
-            if file.filename.endswith('.xlsx'):
+            if file.filename.endswith(('.xlsx', '.npz')):
                 filepath = os.path.join(upload_dir, secure_filename(file.filename))
                 file.save(filepath)
                 # Verify file is not locked
@@ -350,6 +357,9 @@ def upload_dept_timetables():
                         pass
                 except PermissionError:
                     return jsonify({'success': False, 'error': f'File {file.filename} is being used by another process'})
+
+        # Read the uploads once; faculty pages are served from this index
+        ft.save_faculty_index(upload_dir, ft.build_faculty_index(upload_dir))
                     
         return jsonify({'success': True})
     except Exception as e:
@@ -364,7 +374,7 @@ def generate_faculty_timetable(faculty_name):
             flash('No timetables uploaded yet')
             return redirect(url_for('faculty_view'))
 
-        timetable_files = glob.glob(os.path.join(upload_dir, '*.xlsx'))
+        timetable_files = ft.index_sources(upload_dir)
         if not timetable_files:
             flash('No timetable files found')
             return redirect(url_for('faculty_view'))
@@ -374,15 +384,14 @@ def generate_faculty_timetable(faculty_name):
             flash('No faculty selected')
             return redirect(url_for('faculty_view'))
             
-        wb = ft.generate_faculty_timetable(faculty_name, timetable_files)
+        wb = ft.generate_faculty_timetable(faculty_name, timetable_files,
+                                           faculty_index=ft.load_faculty_index(upload_dir))
         if not wb:
             flash('Failed to generate timetable')
             return redirect(url_for('faculty_view'))
             
         # Save to temp file with sanitized name
-        safe_name = "".join(c for c in faculty_name if c.isalnum() or c in (' ', '.', '_')).rstrip()
-        safe_name = safe_name.replace(' ', '_')
-        filename = f'faculty_timetable_{safe_name}.xlsx'
+        filename = ft.faculty_file_name(faculty_name)
         wb.save(filename)
         
         return send_file(
@@ -395,18 +404,54 @@ def generate_faculty_timetable(faculty_name):
         flash(f'Error generating timetable: {str(e)}')
         return redirect(url_for('faculty_view'))
 
+@app.route('/download-all-faculty-timetables')
+def download_all_faculty_timetables():
+    try:
+        upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'timetables')
+        if not os.path.exists(upload_dir) or not ft.index_sources(upload_dir):
+            flash('No timetables uploaded yet')
+            return redirect(url_for('faculty_view'))
+
+        # Small archives stay in memory, large ones roll over to a temporary file;
+        # send_file closes (and so deletes) it once the response has been sent
+        output = tempfile.SpooledTemporaryFile(max_size=app.config['ZIP_SPOOL_SIZE'])
+        try:
+            written = ft.write_all_faculty_timetables(ft.load_faculty_index(upload_dir), output)
+        except Exception:
+            output.close()
+            raise
+        if not written:
+            output.close()
+            flash('No faculty timetables could be generated')
+            return redirect(url_for('faculty_view'))
+        size = output.tell()
+        output.seek(0)
+
+        response = send_file(
+            output,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name='faculty_timetables.zip'
+        )
+        response.content_length = size
+        return response
+    except Exception as e:
+        flash(f'Error generating faculty timetables: {str(e)}')
+        return redirect(url_for('faculty_view'))
+
 @app.route('/download_analytics')
 def download_analytics():
     try:
         # Get list of department timetable files
         timetable_files = glob.glob('timetable_*.xlsx')
-        if not timetable_files:
+        schedule_file = schedule_store.SCHEDULE_FILE if os.path.exists(schedule_store.SCHEDULE_FILE) else None
+        if not timetable_files and not schedule_file:
             flash('No timetable files found. Please generate timetables first.')
             return redirect(url_for('faculty_view'))
             
         # Generate analytics report
         from analytics import generate_analytics_report
-        analytics_wb = generate_analytics_report(timetable_files)
+        analytics_wb = generate_analytics_report(timetable_files, schedule_file)
         
         if not analytics_wb:
             flash('Error generating analytics report')
@@ -432,7 +477,12 @@ def download_analytics():
 @app.route('/save-config', methods=['POST'])
 def save_config():
     try:
-        config = request.get_json()
+        # The page only posts the sections it edits; keep the rest (e.g. timings)
+        config = {}
+        if os.path.exists('config.json'):
+            with open('config.json') as f:
+                config = json.load(f)
+        config.update(request.get_json())
         with open('config.json', 'w') as f:
             json.dump(config, f, indent=4)
         return jsonify({'success': True})
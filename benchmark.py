@@ -0,0 +1,246 @@
+"""Benchmark the timetable generator on synthetic workloads.
+
+Each case writes a generated course catalog, rooms, batches, elective
+registrations, faculty preferences and reserved slots into a scratch
+directory, schedules it with each requested engine and records wall time,
+peak traced memory, unscheduled components and per-phase timings. Results
+are appended to a JSON file together with the git commit, so runs from
+different commits can be compared.
+
+    python benchmark.py --scale 3x20 --scale 10x200 --engine greedy --engine csp
+"""
+import io
+import os
+import csv
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+import timetable_generator_0 as generator
+from course_dataset import CourseDataset
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = 'benchmark_results.json'
+DEFAULT_SCALES = ['3x20', '10x200', '30x2000']  # departments x courses
+
+SEMESTERS = [2, 4, 6, 8]
+MAX_BATCH_SIZE = 70
+LAB_TYPES = ['COMPUTER_LAB', 'HARDWARE_LAB']
+
+def parse_scale(scale):
+    """'DEPTSxCOURSES' -> (departments, courses)"""
+    try:
+        departments, courses = (int(part) for part in scale.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Scale must look like 3x20, got '{scale}'")
+    if departments < 1 or courses < departments:
+        raise argparse.ArgumentTypeError(f"Need at least one department and one course per department: '{scale}'")
+    return departments, courses
+
+def write_csv(path, header, rows):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def generate_workload(directory, departments, courses, seed=0):
+    """Write a synthetic set of generator inputs into directory; returns a summary dict"""
+    rng = random.Random(seed)
+    data_dir = os.path.join(directory, 'tt data')
+    dept_names = [f"D{idx + 1:02d}" for idx in range(departments)]
+    faculty_pool = [f"Dr. Faculty {idx + 1:04d}" for idx in range(max(4, courses // 2))]
+
+    # Spread the courses over every department/semester, one basket elective per semester
+    course_rows = []
+    electives = []
+    for idx in range(courses):
+        department = dept_names[idx % departments]
+        semester = SEMESTERS[(idx // departments) % len(SEMESTERS)]
+        faculty = rng.choice(faculty_pool)
+        if rng.random() < 0.2:
+            faculty = f"{faculty}/{rng.choice(faculty_pool)}"
+        if idx // departments < len(SEMESTERS) and semester > 2:
+            code = f"B{semester // 2}-{department}{semester}{idx:04d}"
+            electives.append((code, rng.randint(30, 150)))
+            l, t, p, s = 3, 0, 0, 0
+        else:
+            code = f"{rng.choice(['CS', 'EC', 'DS'])}{semester}{idx:04d}"
+            l = rng.choice([3, 3, 2, 1])
+            t = rng.choice([0, 0, 1])
+            p = rng.choice([0, 0, 2])
+            s = rng.choice([0, 0, 0, 4])
+        course_rows.append([department, semester, code, f"Course {idx}", l, t, p, s, l + t + p // 2,
+                            faculty, 'Yes'])
+    write_csv(os.path.join(data_dir, 'combined.csv'),
+              ['Department', 'Semester', 'Course Code', 'Course Name', 'L', 'T', 'P', 'S', 'C', 'Faculty',
+               'Schedule'], course_rows)
+
+    batch_rows = [[department, semester, rng.randint(40, 160), MAX_BATCH_SIZE]
+                  for department in dept_names for semester in SEMESTERS]
+    write_csv(os.path.join(data_dir, 'updated_batches.csv'),
+              ['Department', 'Semester', 'Total_Students', 'MaxBatchSize'], batch_rows)
+    write_csv(os.path.join(data_dir, 'elective_registrations.csv'),
+              ['Course Code', 'Total Students'], electives)
+
+    # Roughly one lecture room per section, labs and seater halls in proportion
+    sections = sum(math.ceil(row[2] / MAX_BATCH_SIZE) for row in batch_rows)
+    room_specs = ([('LECTURE_ROOM', rng.choice([60, 70, 70, 90])) for _ in range(max(4, sections // 2))] +
+                  [(LAB_TYPES[idx % 2], 35) for idx in range(max(4, departments * 2))] +
+                  [('SEATER_120', 120) for _ in range(max(1, departments // 3))] +
+                  [('SEATER_240', 240) for _ in range(max(1, departments // 10))])
+    room_rows = []
+    for idx, (room_type, capacity) in enumerate(room_specs):
+        number = (idx // 10 + 1) * 100 + idx % 10 + 1  # Ten rooms per floor
+        room_rows.append([f"R{idx + 1:04d}", str(number), capacity, room_type])
+    write_csv(os.path.join(directory, 'rooms.csv'), ['id', 'roomNumber', 'capacity', 'type'], room_rows)
+
+    faculty_rows = []
+    for idx, name in enumerate(faculty_pool):
+        days = ';'.join(sorted(rng.sample(generator.DAYS, 3), key=generator.DAYS.index)) if idx % 5 == 0 else ''
+        times = '09:00-13:00;14:00-17:00' if idx % 7 == 0 else ''
+        faculty_rows.append([f"F{idx + 1:04d}", name, days, times])
+    write_csv(os.path.join(data_dir, 'FACULTY.csv'),
+              ['Faculty ID', 'Name', 'Preferred Days', 'Preferred Times'], faculty_rows)
+
+    reserved_rows = [['Wednesday', '11:00', '12:30', 'Faculty Meeting', 'ALL', 4]]
+    reserved_rows += [[rng.choice(generator.DAYS), '14:00', '15:30', 'Department Meeting', department, 6]
+                      for department in dept_names[:max(1, departments // 3)]]
+    write_csv(os.path.join(data_dir, 'reserved_slots.csv'),
+              ['Day', 'Start Time', 'End Time', 'Description', 'Department', 'Semester'], reserved_rows)
+
+    return {'departments': departments, 'courses': courses, 'sections': sections, 'rooms': len(room_rows),
+            'faculty': len(faculty_pool)}
+
+def run_case(directory, engine, seed, trace_memory=True, verbose=False):
+    """Load, schedule and write one workload in directory; returns the measurements"""
+    output_dir = os.path.join(directory, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(directory)
+    if trace_memory:
+        tracemalloc.start()
+    phases = {}
+    # The generator reports every saved file; keep that out of the benchmark output
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with quiet:
+            started = time.perf_counter()
+            dataset = CourseDataset(os.path.join('tt data', 'combined.csv'))
+            dataset.frame
+            phases['load'] = time.perf_counter() - started
+
+            phase_start = time.perf_counter()
+            result = generator.schedule_timetables(seed=seed, engine=engine, dataset=dataset)
+            phases['schedule'] = time.perf_counter() - phase_start
+
+            phase_start = time.perf_counter()
+            generator.write_timetables(result, output_dir)
+            phases['write'] = time.perf_counter() - phase_start
+            wall_time = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        os.chdir(previous_dir)
+
+    sessions = sum(len(section['sessions']) for section in result['sections'])
+    return {
+        'engine': engine,
+        'seed': seed,
+        'wall_time': round(wall_time, 4),
+        'phases': {name: round(seconds, 4) for name, seconds in phases.items()},
+        'peak_memory_mb': round(peak / 2**20, 2) if peak is not None else None,
+        'sessions': sessions,
+        'unscheduled': len(result['unscheduled_components']),
+        'score': result['score'],
+        # The generator's own phase timings and placement/rejection counters
+        'generator_metrics': result['metrics'].as_dict()
+    }
+
+def git_commit():
+    """(commit hash, has uncommitted changes) of the checkout, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def save_results(record, path):
+    """Append one benchmark run to the JSON results file (a list of runs)"""
+    runs = []
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                runs = json.load(f)
+        except (OSError, ValueError):
+            print(f"Warning: could not read {path}, starting a new results file")
+    runs.append(record)
+    with open(path, 'w') as f:
+        json.dump(runs, f, indent=2)
+
+def run_benchmark(scales, engines, seed=1, repeat=1, trace_memory=True, keep=False, verbose=False):
+    """Run every scale x engine case and return the results record"""
+    commit, dirty = git_commit()
+    record = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': []
+    }
+    for departments, courses in scales:
+        directory = tempfile.mkdtemp(prefix=f"tt_bench_{departments}x{courses}_")
+        try:
+            workload = generate_workload(directory, departments, courses, seed)
+            for engine in engines:
+                for attempt in range(repeat):
+                    case = run_case(directory, engine, seed, trace_memory, verbose)
+                    case.update(workload=workload, repeat=attempt)
+                    record['cases'].append(case)
+                    print(f"{departments}x{courses} {engine}: {case['wall_time']:.2f}s "
+                          f"(load {case['phases']['load']:.2f}s, schedule {case['phases']['schedule']:.2f}s, "
+                          f"write {case['phases']['write']:.2f}s), "
+                          f"{case['unscheduled']} of {case['sessions']} sessions unscheduled"
+                          + (f", peak {case['peak_memory_mb']} MB" if trace_memory else ''))
+        finally:
+            if keep:
+                print(f"Workload kept in {directory}")
+            else:
+                shutil.rmtree(directory, ignore_errors=True)
+    return record
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark timetable generation on synthetic workloads")
+    parser.add_argument('--scale', type=parse_scale, action='append',
+                        help=f"Workload size as DEPARTMENTSxCOURSES, repeatable (default: {' '.join(DEFAULT_SCALES)})")
+    parser.add_argument('--engine', choices=generator.ENGINES, action='append',
+                        help="Engine to benchmark, repeatable (default: greedy)")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the workload and the scheduler")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip tracemalloc, which slows generation down, for cleaner timings")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated workload directories")
+    parser.add_argument('--verbose', action='store_true', help="Show the generator's own output")
+    parser.add_argument('--output', default=RESULTS_FILE, help="JSON file the results are appended to")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    record = run_benchmark(args.scale or [parse_scale(scale) for scale in DEFAULT_SCALES],
+                           args.engine or ['greedy'], args.seed, args.repeat, not args.no_memory, args.keep,
+                           args.verbose)
+    save_results(record, output)
+    print(f"Results appended to {output}")
@@ -0,0 +1,71 @@
+"""Course catalog (tt data/combined.csv) loading for the timetable generator.
+
+The catalog is parsed on first use rather than at import time, and the
+parsed frame is cached until the file's modification time or size changes.
+"""
+import os
+import pandas as pd
+
+COURSE_DATA_FILE = os.path.join('tt data', 'combined.csv')
+ENCODINGS = ['utf-8-sig', 'utf-8', 'cp1252']  # Tried in order; the first handles a BOM
+
+def load_course_frame(path=COURSE_DATA_FILE):
+    """Read the course CSV, trying several encodings; raises ValueError when unusable"""
+    last_error = None
+    for encoding in ENCODINGS:
+        try:
+            df = pd.read_csv(path, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+        except Exception as e:
+            last_error = e
+            continue
+        # Convert empty strings and 'nan' strings to actual NaN
+        df = df.replace(r'^\s*$', pd.NA, regex=True)
+        df = df.replace('nan', pd.NA)
+        if df.empty:
+            raise ValueError(f"No data found in {path}")
+        return df
+    raise ValueError(f"Unable to read {path}. Please check the file format.\nDetails: {last_error}")
+
+class CourseDataset:
+    """Lazily loaded course catalog that reloads when its file changes"""
+
+    def __init__(self, path=COURSE_DATA_FILE):
+        self.path = path
+        self._frame = None
+        self._signature = None
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Dataset over an in-memory catalog that is never reloaded"""
+        dataset = cls(path=None)
+        dataset._frame = frame
+        return dataset
+
+    def signature(self):
+        """(mtime, size) of the backing file, or None when there is no file"""
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def is_stale(self):
+        return self.path is not None and (self._frame is None or self.signature() != self._signature)
+
+    @property
+    def frame(self):
+        """The parsed catalog, re-read if the file changed since the last load"""
+        if self.is_stale():
+            signature = self.signature()
+            self._frame = load_course_frame(self.path)
+            self._signature = signature
+        return self._frame
+
+_datasets = {}  # Cached datasets by path
+
+def get_course_dataset(path=COURSE_DATA_FILE):
+    """Shared CourseDataset for a path; it is only parsed when its frame is used"""
+    if path not in _datasets:
+        _datasets[path] = CourseDataset(path)
+    return _datasets[path]
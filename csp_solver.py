@@ -0,0 +1,177 @@
+"""Backtracking constraint solver used as an alternative timetable engine.
+
+The solver knows nothing about timetables: the caller supplies variables
+(sessions), a domain function returning candidate values (day, start slot)
+in preference order, and assign/unassign callbacks that commit or undo a
+value against the shared schedule state. Search uses MRV variable ordering,
+forward checking on neighbouring variables and branch-and-bound on the
+number of variables left unassigned, bounded by a node budget. A known
+solution's missing count can be passed as the incumbent, so the search only
+looks for strictly better assignments.
+"""
+import time
+
+SKIP = object()  # Marker value: leave the variable unassigned
+
+class Frame:
+    """One decision on the search stack"""
+
+    def __init__(self, var, values):
+        self.var = var
+        self.values = values
+        self.index = 0
+        self.tried = 0          # Values successfully assigned so far
+        self.value = None       # Value currently applied (or SKIP)
+        self.saved_domains = {}  # Neighbour domains before forward checking
+
+class CSPSolver:
+    """Depth-first branch-and-bound search minimizing unassigned variables.
+
+    `domain(var)` returns candidate values best first, `assign(var, value)`
+    returns True when the value could be committed, `unassign(var)` undoes
+    the last commit, `neighbors(var)` lists variables whose domains can shrink
+    after `var` is assigned and `consistent(var, value)` re-checks a value.
+    `related(value, other)` says whether assigning `value` can rule out
+    `other`, letting forward checking skip unaffected values. With
+    `incumbent` (the missing count of a solution found elsewhere), an empty
+    result means nothing better than it exists within the budget.
+    """
+
+    def __init__(self, variables, domain, assign, unassign, neighbors, consistent,
+                 related=None, max_nodes=20000, max_values=None, time_limit=None, incumbent=None):
+        self.variables = list(variables)
+        self.domain = domain
+        self.assign = assign
+        self.unassign = unassign
+        self.neighbors = neighbors
+        self.consistent = consistent
+        self.related = related or (lambda value, other: True)
+        self.max_nodes = max_nodes
+        self.max_values = max_values
+        self.time_limit = time_limit
+
+        self.nodes = 0
+        self.exhausted = False  # True when the whole search space was covered
+        self.truncated = False  # True once max_values left a candidate value untried
+        self.completed = False  # True when the search ran out of values rather than budget
+        self.replay_failures = []  # Best-path variables that could not be re-assigned at the end
+        self.best_missing = len(self.variables) + 1 if incumbent is None else incumbent
+        self.best_path = []
+
+    def _lower_bound(self, missing):
+        """Unassigned so far plus variables forward checking already emptied"""
+        return missing + sum(1 for var in self.unassigned if not self.domains[var])
+
+    def _choose_variable(self):
+        """MRV: fewest remaining values, then original order"""
+        return min(self.unassigned, key=lambda var: (len(self.domains[var]), self.order[var]))
+
+    def _apply_next(self, frame):
+        """Apply the frame's next value; returns False when it has none left"""
+        var = frame.var
+        while frame.index < len(frame.values):
+            value = frame.values[frame.index]
+            frame.index += 1
+            if value is SKIP:
+                frame.value = SKIP
+                self.unassigned.discard(var)
+                return True
+            if self.max_values is not None and frame.tried >= self.max_values:
+                self.truncated = True
+                continue
+            if not self.assign(var, value):
+                continue
+            frame.tried += 1
+            frame.value = value
+            self.unassigned.discard(var)
+            # Forward checking: prune neighbour values this assignment ruled out
+            frame.saved_domains = {}
+            for other in self.neighbors(var):
+                if other in self.unassigned:
+                    domain = self.domains[other]
+                    pruned = [v for v in domain
+                              if not self.related(value, v) or self.consistent(other, v)]
+                    if len(pruned) != len(domain):
+                        frame.saved_domains[other] = domain
+                        self.domains[other] = pruned
+            return True
+        return False
+
+    def _retract(self, frame):
+        """Undo the frame's current value"""
+        if frame.value is not SKIP:
+            self.unassign(frame.var)
+            self.domains.update(frame.saved_domains)
+            frame.saved_domains = {}
+        self.unassigned.add(frame.var)
+        frame.value = None
+
+    def solve(self):
+        """Run the search and leave the best assignment found applied.
+
+        Returns a dict mapping each assigned variable to its value. When the
+        best path has to be replayed, a value whose assign fails this time
+        is left out (see replay_failures) and counted as missing.
+        """
+        started = time.time()
+        self.order = {var: idx for idx, var in enumerate(self.variables)}
+        self.domains = {var: list(self.domain(var)) for var in self.variables}
+        self.unassigned = set(self.variables)
+        stack = []
+        missing = 0
+
+        while True:
+            # The budget only applies once a complete assignment exists
+            found = self.best_missing <= len(self.variables)
+            if found and (self.nodes >= self.max_nodes or (
+                    self.time_limit is not None and time.time() - started > self.time_limit)):
+                break
+            self.nodes += 1
+
+            if self.unassigned and self._lower_bound(missing) < self.best_missing:
+                # Descend: branch on the most constrained variable
+                var = self._choose_variable()
+                frame = Frame(var, self.domains[var] + [SKIP])
+                self._apply_next(frame)
+                stack.append(frame)
+                missing += frame.value is SKIP
+                continue
+
+            if not self.unassigned and missing < self.best_missing:
+                self.best_missing = missing
+                self.best_path = [(frame.var, frame.value) for frame in stack if frame.value is not SKIP]
+                if missing == 0:
+                    self.exhausted = True
+                    break
+
+            # Backtrack to the deepest frame with an untried value
+            while stack:
+                frame = stack[-1]
+                missing -= frame.value is SKIP
+                self._retract(frame)
+                if self._apply_next(frame):
+                    missing += frame.value is SKIP
+                    break
+                stack.pop()
+            else:
+                # An empty stack only proves the minimum if no value was cut off
+                self.completed = True
+                self.exhausted = not self.truncated
+                break
+
+        # Leave the best assignment applied to the caller's state
+        current = [(frame.var, frame.value) for frame in stack if frame.value is not SKIP]
+        if current != self.best_path:
+            while stack:
+                self._retract(stack.pop())
+            replayed = []
+            for var, value in self.best_path:
+                if self.assign(var, value):
+                    replayed.append((var, value))
+                else:
+                    self.replay_failures.append(var)
+            self.best_path = replayed
+            self.best_missing += len(self.replay_failures)
+            if self.replay_failures:
+                self.exhausted = False  # The proof was about a state that no longer holds
+        return dict(self.best_path)
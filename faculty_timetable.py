@@ -1,9 +1,13 @@
-import pandas as pd
-from openpyxl import Workbook, load_workbook
+from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Border, Side, Alignment, Font
 from openpyxl.utils import get_column_letter
 import glob
 import os
+import json
+from io import BytesIO
+from zipfile import ZipFile, ZIP_DEFLATED
+import schedule_store
+import timetable_reader
 
 # Add color palette for courses
 COLORS = [
@@ -12,98 +16,169 @@ COLORS = [
     "AFEEEE", "F08080", "90EE90", "ADD8E6", "FFB6C1"
 ]
 
-def generate_faculty_timetable(faculty_name, timetable_files):
-    """Generate a consolidated timetable for a specific faculty"""
+FACULTY_INDEX_FILE = 'faculty_index.json'  # Saved inside the uploaded timetables folder
+
+def clean_faculty_name(faculty):
+    """Faculty name as listed in the faculty view"""
+    faculty = faculty.split('/')[-1].strip()  # Take last name if multiple
+    if '(' in faculty:  # Remove anything in parentheses
+        faculty = faculty.split('(')[0].strip()
+    return faculty
+
+def faculty_keys(faculty):
+    """Index keys for a cell's faculty line: the listed name and each co-teacher"""
+    faculty = clean_faculty_name(faculty)
+    keys = [faculty] + [name.strip() for name in faculty.split('&')]
+    return [key for key in dict.fromkeys(keys) if key and key != '-']
+
+def file_signature(path, with_hash=False):
+    """mtime and size of a file, plus its md5 when requested"""
+    stat = os.stat(path)
+    signature = {'mtime': stat.st_mtime, 'size': stat.st_size}
+    if with_hash:
+        signature['md5'] = timetable_reader.file_hash(path)
+    return signature
+
+def index_sources(upload_dir):
+    """Timetable files an index over upload_dir is built from"""
+    schedule_file = schedule_store.find_schedule(upload_dir)
+    if schedule_file:
+        return [schedule_file]
+    return sorted(glob.glob(os.path.join(upload_dir, '*.xlsx')))
+
+def build_faculty_index(upload_dir):
+    """Read every uploaded timetable once and group its sessions by faculty.
+    
+    Each faculty maps to a list of (file, sheet, day, start_slot, duration,
+    code, content) entries in the form generate_faculty_timetable renders.
+    """
+    sources = index_sources(upload_dir)
+    index = {
+        'sources': {os.path.basename(path): file_signature(path, with_hash=True) for path in sources},
+        'days': [],
+        'time_slots': [],
+        'faculty': {}
+    }
+    if sources and sources[0].endswith('.npz'):
+        timetables = schedule_records(sources[0])
+    else:
+        timetables = timetable_reader.read_timetables(sources)
+    index['days'], index['time_slots'] = timetables['days'], timetables['time_slots']
+    for record in timetables['sessions']:
+        for key in faculty_keys(record.faculty):
+            index['faculty'].setdefault(key, []).append(record_entry(record))
+    return index
+
+def schedule_records(schedule_file):
+    """A saved schedule file in the read_timetables() layout, so both sources share record_entry"""
+    schedule = schedule_store.load_schedule(schedule_file)
+    days = schedule['days'].tolist()
+    sessions = []
+    for row in schedule_store.iter_sessions(schedule):
+        sheet = f"{row['department']}_{row['semester']}" + (f"_{row['section']}" if row['section'] else '')
+        sessions.append(timetable_reader.SessionRecord(
+            schedule_file, sheet, row['department'], row['semester'], row['section'], days[row['day']],
+            row['start_slot'], row['duration'], row['type'], row['code'], row['faculty'], row['room'], None))
+    return {'days': days, 'time_slots': schedule['time_slots'].tolist(), 'sessions': sessions}
+
+def save_faculty_index(upload_dir, index):
+    with open(os.path.join(upload_dir, FACULTY_INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+
+def is_index_current(upload_dir, index):
+    """True when the indexed files are still exactly the uploaded ones"""
+    sources = index_sources(upload_dir)
+    if sorted(index.get('sources', {})) != sorted(os.path.basename(path) for path in sources):
+        return False
+    for path in sources:
+        saved = index['sources'][os.path.basename(path)]
+        current = file_signature(path)
+        if current['mtime'] == saved['mtime'] and current['size'] == saved['size']:
+            continue
+        # Touched but possibly unchanged: fall back to the content hash
+        if file_signature(path, with_hash=True)['md5'] != saved['md5']:
+            return False
+    return True
+
+def load_faculty_index(upload_dir):
+    """Saved faculty index for upload_dir, rebuilt when the uploads changed"""
+    index_path = os.path.join(upload_dir, FACULTY_INDEX_FILE)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+        if is_index_current(upload_dir, index):
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    index = build_faculty_index(upload_dir)
+    try:
+        save_faculty_index(upload_dir, index)
+    except OSError as e:
+        print(f"Could not save faculty index: {e}")
+    return index
+
+def record_entry(record):
+    """Faculty index entry for a timetable_reader session record"""
+    sem_sec = f"{record.department} {record.semester}"
+    if record.section:
+        sem_sec += f"-{record.section}"
+    # Basket cells list each course without its type
+    code_type = record.code if record.basket_group else f"{record.code} {record.type}"
+    return {
+        'file': os.path.basename(record.file),
+        'sheet': record.sheet,
+        'day': record.day,
+        'start_slot': record.start_slot,
+        'duration': record.duration,
+        'code': record.code,
+        'content': f"{code_type}\n{record.room}\n{sem_sec}"
+    }
+
+def parse_faculty_workbooks(faculty_name, timetable_files):
+    """Days, slot labels and the faculty's sessions from the department workbooks"""
+    timetables = timetable_reader.read_timetables(timetable_files)
+    sessions = [record_entry(record) for record in timetables['sessions']
+                if faculty_name in faculty_keys(record.faculty)]
+    return timetables['days'], timetables['time_slots'], sessions
+
+def generate_faculty_timetable(faculty_name, timetable_files, faculty_index=None):
+    """Generate a consolidated timetable for a specific faculty.
+    
+    A faculty index (see load_faculty_index) is used directly; otherwise the
+    department workbooks are read with timetable_reader.
+    """
     wb = Workbook()
     ws = wb.active
     ws.title = faculty_name.replace('/', '_').replace('\\', '_')[:31]
-    
-    # Track time slots and days
-    time_slots = None
-    days = []
-    course_colors = {}  # Map courses to colors
-    color_idx = 0
-    
-    # Process first file to get structure
-    if timetable_files:
-        first_wb = load_workbook(timetable_files[0], read_only=True)
-        first_sheet = first_wb.worksheets[0]
-        
-        header = [cell.value for cell in first_sheet[1][1:]]
-        time_slots = header
-        
-        for row in range(2, 7):
-            day = first_sheet.cell(row=row, column=1).value
-            if day:
-                days.append(day)
-    
+
+    if faculty_index:
+        days, time_slots = faculty_index['days'], faculty_index['time_slots']
+        sessions = faculty_index['faculty'].get(faculty_name, [])
+    else:
+        days, time_slots, sessions = parse_faculty_workbooks(faculty_name, timetable_files)
     if not time_slots or not days:
         return None
-        
-    header_row = ['Day'] + time_slots
-    ws.append(header_row)
-    
-    # Initialize schedule with None to track merging
+    ws.append(['Day'] + time_slots)
     schedule = {day: [{'content': '', 'code': None, 'duration': 0} for _ in time_slots] for day in days}
-    
-    # Process all timetable files
-    for file in timetable_files:
-        dept_wb = load_workbook(file, read_only=True)
-        
-        for sheet in dept_wb.worksheets:
-            for row in range(2, len(days) + 2):
-                day = sheet.cell(row=row, column=1).value
-                if not day in days:
-                    continue
-                
-                for col in range(2, len(time_slots) + 2):
-                    cell = sheet.cell(row=row, column=col)
-                    if cell.value and faculty_name in str(cell.value):
-                        details = str(cell.value).split('\n')
-                        if len(details) >= 2:
-                            code_type = details[0]
-                            room = details[1]
-                            course_code = code_type.split()[0]
-                            
-                            # Extract semester and section from sheet name
-                            sheet_info = sheet.title.split('_')
-                            dept = sheet_info[0]
-                            sem = sheet_info[1]
-                            section = sheet_info[2] if len(sheet_info) > 2 else ''
-                            sem_sec = f"{dept} {sem}"
-                            if section:
-                                sem_sec += f"-{section}"
-                            
-                            # Determine duration from activity type
-                            duration = 1
-                            if 'LEC' in code_type:
-                                duration = 3  # 1.5 hours
-                            elif 'LAB' in code_type:
-                                duration = 4  # 2 hours
-                            elif 'TUT' in code_type:
-                                duration = 2  # 1 hour
-                            
-                            # Assign color if new course
-                            if course_code not in course_colors:
-                                course_colors[course_code] = COLORS[color_idx % len(COLORS)]
-                                color_idx += 1
-                            
-                            # Store in schedule with duration and semester info
-                            col_idx = col - 2
-                            if col_idx + duration <= len(time_slots):
-                                schedule[day][col_idx] = {
-                                    'content': f"{code_type}\n{room}\n{sem_sec}",  # Add semester info
-                                    'code': course_code,
-                                    'duration': duration
-                                }
-                                # Mark subsequent slots as taken
-                                for i in range(1, duration):
-                                    schedule[day][col_idx + i] = {
-                                        'content': '',
-                                        'code': course_code,
-                                        'duration': 0
-                                    }
-    
+    course_colors = {}  # Map courses to colors
+    color_idx = 0
+    for session in sessions:
+        if session['code'] not in course_colors:
+            course_colors[session['code']] = COLORS[color_idx % len(COLORS)]
+            color_idx += 1
+        schedule[session['day']][session['start_slot']] = {
+            'content': session['content'],
+            'code': session['code'],
+            'duration': session['duration']
+        }
+        # Mark subsequent slots as taken
+        for i in range(1, session['duration']):
+            schedule[session['day']][session['start_slot'] + i] = {
+                'content': '',
+                'code': session['code'],
+                'duration': 0
+            }
+
     # Write schedule to worksheet with merging
     for day_idx, day in enumerate(days, 2):
         ws.cell(row=day_idx, column=1, value=day)
@@ -162,3 +237,51 @@ def generate_faculty_timetable(faculty_name, timetable_files):
         ws.row_dimensions[row[0].row].height = 60  # Increased height for 3 lines
         
     return wb
+
+def faculty_file_name(faculty_name):
+    """Download file name for a faculty timetable"""
+    safe_name = "".join(c for c in faculty_name if c.isalnum() or c in (' ', '.', '_')).rstrip()
+    safe_name = safe_name.replace(' ', '_')
+    return f'faculty_timetable_{safe_name}.xlsx'
+
+def write_all_faculty_timetables(faculty_index, output):
+    """Write every indexed faculty's timetable into a zip archive.
+    
+    `output` is a path or a binary file object. Workbooks are saved to memory
+    and added to the archive one at a time. Returns the number written.
+    """
+    written = 0
+    names = set()
+    with ZipFile(output, 'w', ZIP_DEFLATED) as zipf:
+        for faculty_name in sorted(faculty_index['faculty']):
+            try:
+                wb = generate_faculty_timetable(faculty_name, [], faculty_index=faculty_index)
+                if not wb:
+                    continue
+                buffer = BytesIO()
+                wb.save(buffer)
+                # Names that differ only in punctuation sanitize to the same file
+                filename = faculty_file_name(faculty_name)
+                suffix = 2
+                while filename in names:
+                    filename = faculty_file_name(f"{faculty_name} {suffix}")
+                    suffix += 1
+                names.add(filename)
+                zipf.writestr(filename, buffer.getvalue())
+                written += 1
+            except Exception as e:
+                print(f"Skipping timetable for {faculty_name}: {e}")
+    return written
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export every faculty timetable into one zip archive")
+    parser.add_argument('timetable_dir', nargs='?', default=os.path.join('uploads', 'timetables'),
+                        help="Folder holding the department timetables (default: uploads/timetables)")
+    parser.add_argument('--output', default='faculty_timetables.zip', help="Zip file to write")
+    args = parser.parse_args()
+
+    index = load_faculty_index(args.timetable_dir)
+    count = write_all_faculty_timetables(index, args.output)
+    print(f"Saved {count} faculty timetables to {args.output}")
@@ -0,0 +1,78 @@
+"""In-process cache of the parsed input CSVs shared by the web app and the generator.
+
+Each input is parsed once and kept until its file's modification time or
+size changes; upload routes call refresh() right after writing a new file.
+"""
+import os
+import threading
+import pandas as pd
+
+INPUT_FILES = {
+    'courses': 'tt data/combined.csv',
+    'rooms': 'rooms.csv',
+    'batches': 'tt data/updated_batches.csv',
+    'reserved': 'tt data/reserved_slots.csv',
+    'faculty': 'tt data/FACULTY.csv',
+    'electives': 'tt data/elective_registrations.csv'
+}
+# rooms.csv and FACULTY.csv were read with csv.DictReader: keep every field a string, blanks as ''
+READ_OPTIONS = {
+    'courses': {'encoding': 'utf-8-sig'},
+    'rooms': {'dtype': str, 'keep_default_na': False},
+    'faculty': {'dtype': str, 'keep_default_na': False}
+}
+
+_lock = threading.Lock()
+_entries = {}  # name -> {'signature', 'frame', 'derived'}
+
+def file_signature(path):
+    """(absolute path, mtime, size) identifying one version of a file"""
+    stat = os.stat(path)
+    # Absolute so a chdir (e.g. the benchmark's workload directories) never reuses another tree's file
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def _entry(name):
+    """Current cache entry for an input, parsing the file if it changed"""
+    path = INPUT_FILES[name]
+    signature = file_signature(path)  # Raises FileNotFoundError for missing inputs
+    with _lock:
+        entry = _entries.get(name)
+        if entry is None or entry['signature'] != signature:
+            entry = {
+                'signature': signature,
+                'frame': pd.read_csv(path, **READ_OPTIONS.get(name, {})),
+                'derived': {}
+            }
+            _entries[name] = entry
+        return entry
+
+def get_input(name):
+    """Parsed DataFrame for an input; shared between requests, so do not modify it"""
+    return _entry(name)['frame']
+
+def get_derived(name, key, build):
+    """Value computed by build(frame) for an input, cached with the parsed file"""
+    entry = _entry(name)
+    if key not in entry['derived']:
+        entry['derived'][key] = build(entry['frame'])
+    return entry['derived'][key]
+
+def refresh(name):
+    """Drop an input after an upload wrote a new file and return the re-parsed frame"""
+    with _lock:
+        _entries.pop(name, None)
+    return get_input(name)
+
+def course_listing():
+    """Course records plus department and semester filters for the dashboard"""
+    def build(df):
+        # Plain Python values (None for blanks) so the listing can be served as JSON
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        return {
+            'courses': [{key: value.item() if hasattr(value, 'item') else value
+                         for key, value in record.items()} for record in records],
+            'departments': sorted(str(dept) for dept in df['Department'].dropna().unique()),
+            # Custom sorting for semesters
+            'semesters': sorted(int(sem) for sem in df['Semester'].dropna().unique())
+        }
+    return get_derived('courses', 'listing', build)
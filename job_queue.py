@@ -0,0 +1,190 @@
+"""Background timetable generation jobs tracked in a SQLite table.
+
+Each job runs in a fresh worker process so it picks up the latest saved
+config, writes its files to jobs/<job_id>/ and reports per-section progress
+into the job database, which the web app polls.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import socket
+import sqlite3
+import functools
+import multiprocessing
+from zipfile import ZipFile
+from concurrent.futures import ProcessPoolExecutor
+
+JOBS_DIR = 'jobs'
+JOBS_DB = os.path.join(JOBS_DIR, 'jobs.db')
+ZIP_NAME = 'department_timetables.zip'
+
+# Section statuses in the order they are reached; progress never moves backwards
+PROGRESS_STAGES = {'pending': 0, 'scheduled': 1, 'written': 2}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    options TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    result_path TEXT,
+    error TEXT,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS job_progress (
+    job_id TEXT NOT NULL,
+    item TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage INTEGER NOT NULL,
+    updated_at REAL,
+    PRIMARY KEY (job_id, item)
+);
+"""
+
+def connect(db_path=JOBS_DB):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_db(db_path=JOBS_DB):
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    with connect(db_path) as conn:
+        conn.executescript(SCHEMA)
+        # Databases created before jobs recorded their owner
+        if 'owner' not in [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+def process_owner():
+    """Owner tag for jobs submitted by this server process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def is_owner_alive(owner):
+    """False when the process that submitted a job is known to be gone"""
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return bool(owner)  # Another machine's jobs are its own business; untagged jobs are orphans
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def reap_orphaned_jobs(db_path=JOBS_DB):
+    """Fail queued/running jobs whose server process died; they will never finish"""
+    with connect(db_path) as conn:
+        jobs = conn.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        orphans = [(job['id'],) for job in jobs if not is_owner_alive(job['owner'])]
+        conn.executemany("UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart' "
+                         "WHERE id = ?", orphans)
+    return len(orphans)
+
+def update_job(db_path, job_id, **fields):
+    columns = ', '.join(f"{name} = ?" for name in fields)
+    with connect(db_path) as conn:
+        conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", list(fields.values()) + [job_id])
+
+def record_progress(db_path, job_id, item, status):
+    """Progress callback handed to the generator (picklable via functools.partial)"""
+    stage = PROGRESS_STAGES.get(status, 0)
+    with connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO job_progress (job_id, item, status, stage, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (job_id, item) DO UPDATE SET status = excluded.status, stage = excluded.stage, "
+            "updated_at = excluded.updated_at WHERE excluded.stage > job_progress.stage",
+            (job_id, item, status, stage, time.time()))
+
+def run_generation_job(db_path, job_id, options):
+    """Worker process entry point: generate, zip and record the outcome of one job"""
+    job_dir = os.path.join(os.path.dirname(db_path) or '.', job_id)
+    update_job(db_path, job_id, status='running', started_at=time.time())
+    try:
+        # Imported here so every job reads the current config
+        import timetable_generator_0 as generator
+        import schedule_store
+        import run_metrics
+
+        os.makedirs(job_dir, exist_ok=True)
+        progress = functools.partial(record_progress, db_path, job_id)
+        timetable_files = generator.generate_all_timetables(output_dir=job_dir, progress=progress, **options)
+        if not timetable_files:
+            raise RuntimeError('No timetables were generated')
+
+        zip_path = os.path.join(job_dir, ZIP_NAME)
+        schedule_path = os.path.join(job_dir, schedule_store.SCHEDULE_FILE)
+        with ZipFile(zip_path, 'w') as zipf:
+            for file in timetable_files:
+                zipf.write(file, os.path.basename(file))
+            if os.path.exists(schedule_path):
+                zipf.write(schedule_path, schedule_store.SCHEDULE_FILE)
+        # Latest finished schedule feeds the analytics download, its metrics the /metrics endpoint
+        if os.path.exists(schedule_path):
+            shutil.copy(schedule_path, schedule_store.SCHEDULE_FILE)
+        metrics_path = os.path.join(job_dir, run_metrics.METRICS_FILE)
+        if os.path.exists(metrics_path):
+            shutil.copy(metrics_path, run_metrics.METRICS_FILE)
+
+        update_job(db_path, job_id, status='done', finished_at=time.time(), result_path=zip_path)
+    except Exception as e:
+        update_job(db_path, job_id, status='failed', finished_at=time.time(), error=str(e))
+
+class JobQueue:
+    """Runs generation jobs on a process pool and answers status queries"""
+
+    def __init__(self, workers=1, db_path=JOBS_DB):
+        self.db_path = db_path
+        self.owner = process_owner()
+        init_db(db_path)
+        # Only jobs of dead server processes: other live workers share this database
+        reap_orphaned_jobs(db_path)
+        # Fresh process per job: the generator reads config.json at import time
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            max_tasks_per_child=1)
+
+    def submit(self, **options):
+        """Queue a generation run; options are passed to generate_all_timetables"""
+        job_id = uuid.uuid4().hex
+        with connect(self.db_path) as conn:
+            conn.execute("INSERT INTO jobs (id, status, options, created_at, owner) VALUES (?, 'queued', ?, ?, ?)",
+                         (job_id, json.dumps(options), time.time(), self.owner))
+        self.executor.submit(run_generation_job, self.db_path, job_id, options)
+        return job_id
+
+    def get(self, job_id):
+        """Job row plus per-department/semester progress, or None for unknown ids"""
+        with connect(self.db_path) as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = conn.execute("SELECT item, status FROM job_progress WHERE job_id = ? ORDER BY item",
+                                (job_id,)).fetchall()
+
+        # Section titles look like DEPT_SEM or DEPT_SEM_SECTION
+        groups = {}
+        for row in rows:
+            group = ' '.join(row['item'].split('_')[:2])
+            counts = groups.setdefault(group, {'sections': 0, 'scheduled': 0, 'written': 0})
+            counts['sections'] += 1
+            stage = PROGRESS_STAGES.get(row['status'], 0)
+            counts['scheduled'] += stage >= PROGRESS_STAGES['scheduled']
+            counts['written'] += stage >= PROGRESS_STAGES['written']
+
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+            'error': job['error'],
+            'result_path': job['result_path'],
+            'progress': groups,
+            'sections': len(rows),
+            'scheduled': sum(counts['scheduled'] for counts in groups.values()),
+            'written': sum(counts['written'] for counts in groups.values())
+        }
@@ -0,0 +1,58 @@
+"""Bitmask occupancy tracking for the timetable generator.
+
+Every tracked entity (section, faculty member, room) holds one integer per
+day in which bit ``i`` is set when half-hour slot ``i`` is taken. Checking
+whether a window is free is then a single AND against a window mask.
+"""
+
+def window_mask(start_slot, duration):
+    """Bitmask covering `duration` slots beginning at `start_slot`"""
+    if duration <= 0:
+        return 0
+    return ((1 << duration) - 1) << max(0, start_slot)
+
+def span_mask(start_slot, end_slot, num_slots):
+    """Bitmask covering slots in [start_slot, end_slot) clipped to the day"""
+    start_slot = max(0, start_slot)
+    end_slot = min(num_slots, end_slot)
+    if end_slot <= start_slot:
+        return 0
+    return window_mask(start_slot, end_slot - start_slot)
+
+def lowest_slot(mask):
+    """Index of the lowest set slot, or None for an empty mask"""
+    if not mask:
+        return None
+    return (mask & -mask).bit_length() - 1
+
+def count_slots(mask):
+    """Number of slots set in a mask"""
+    return bin(mask).count('1')
+
+class Occupancy:
+    """Per-day slot bitmasks keyed by faculty, room or section"""
+
+    def __init__(self, num_days):
+        self.num_days = num_days
+        self.masks = {}
+
+    def week(self, key):
+        """Day masks for a key, created empty on first use"""
+        if key not in self.masks:
+            self.masks[key] = [0] * self.num_days
+        return self.masks[key]
+
+    def get(self, key, day):
+        """Occupied slots of a key on a day (0 for unknown keys)"""
+        week = self.masks.get(key)
+        return week[day] if week else 0
+
+    def is_free(self, key, day, mask):
+        return not (self.get(key, day) & mask)
+
+    def occupy(self, key, day, mask):
+        self.week(key)[day] |= mask
+
+    def release(self, key, day, mask):
+        if key in self.masks:
+            self.masks[key][day] &= ~mask
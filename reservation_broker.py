@@ -0,0 +1,73 @@
+"""Shared faculty/room reservation broker for per-department parallel scheduling.
+
+Departments only interact through faculty members and rooms, so each
+department can be scheduled in its own process. The broker lives in a
+multiprocessing manager process and serializes every claim on a faculty
+member's or room's time window. A worker whose claim conflicts with another
+department simply moves on to its next candidate slot.
+"""
+import threading
+from multiprocessing.managers import BaseManager
+
+import timetable_generator_0 as generator
+from occupancy import Occupancy, window_mask
+from room_index import RoomIndex
+
+class ReservationBroker:
+    """Authoritative faculty and room occupancy shared by department workers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.professor_schedule = Occupancy(len(generator.DAYS))
+        self.rooms = generator.load_rooms()
+        self.room_index = RoomIndex(self.rooms, len(generator.DAYS)) if self.rooms else None
+        self.batch_info = generator.load_batch_data()
+        self.claims = 0
+        self.conflicts = 0
+
+    def claim(self, faculty, department, semester, day, start_slot, duration, room_type, course_code,
+              timetable=None):
+        """Atomically book a faculty window plus a suitable room.
+
+        `timetable` is the claiming section's cells for the window (see
+        generator.basket_window), which lets a basket course share a room
+        its group already holds just like in single-process runs.
+
+        Returns a dict with 'ok', the booked 'room_id' and 'rooms', and the
+        faculty's current 'faculty_mask' for the day so the caller can skip
+        windows it now knows are taken.
+        """
+        window = window_mask(start_slot, duration)
+        with self.lock:
+            self.claims += 1
+            faculty_mask = self.professor_schedule.get(faculty, day)
+            if faculty_mask & window:
+                self.conflicts += 1
+                return {'ok': False, 'room_id': None, 'rooms': [], 'faculty_mask': faculty_mask}
+
+            room_id, booked = generator.book_room(self.room_index, self.batch_info, room_type, department,
+                                                  semester, day, start_slot, duration, timetable, course_code)
+            if not room_id:
+                self.conflicts += 1
+                return {'ok': False, 'room_id': None, 'rooms': [], 'faculty_mask': faculty_mask}
+
+            self.professor_schedule.occupy(faculty, day, window)
+            return {'ok': True, 'room_id': room_id, 'rooms': booked,
+                    'faculty_mask': self.professor_schedule.get(faculty, day)}
+
+    def release(self, faculty, day, start_slot, duration, room_ids):
+        """Give back a window booked by claim"""
+        window = window_mask(start_slot, duration)
+        with self.lock:
+            self.professor_schedule.release(faculty, day, window)
+            for room_id in room_ids:
+                self.room_index.release(room_id, day, window)
+
+    def stats(self):
+        with self.lock:
+            return {'claims': self.claims, 'conflicts': self.conflicts}
+
+class BrokerManager(BaseManager):
+    """Manager process hosting the shared ReservationBroker"""
+
+BrokerManager.register('ReservationBroker', ReservationBroker)
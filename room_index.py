@@ -0,0 +1,98 @@
+"""Room availability index for the timetable generator.
+
+Rooms are bucketed by normalized type and each bucket is sorted by capacity,
+so a best-fit lookup bisects to the smallest room that is large enough and
+walks upwards from there. Every bucket also keeps, per day, the slots in which
+all of its rooms are taken, which rejects a full window with one AND.
+"""
+from bisect import bisect_left
+from occupancy import count_slots
+
+def normalize_room_type(room_type):
+    """Bucket name for a rooms.csv type: LECTURE_ROOM, SEATER or the upper-cased type"""
+    room_type = str(room_type).upper()
+    if 'LECTURE_ROOM' in room_type:
+        return 'LECTURE_ROOM'
+    if 'SEATER' in room_type:
+        return 'SEATER'
+    return room_type
+
+class RoomIndex:
+    """Per-type, capacity-sorted view over the rooms dict from load_rooms().
+
+    Room schedules must only be changed through occupy() and release() so
+    the bucket masks and usage counts stay in step.
+    """
+
+    def __init__(self, rooms, num_days):
+        self.rooms = rooms
+        self.num_days = num_days
+        self.buckets = {}      # type -> room ids sorted by (capacity, rooms.csv order)
+        self.capacities = {}   # type -> capacities matching buckets, for bisect
+        self.usage = {}        # room id -> occupied slots across the week
+        self.room_types = {}   # room id -> bucket name
+        for room_id, room in rooms.items():
+            room_type = normalize_room_type(room['type'])
+            self.room_types[room_id] = room_type
+            self.buckets.setdefault(room_type, []).append(room_id)
+            self.usage[room_id] = sum(count_slots(mask) for mask in room['schedule'])
+        for room_type, room_ids in self.buckets.items():
+            room_ids.sort(key=lambda rid: rooms[rid]['capacity'])  # Stable: ties keep file order
+            self.capacities[room_type] = [rooms[rid]['capacity'] for rid in room_ids]
+        # Adjacent lab pairs from load_rooms(), in bucket order
+        self.pairs = {room_type: [(rid, rooms[rid]['adjacent']) for rid in room_ids
+                                  if rooms[rid].get('adjacent')]
+                      for room_type, room_ids in self.buckets.items()}
+        self.full = {room_type: [self._full_mask(room_type, day) for day in range(num_days)]
+                     for room_type in self.buckets}
+
+    def _full_mask(self, room_type, day):
+        """Slots in which every room of a bucket is taken"""
+        mask = -1
+        for room_id in self.buckets[room_type]:
+            mask &= self.rooms[room_id]['schedule'][day]
+        return mask
+
+    def rooms_of_type(self, room_type, min_capacity=0):
+        """Room ids of a type with at least min_capacity seats, smallest first"""
+        room_ids = self.buckets.get(room_type, [])
+        return room_ids[bisect_left(self.capacities[room_type], min_capacity):] if room_ids else []
+
+    def rooms_by_usage(self, room_type):
+        """Room ids of a type, least used first"""
+        return sorted(self.buckets.get(room_type, []), key=lambda rid: self.usage[rid])
+
+    def is_free(self, room_id, day, window):
+        return not (self.rooms[room_id]['schedule'][day] & window)
+
+    def find(self, room_type, min_capacity, day, window, exclude=()):
+        """Best-fit free room of a type for a window, or None"""
+        if room_type not in self.buckets or self.full[room_type][day] & window:
+            return None
+        for room_id in self.rooms_of_type(room_type, min_capacity):
+            if room_id not in exclude and not (self.rooms[room_id]['schedule'][day] & window):
+                return room_id
+        return None
+
+    def find_pair(self, room_type, day, window, exclude=()):
+        """First (room, adjacent room) pair of a type with both rooms free for a window, or None"""
+        for room_id, adjacent in self.pairs.get(room_type, []):
+            if room_id in exclude or adjacent in exclude:
+                continue
+            if not ((self.rooms[room_id]['schedule'][day] | self.rooms[adjacent]['schedule'][day]) & window):
+                return room_id, adjacent
+        return None
+
+    def occupy(self, room_id, day, window):
+        schedule = self.rooms[room_id]['schedule']
+        self.usage[room_id] += count_slots(window & ~schedule[day])
+        schedule[day] |= window
+        room_type = self.room_types[room_id]
+        self.full[room_type][day] = self._full_mask(room_type, day)
+
+    def release(self, room_id, day, window):
+        schedule = self.rooms[room_id]['schedule']
+        self.usage[room_id] -= count_slots(window & schedule[day])
+        schedule[day] &= ~window
+        room_type = self.room_types[room_id]
+        self.full[room_type][day] &= ~window
@@ -0,0 +1,74 @@
+"""Minimum-cost assignment used to re-pack rooms after scheduling.
+
+The matcher knows nothing about timetables: the caller supplies a cost
+matrix with one row per session and one column per candidate room (None
+where a room cannot host a session) and gets back the column chosen for
+each row. It is the Hungarian algorithm with row/column potentials, which
+is O(rows^2 * columns) and plenty fast for the handful of sessions that
+share a time window.
+"""
+
+INFEASIBLE = float('inf')
+
+def min_cost_assignment(cost):
+    """Column index for each row minimizing total cost, or None if some row has no feasible column.
+
+    `cost` is a list of equal-length rows with at most as many rows as columns;
+    None entries mark pairs that must not be matched.
+    """
+    n = len(cost)
+    if n == 0:
+        return []
+    m = len(cost[0])
+    if n > m:
+        return None
+    # A large finite stand-in keeps the potentials finite; results using it are rejected below
+    big = 1 + sum(max((c for c in row if c is not None), default=0) for row in cost)
+    matrix = [[big if c is None else c for c in row] for row in cost]
+
+    u = [0] * (n + 1)      # Row potentials
+    v = [0] * (m + 1)      # Column potentials
+    match = [0] * (m + 1)  # Row matched to each column (1-based, 0 = free)
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        match[0] = row
+        col0 = 0
+        min_slack = [INFEASIBLE] * (m + 1)
+        used = [False] * (m + 1)
+        # Grow an alternating tree until it reaches a free column
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            delta = INFEASIBLE
+            col1 = 0
+            for col in range(1, m + 1):
+                if not used[col]:
+                    slack = matrix[row0 - 1][col - 1] - u[row0] - v[col]
+                    if slack < min_slack[col]:
+                        min_slack[col] = slack
+                        way[col] = col0
+                    if min_slack[col] < delta:
+                        delta = min_slack[col]
+                        col1 = col
+            for col in range(m + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            col0 = col1
+            if match[col0] == 0:
+                break
+        # Flip the augmenting path
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    assignment = [None] * n
+    for col in range(1, m + 1):
+        if match[col]:
+            assignment[match[col] - 1] = col - 1
+    if any(cost[row][col] is None for row, col in enumerate(assignment)):
+        return None
+    return assignment
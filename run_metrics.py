@@ -0,0 +1,61 @@
+"""Phase timings and placement counters for one timetable generation run.
+
+The generator keeps a RunMetrics in its scheduling context and writes it
+next to the timetables as a JSON sidecar, which the web app serves on
+/metrics. Phases nest (room search time is also part of the scheduling
+phase of the session type that triggered it), so their times do not add up
+to the total.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = 'timetable_metrics.json'
+
+class RunMetrics:
+    """Accumulated seconds per phase, per section and per counter"""
+
+    def __init__(self):
+        self.phases = {}    # Phase name -> seconds
+        self.sections = {}  # Section title -> seconds spent placing its sessions
+        self.counters = {}  # Counter name -> count
+
+    @contextmanager
+    def timer(self, name, bucket=None):
+        """Add the time spent in the with-block to `name` in phases (or another bucket)"""
+        bucket = self.phases if bucket is None else bucket
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            bucket[name] = bucket.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other):
+        """Fold another run's metrics (RunMetrics or as_dict() output) into this one"""
+        other = other.as_dict() if isinstance(other, RunMetrics) else other
+        for field in ['phases', 'sections', 'counters']:
+            mine = getattr(self, field)
+            for name, value in other.get(field, {}).items():
+                mine[name] = mine.get(name, 0) + value
+        return self
+
+    def as_dict(self):
+        return {
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            'sections': {name: round(seconds, 4) for name, seconds in self.sections.items()},
+            'counters': dict(self.counters)
+        }
+
+def save_metrics(metrics, path=METRICS_FILE, **extra):
+    """Write metrics plus any extra top-level fields (seed, engine, score, ...) as JSON"""
+    data = dict(extra, **metrics.as_dict())
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    return path
+
+def load_metrics(path=METRICS_FILE):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,70 @@
+"""Compact machine-readable schedule written alongside the Excel timetables.
+
+The generator saves every placed session as one row of a columnar NumPy
+archive so analytics and the faculty views can load the schedule directly
+instead of re-parsing formatted worksheet cells.
+"""
+import glob
+import os
+import numpy as np
+
+SCHEDULE_FILE = 'timetable_schedule.npz'
+
+# Row layout: (department, semester, section, day, start_slot, duration, type, code, faculty, room)
+SCHEDULE_COLUMNS = ['department', 'semester', 'section', 'day', 'start_slot', 'duration',
+                    'type', 'code', 'faculty', 'room']
+INT_COLUMNS = ['semester', 'day', 'start_slot', 'duration']
+
+def section_label(section):
+    """Section letter stored in the schedule, '' for single-section semesters"""
+    return chr(65 + section['index']) if section['num_sections'] > 1 else ''
+
+def schedule_rows(sections):
+    """One row per placed session of the generator's sections"""
+    rows = []
+    for section in sections:
+        label = section_label(section)
+        for session in section['sessions']:
+            placement = session['placement']
+            if not placement:
+                continue
+            rows.append((section['department'], int(section['semester']), label,
+                         placement['day'], placement['start_slot'], session['duration'],
+                         session['type'], session['code'], session['faculty'], placement['classroom']))
+    return rows
+
+def schedule_columns(rows, days, time_slots):
+    """Rows as one array per column plus 'days' and 'time_slots', the layout load_schedule returns"""
+    columns = {'days': np.array(days, dtype=str), 'time_slots': np.array(time_slots, dtype=str)}
+    for idx, name in enumerate(SCHEDULE_COLUMNS):
+        values = [row[idx] for row in rows]
+        if name in INT_COLUMNS:
+            columns[name] = np.array(values, dtype=np.int16)
+        else:
+            columns[name] = np.array([str(value) for value in values], dtype=str)
+    return columns
+
+def save_schedule(rows, days, time_slots, path=SCHEDULE_FILE):
+    """Write rows as one array per column, plus the day and time slot labels"""
+    np.savez_compressed(path, **schedule_columns(rows, days, time_slots))
+    return path
+
+def load_schedule(path=SCHEDULE_FILE):
+    """Load a saved schedule as a dict of column arrays plus 'days' and 'time_slots'"""
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+def iter_sessions(schedule):
+    """Yield each schedule row as a dict keyed by column name"""
+    columns = [schedule[name].tolist() for name in SCHEDULE_COLUMNS]
+    for values in zip(*columns):
+        yield dict(zip(SCHEDULE_COLUMNS, values))
+
+def find_schedule(directory='.'):
+    """Path of the schedule file in a directory, or None when there is none"""
+    path = os.path.join(directory, SCHEDULE_FILE)
+    if os.path.exists(path):
+        return path
+    # Uploaded copies may have been renamed
+    matches = sorted(glob.glob(os.path.join(directory, '*.npz')))
+    return matches[0] if matches else None
@@ -345,11 +345,20 @@ document.getElementById('generateBtn').addEventListener('click', function(e) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            document.getElementById('generateForm').submit();
-        } else {
+        if (!data.success) {
             throw new Error(data.error || 'Failed to save configuration');
         }
+        // Start a background generation job
+        return fetch('/generate', {method: 'POST'}).then(response => response.json());
+    })
+    .then(job => {
+        if (!job.success) {
+            throw new Error(job.error || 'Failed to start generation');
+        }
+        return pollGenerationJob(job, btn);
+    })
+    .then(job => {
+        window.location.href = job.download_url;
     })
     .catch(error => {
         alert('Failed to generate timetables: ' + error.message);
@@ -360,6 +369,33 @@ document.getElementById('generateBtn').addEventListener('click', function(e) {
     });
 });
 
+// Poll a generation job until it finishes, showing section progress on the button
+function pollGenerationJob(job, btn) {
+    return new Promise((resolve, reject) => {
+        const check = () => {
+            fetch(job.status_url)
+                .then(response => response.json())
+                .then(status => {
+                    if (!status.success) {
+                        reject(new Error(status.error || 'Unknown job'));
+                    } else if (status.status === 'done') {
+                        resolve(job);
+                    } else if (status.status === 'failed') {
+                        reject(new Error(status.error || 'Generation failed'));
+                    } else {
+                        const progress = status.sections
+                            ? ` ${status.scheduled}/${status.sections} sections`
+                            : '';
+                        btn.innerHTML = `<i class="fas fa-spinner fa-spin mr-2"></i>Generating...${progress}`;
+                        setTimeout(check, 1000);
+                    }
+                })
+                .catch(reject);
+        };
+        check();
+    });
+}
+
 // New function to update courses table
 function updateCoursesTable(courses) {
     const tbody = coursesTable.querySelector('tbody');
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+# The modules live at the repository root and read config.json / "tt data" relative to it
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.chdir(REPO_DIR)
+
+TIME_SLOTS = ['09:00-09:30', '09:30-10:00', '10:00-10:30', '10:30-11:00', '11:00-11:30', '11:30-12:00']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+@pytest.fixture
+def write_timetable():
+    """Write a department workbook in the generator's layout.
+
+    `cells` maps (day index, slot index) to a cell value or (value, merged width).
+    """
+    def write(path, cells, sheet='CSE_4_A'):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = sheet
+        ws.append(['Day'] + TIME_SLOTS)
+        for day in DAYS:
+            ws.append([day] + [''] * len(TIME_SLOTS))
+        for (day, slot), value in cells.items():
+            value, width = value if isinstance(value, tuple) else (value, 1)
+            ws.cell(row=day + 2, column=slot + 2, value=value)
+            if width > 1:
+                ws.merge_cells(start_row=day + 2, start_column=slot + 2,
+                               end_row=day + 2, end_column=slot + width + 1)
+        wb.create_sheet('Legend').append(['Course Code', 'Course Name'])
+        wb.save(path)
+        return str(path)
+    return write
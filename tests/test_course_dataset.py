@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+from course_dataset import CourseDataset, get_course_dataset, load_course_frame
+
+
+def bump_mtime(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+def test_blank_and_nan_strings_become_missing(tmp_path):
+    path = tmp_path / 'combined.csv'
+    path.write_text("Course Code,Faculty\nCS301, \nCS302,nan\n")
+    df = load_course_frame(str(path))
+    assert df['Faculty'].isna().all()
+
+
+def test_falls_back_to_cp1252(tmp_path):
+    path = tmp_path / 'combined.csv'
+    path.write_bytes("Course Code,Faculty\nCS301,Dr. René\n".encode('cp1252'))
+    assert load_course_frame(str(path))['Faculty'][0] == 'Dr. René'
+
+
+def test_unusable_files_raise_value_error(tmp_path):
+    path = tmp_path / 'combined.csv'
+    path.write_text("Course Code,Faculty\n")
+    with pytest.raises(ValueError):
+        load_course_frame(str(path))
+    with pytest.raises(ValueError):
+        load_course_frame(str(tmp_path / 'missing.csv'))
+
+
+def test_dataset_loads_lazily_and_reloads_on_change(tmp_path):
+    path = tmp_path / 'combined.csv'
+    dataset = CourseDataset(str(path))  # Nothing is read yet, so the file may still be missing
+    path.write_text("Course Code\nCS301\n")
+    first = dataset.frame
+    assert dataset.frame is first and not dataset.is_stale()
+
+    path.write_text("Course Code\nCS301\nCS302\n")
+    bump_mtime(path, 10)
+    assert dataset.is_stale()
+    assert dataset.frame['Course Code'].tolist() == ['CS301', 'CS302']
+
+
+def test_in_memory_dataset_is_never_reloaded():
+    frame = pd.DataFrame({'Course Code': ['CS301']})
+    dataset = CourseDataset.from_frame(frame)
+    assert dataset.frame is frame and not dataset.is_stale() and dataset.signature() is None
+
+
+def test_shared_dataset_per_path(tmp_path):
+    path = str(tmp_path / 'combined.csv')
+    assert get_course_dataset(path) is get_course_dataset(path)
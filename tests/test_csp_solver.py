@@ -0,0 +1,68 @@
+from csp_solver import CSPSolver
+
+
+def make_problem(variables, values, max_values=None, fail=None, incumbent=None):
+    """All-different problem: each variable takes a value no other variable holds.
+
+    `fail(solver, var, value)` can veto an assign to simulate state the
+    search did not see.
+    """
+    state = {}
+
+    def assign(var, value):
+        if value in state.values() or (fail and fail(solver, var, value)):
+            return False
+        state[var] = value
+        return True
+
+    def unassign(var):
+        state.pop(var)
+
+    solver = CSPSolver(variables, lambda var: list(values), assign, unassign, lambda var: variables,
+                       lambda var, value: value not in state.values(), max_values=max_values,
+                       incumbent=incumbent)
+    return solver, state
+
+
+def test_solves_feasible_problem():
+    solver, state = make_problem([0, 1, 2], [1, 2, 3])
+    result = solver.solve()
+    assert len(result) == 3 and len(set(result.values())) == 3
+    assert result == state
+    assert solver.best_missing == 0 and solver.exhausted
+
+
+def test_proves_minimum_when_search_completes():
+    solver, state = make_problem([0, 1, 2], [1, 2])
+    result = solver.solve()
+    assert solver.best_missing == 1 and len(result) == 2
+    assert solver.completed and solver.exhausted
+    assert result == state
+
+
+def test_max_values_is_not_a_proof():
+    solver, _ = make_problem([0, 1, 2], [1, 2], max_values=1)
+    solver.solve()
+    assert solver.completed and solver.truncated
+    assert not solver.exhausted
+
+
+def test_replay_drops_placements_that_fail_on_modified_state():
+    # Once the search is over, value 1 is no longer available (e.g. its room was taken)
+    solver, state = make_problem([0, 1, 2], [1, 2], fail=lambda solver, var, value: solver.completed and value == 1)
+    result = solver.solve()
+    assert solver.replay_failures
+    assert 1 not in result.values()
+    assert result == state
+    assert solver.best_missing == 3 - len(result)
+    assert not solver.exhausted
+
+
+def test_incumbent_bound_only_accepts_better_solutions():
+    solver, state = make_problem([0, 1, 2], [1, 2], incumbent=1)
+    assert solver.solve() == {} and state == {}
+    assert solver.best_missing == 1 and solver.exhausted
+
+    solver, state = make_problem([0, 1, 2], [1, 2], incumbent=2)
+    result = solver.solve()
+    assert solver.best_missing == 1 and len(result) == 2 and result == state
@@ -0,0 +1,69 @@
+import os
+
+import faculty_timetable as ft
+import schedule_store
+
+CELLS = {
+    (0, 0): ("CS301 LEC\nC101\nDr. A", 3),
+    (0, 4): ("B1 Courses\nB1-101\nB1-101: Dr. B & Dr. C (C102)", 2),
+}
+
+
+def count_builds(monkeypatch):
+    builds = []
+    build = ft.build_faculty_index
+
+    def counting_build(upload_dir):
+        builds.append(upload_dir)
+        return build(upload_dir)
+
+    monkeypatch.setattr(ft, 'build_faculty_index', counting_build)
+    return builds
+
+
+def test_index_groups_sessions_by_faculty_and_co_teacher(tmp_path, write_timetable):
+    write_timetable(tmp_path / 'timetable_CSE.xlsx', CELLS)
+    index = ft.load_faculty_index(str(tmp_path))
+    assert sorted(index['faculty']) == ['Dr. A', 'Dr. B', 'Dr. B & Dr. C', 'Dr. C']
+    assert index['faculty']['Dr. A'] == [{'file': 'timetable_CSE.xlsx', 'sheet': 'CSE_4_A', 'day': 'Monday',
+                                          'start_slot': 0, 'duration': 3, 'code': 'CS301',
+                                          'content': "CS301 LEC\nC101\nCSE 4-A"}]
+    assert index['faculty']['Dr. C'][0]['content'] == "B1-101\nC102\nCSE 4-A"
+    assert os.path.exists(tmp_path / ft.FACULTY_INDEX_FILE)
+
+
+def test_saved_index_is_reused_until_the_uploads_change(tmp_path, write_timetable, monkeypatch):
+    path = write_timetable(tmp_path / 'timetable_CSE.xlsx', CELLS)
+    builds = count_builds(monkeypatch)
+    ft.load_faculty_index(str(tmp_path))
+    ft.load_faculty_index(str(tmp_path))
+    assert len(builds) == 1
+
+    # A touch without a content change is caught by the hash
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    ft.load_faculty_index(str(tmp_path))
+    assert len(builds) == 1
+
+    write_timetable(path, {(1, 0): ("CS302 TUT\nC101\nDr. D", 2)})
+    os.utime(path, (stat.st_atime, stat.st_mtime + 20))
+    assert sorted(ft.load_faculty_index(str(tmp_path))['faculty']) == ['Dr. D']
+    assert len(builds) == 2
+
+    # New or removed uploads change the source list
+    write_timetable(tmp_path / 'timetable_ECE.xlsx', CELLS, sheet='ECE_2')
+    assert 'Dr. A' in ft.load_faculty_index(str(tmp_path))['faculty']
+    os.remove(tmp_path / 'timetable_ECE.xlsx')
+    assert 'Dr. A' not in ft.load_faculty_index(str(tmp_path))['faculty']
+    assert len(builds) == 4
+
+
+def test_schedule_file_takes_over_from_workbooks(tmp_path, write_timetable):
+    write_timetable(tmp_path / 'timetable_CSE.xlsx', CELLS)
+    ft.load_faculty_index(str(tmp_path))
+    rows = [('CSE', 4, '', 2, 1, 2, 'TUT', 'CS303', 'Dr. E', 'C104')]
+    schedule_store.save_schedule(rows, ['Monday', 'Tuesday', 'Wednesday'], ['09:00-09:30'] * 6,
+                                 path=str(tmp_path / schedule_store.SCHEDULE_FILE))
+    index = ft.load_faculty_index(str(tmp_path))
+    assert list(index['faculty']) == ['Dr. E']
+    assert index['faculty']['Dr. E'][0]['day'] == 'Wednesday'
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import input_cache
+
+
+def use_file(monkeypatch, tmp_path, name, text):
+    path = tmp_path / f"{name}.csv"
+    path.write_text(text)
+    monkeypatch.setitem(input_cache.INPUT_FILES, name, str(path))
+    monkeypatch.setattr(input_cache, '_entries', {})
+    return path
+
+
+def test_derived_value_is_built_once_per_file_version(monkeypatch, tmp_path):
+    path = use_file(monkeypatch, tmp_path, 'batches', "Department,Semester\nCSE,4\n")
+    builds = []
+
+    def build(df):
+        builds.append(len(df))
+        return len(df)
+
+    assert input_cache.get_derived('batches', 'rows', build) == 1
+    assert input_cache.get_derived('batches', 'rows', build) == 1
+    assert builds == [1]
+
+    path.write_text("Department,Semester\nCSE,4\nECE,6\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert input_cache.get_derived('batches', 'rows', build) == 2
+    assert builds == [1, 2]
+
+
+def test_rooms_keep_csv_module_strings(monkeypatch, tmp_path):
+    use_file(monkeypatch, tmp_path, 'rooms', "id,capacity,type,roomNumber\n007,60,LECTURE_ROOM,\n")
+    record = input_cache.get_input('rooms').to_dict('records')[0]
+    assert record == {'id': '007', 'capacity': '60', 'type': 'LECTURE_ROOM', 'roomNumber': ''}
+
+
+def test_missing_input_raises_file_not_found(monkeypatch, tmp_path):
+    monkeypatch.setitem(input_cache.INPUT_FILES, 'faculty', str(tmp_path / 'missing.csv'))
+    monkeypatch.setattr(input_cache, '_entries', {})
+    with pytest.raises(FileNotFoundError):
+        input_cache.get_input('faculty')
@@ -0,0 +1,60 @@
+import os
+import socket
+import subprocess
+import sys
+
+import job_queue
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def add_job(db_path, job_id, owner, status='running'):
+    with job_queue.connect(db_path) as conn:
+        conn.execute("INSERT INTO jobs (id, status, created_at, owner) VALUES (?, ?, 0, ?)",
+                     (job_id, status, owner))
+
+
+def statuses(db_path):
+    with job_queue.connect(db_path) as conn:
+        return {row['id']: row['status'] for row in conn.execute("SELECT id, status FROM jobs")}
+
+
+def test_reaps_only_jobs_of_dead_processes(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    job_queue.init_db(db_path)
+    host = socket.gethostname()
+    add_job(db_path, 'live', f"{host}:{os.getpid()}")
+    add_job(db_path, 'dead', f"{host}:{dead_pid()}", status='queued')
+    add_job(db_path, 'untagged', None)
+    add_job(db_path, 'elsewhere', 'other-host:1')
+    add_job(db_path, 'finished', f"{host}:{dead_pid()}", status='done')
+
+    assert job_queue.reap_orphaned_jobs(db_path) == 2
+    assert statuses(db_path) == {'live': 'running', 'dead': 'failed', 'untagged': 'failed',
+                                 'elsewhere': 'running', 'finished': 'done'}
+
+
+def test_new_queue_leaves_other_live_workers_jobs_alone(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    job_queue.init_db(db_path)
+    add_job(db_path, 'other-worker', f"{socket.gethostname()}:{os.getppid()}")
+    queue = job_queue.JobQueue(db_path=db_path)
+    try:
+        assert statuses(db_path)['other-worker'] == 'running'
+    finally:
+        queue.executor.shutdown()
+
+
+def test_init_db_adds_owner_column_to_old_databases(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    with job_queue.connect(db_path) as conn:
+        conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, options TEXT, "
+                     "created_at REAL, started_at REAL, finished_at REAL, result_path TEXT, error TEXT)")
+        conn.execute("INSERT INTO jobs (id, status) VALUES ('old', 'running')")
+    job_queue.init_db(db_path)
+    assert job_queue.reap_orphaned_jobs(db_path) == 1
+    assert statuses(db_path) == {'old': 'failed'}
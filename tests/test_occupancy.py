@@ -0,0 +1,42 @@
+from occupancy import Occupancy, count_slots, lowest_slot, span_mask, window_mask
+
+
+def test_window_mask_covers_duration_slots_from_start():
+    assert window_mask(0, 3) == 0b111
+    assert window_mask(4, 2) == 0b110000
+    assert window_mask(3, 0) == 0
+    assert window_mask(-2, 2) == 0b11  # Negative starts clip to the first slot
+
+
+def test_span_mask_clips_to_the_day():
+    assert span_mask(2, 5, 10) == 0b11100
+    assert span_mask(-3, 2, 10) == 0b11
+    assert span_mask(8, 14, 10) == 0b1100000000
+    assert span_mask(5, 5, 10) == 0
+    assert span_mask(6, 4, 10) == 0
+
+
+def test_count_and_lowest_slot():
+    assert count_slots(0) == 0
+    assert count_slots(0b1011000) == 3
+    assert lowest_slot(0) is None
+    assert lowest_slot(0b1011000) == 3
+    assert lowest_slot(1 << 40) == 40
+
+
+def test_occupancy_tracks_each_key_and_day_separately():
+    occupancy = Occupancy(5)
+    assert occupancy.get('F1', 0) == 0 and 'F1' not in occupancy.masks
+
+    occupancy.occupy('F1', 1, window_mask(2, 3))
+    occupancy.occupy('F1', 1, window_mask(8, 1))
+    assert occupancy.get('F1', 1) == 0b100011100
+    assert occupancy.get('F1', 0) == 0 and occupancy.get('F2', 1) == 0
+    assert not occupancy.is_free('F1', 1, window_mask(4, 2))
+    assert occupancy.is_free('F1', 1, window_mask(5, 3))
+    assert occupancy.week('F1') == [0, 0b100011100, 0, 0, 0]
+
+    occupancy.release('F1', 1, window_mask(2, 3))
+    assert occupancy.get('F1', 1) == 0b100000000
+    occupancy.release('F2', 1, window_mask(0, 4))  # Unknown keys are ignored
+    assert 'F2' not in occupancy.masks
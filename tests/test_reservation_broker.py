@@ -0,0 +1,45 @@
+import pytest
+
+import timetable_generator_0 as generator
+from reservation_broker import ReservationBroker
+from room_index import RoomIndex
+
+
+@pytest.fixture(autouse=True)
+def time_slots():
+    generator.initialize_time_slots()
+
+
+def single_room_broker():
+    broker = ReservationBroker()
+    broker.rooms = {'R1': {'capacity': 100, 'type': 'LECTURE_ROOM', 'roomNumber': 'C101',
+                           'schedule': [0] * len(generator.DAYS)}}
+    generator.link_adjacent_rooms(broker.rooms)
+    broker.room_index = RoomIndex(broker.rooms, len(generator.DAYS))
+    broker.batch_info = {}
+    return broker
+
+
+def test_basket_claim_shares_the_room_its_group_holds():
+    broker = single_room_broker()
+    session = {'code': 'B1-101', 'duration': 2}
+    state = generator.create_section_state()
+
+    first = broker.claim('F1', 'CSE', 4, 0, 2, 2, 'LECTURE_ROOM', 'B1-101',
+                         generator.basket_window(state['timetable'], session, 0, 2))
+    assert first['ok'] and first['rooms'] == ['R1']
+
+    # The only room is now taken, so only the basket sharing rule can place the next claim
+    generator.mark_session(state, generator.Occupancy(len(generator.DAYS)), 'F1', 0, 2, 2,
+                           'LEC', 'B1-101', 'Elective', 'R1')
+    assert not broker.claim('F2', 'CSE', 4, 0, 2, 2, 'LECTURE_ROOM', 'B1-101')['ok']
+    shared = broker.claim('F2', 'CSE', 4, 0, 2, 2, 'LECTURE_ROOM', 'B1-101',
+                          generator.basket_window(state['timetable'], session, 0, 2))
+    assert shared['ok'] and shared['room_id'] == 'R1' and shared['rooms'] == []
+
+
+def test_basket_window_is_only_sent_for_basket_courses():
+    state = generator.create_section_state()
+    assert generator.basket_window(state['timetable'], {'code': 'CS301', 'duration': 2}, 0, 2) is None
+    window = generator.basket_window(state['timetable'], {'code': 'B2-201', 'duration': 3}, 1, 4)
+    assert list(window) == [1] and list(window[1]) == [4, 5, 6]
@@ -0,0 +1,61 @@
+from occupancy import window_mask
+from room_index import RoomIndex, normalize_room_type
+
+DAYS = 5
+
+
+def make_index(*rooms):
+    """RoomIndex over (id, capacity, type, adjacent) tuples, in rooms.csv order"""
+    return RoomIndex({room_id: {'capacity': capacity, 'type': room_type, 'roomNumber': room_id,
+                                'adjacent': adjacent, 'schedule': [0] * DAYS}
+                      for room_id, capacity, room_type, adjacent in rooms}, DAYS)
+
+
+def test_room_types_are_bucketed():
+    assert normalize_room_type('lecture_room') == 'LECTURE_ROOM'
+    assert normalize_room_type('120_SEATER') == 'SEATER'
+    assert normalize_room_type('computer_lab') == 'COMPUTER_LAB'
+
+
+def test_find_returns_the_smallest_free_room_that_fits():
+    index = make_index(('BIG', 120, 'LECTURE_ROOM', None), ('SMALL', 40, 'LECTURE_ROOM', None),
+                       ('MID', 60, 'LECTURE_ROOM', None), ('MID2', 60, 'LECTURE_ROOM', None))
+    window = window_mask(2, 3)
+    assert index.rooms_of_type('LECTURE_ROOM', 50) == ['MID', 'MID2', 'BIG']
+    assert index.find('LECTURE_ROOM', 50, 0, window) == 'MID'
+    assert index.find('LECTURE_ROOM', 50, 0, window, exclude={'MID'}) == 'MID2'
+    assert index.find('LECTURE_ROOM', 200, 0, window) is None
+    assert index.find('SEATER', 0, 0, window) is None
+
+    index.occupy('MID', 0, window_mask(4, 2))  # Overlaps the window
+    assert index.find('LECTURE_ROOM', 50, 0, window) == 'MID2'
+    assert index.find('LECTURE_ROOM', 50, 0, window_mask(0, 4)) == 'MID'
+    assert index.find('LECTURE_ROOM', 50, 1, window) == 'MID'
+
+
+def test_full_mask_and_usage_follow_occupy_and_release():
+    index = make_index(('A', 60, 'LECTURE_ROOM', None), ('B', 60, 'LECTURE_ROOM', None))
+    window = window_mask(0, 2)
+    index.occupy('A', 2, window)
+    assert index.full['LECTURE_ROOM'][2] == 0
+    index.occupy('B', 2, window_mask(1, 3))
+    assert index.full['LECTURE_ROOM'][2] == 0b10
+    assert index.find('LECTURE_ROOM', 0, 2, window) is None
+    assert index.usage == {'A': 2, 'B': 3}
+    assert index.rooms_by_usage('LECTURE_ROOM') == ['A', 'B']
+
+    index.release('B', 2, window_mask(1, 3))
+    assert index.full['LECTURE_ROOM'][2] == 0
+    assert index.find('LECTURE_ROOM', 0, 2, window) == 'B'
+    assert index.usage == {'A': 2, 'B': 0}
+
+
+def test_find_pair_needs_both_adjacent_labs_free():
+    index = make_index(('L1', 30, 'COMPUTER_LAB', 'L2'), ('L2', 30, 'COMPUTER_LAB', 'L1'),
+                       ('L3', 30, 'COMPUTER_LAB', None))
+    window = window_mask(0, 4)
+    assert index.find_pair('COMPUTER_LAB', 0, window) == ('L1', 'L2')
+    index.occupy('L2', 0, window_mask(3, 1))
+    assert index.find_pair('COMPUTER_LAB', 0, window) is None
+    assert index.find_pair('COMPUTER_LAB', 0, window_mask(4, 4)) == ('L1', 'L2')
+    assert index.find_pair('COMPUTER_LAB', 1, window, exclude={'L1'}) is None
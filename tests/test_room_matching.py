@@ -0,0 +1,38 @@
+import random
+from itertools import permutations
+
+from room_matching import min_cost_assignment
+
+
+def brute_force_cost(cost):
+    """Lowest total cost over every feasible assignment, or None when there is none"""
+    best = None
+    for columns in permutations(range(len(cost[0])), len(cost)):
+        if any(cost[row][col] is None for row, col in enumerate(columns)):
+            continue
+        total = sum(cost[row][col] for row, col in enumerate(columns))
+        best = total if best is None else min(best, total)
+    return best
+
+
+def test_matches_brute_force_on_small_random_matrices():
+    rng = random.Random(7)
+    for _ in range(300):
+        rows = rng.randint(1, 4)
+        columns = rng.randint(rows, 5)
+        cost = [[None if rng.random() < 0.3 else rng.randint(0, 9) for _ in range(columns)]
+                for _ in range(rows)]
+        expected = brute_force_cost(cost)
+        assignment = min_cost_assignment(cost)
+        if expected is None:
+            assert assignment is None
+            continue
+        assert len(set(assignment)) == rows
+        assert sum(cost[row][col] for row, col in enumerate(assignment)) == expected
+
+
+def test_edge_cases():
+    assert min_cost_assignment([]) == []
+    assert min_cost_assignment([[1], [2]]) is None  # More sessions than rooms
+    assert min_cost_assignment([[None, None]]) is None
+    assert min_cost_assignment([[5, 1], [1, 5]]) == [1, 0]
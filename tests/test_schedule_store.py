@@ -0,0 +1,54 @@
+import os
+
+import schedule_store
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday']
+TIME_SLOTS = ['09:00-09:30', '09:30-10:00', '10:00-10:30']
+
+
+def make_section(index, num_sections, sessions):
+    return {'department': 'CSE', 'semester': '4', 'index': index, 'num_sections': num_sections,
+            'sessions': sessions}
+
+
+def make_session(code, session_type, faculty, placement, duration=2):
+    return {'code': code, 'type': session_type, 'faculty': faculty, 'duration': duration,
+            'placement': placement}
+
+
+def test_round_trip_through_npz(tmp_path):
+    sections = [
+        make_section(1, 2, [
+            make_session('CS301', 'LEC', 'Dr. A', {'day': 2, 'start_slot': 1, 'classroom': 'C101'}, 3),
+            make_session('CS302', 'TUT', 'Dr. B', None),  # Unplaced sessions are not stored
+        ]),
+        make_section(0, 1, [
+            make_session('B1-101', 'LAB', 'Dr. C & Dr. D', {'day': 0, 'start_slot': 0, 'classroom': 'L1+L2'}),
+        ]),
+    ]
+    rows = schedule_store.schedule_rows(sections)
+    path = schedule_store.save_schedule(rows, DAYS, TIME_SLOTS, path=str(tmp_path / 'schedule.npz'))
+    schedule = schedule_store.load_schedule(path)
+
+    assert schedule['days'].tolist() == DAYS and schedule['time_slots'].tolist() == TIME_SLOTS
+    assert schedule['day'].dtype.kind == 'i' and schedule['code'].dtype.kind == 'U'
+    assert list(schedule_store.iter_sessions(schedule)) == [
+        {'department': 'CSE', 'semester': 4, 'section': 'B', 'day': 2, 'start_slot': 1, 'duration': 3,
+         'type': 'LEC', 'code': 'CS301', 'faculty': 'Dr. A', 'room': 'C101'},
+        {'department': 'CSE', 'semester': 4, 'section': '', 'day': 0, 'start_slot': 0, 'duration': 2,
+         'type': 'LAB', 'code': 'B1-101', 'faculty': 'Dr. C & Dr. D', 'room': 'L1+L2'},
+    ]
+
+
+def test_empty_schedule_round_trips(tmp_path):
+    path = schedule_store.save_schedule([], DAYS, TIME_SLOTS, path=str(tmp_path / 'schedule.npz'))
+    assert list(schedule_store.iter_sessions(schedule_store.load_schedule(path))) == []
+
+
+def test_find_schedule_accepts_renamed_uploads(tmp_path):
+    assert schedule_store.find_schedule(str(tmp_path)) is None
+    renamed = schedule_store.save_schedule([], DAYS, TIME_SLOTS, path=str(tmp_path / 'upload.npz'))
+    assert schedule_store.find_schedule(str(tmp_path)) == renamed
+    default = schedule_store.save_schedule([], DAYS, TIME_SLOTS,
+                                           path=os.path.join(str(tmp_path), schedule_store.SCHEDULE_FILE))
+    assert schedule_store.find_schedule(str(tmp_path)) == default
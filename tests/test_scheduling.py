@@ -0,0 +1,55 @@
+from collections import Counter
+
+import pytest
+
+import timetable_generator_0 as generator
+
+
+def bookings(sections):
+    """Per-slot faculty and booked-room counts of every placed session"""
+    faculty, rooms = Counter(), Counter()
+    for section in sections:
+        for session in section['sessions']:
+            placement = session['placement']
+            if not placement:
+                continue
+            for slot in range(placement['start_slot'], placement['start_slot'] + session['duration']):
+                faculty[(placement['day'], slot, session['faculty'])] += 1
+                # Basket sessions sharing their group's room book nothing themselves
+                for room_id in placement['rooms']:
+                    rooms[(placement['day'], slot, room_id)] += 1
+    return faculty, rooms
+
+
+def section_overlaps(section):
+    """Slots where two non-basket sessions of one section overlap"""
+    taken = Counter()
+    for session in section['sessions']:
+        placement = session['placement']
+        if placement and not generator.is_basket_course(session['code']):
+            for slot in range(placement['start_slot'], placement['start_slot'] + session['duration']):
+                taken[(placement['day'], slot)] += 1
+    return [key for key, count in taken.items() if count > 1]
+
+
+@pytest.mark.parametrize('engine', generator.ENGINES)
+def test_seeded_run_on_sample_data_is_clash_free(engine):
+    result = generator.schedule_timetables(seed=1, engine=engine)
+    faculty, rooms = bookings(result['sections'])
+    placed = sum(1 for section in result['sections'] for session in section['sessions']
+                 if session['placement'])
+    assert placed > 0
+    assert [key for key, count in faculty.items() if count > 1] == []
+    assert [key for key, count in rooms.items() if count > 1] == []
+    for section in result['sections']:
+        assert section_overlaps(section) == []
+    assert result['score']['unscheduled'] == len(result['unscheduled_components'])
+
+
+def test_seeded_greedy_runs_are_reproducible():
+    def placements(result):
+        return [(section['title'], session['code'], session['type'], session['placement'] and
+                 (session['placement']['day'], session['placement']['start_slot'], session['placement']['classroom']))
+                for section in result['sections'] for session in section['sessions']]
+
+    assert placements(generator.schedule_timetables(seed=3)) == placements(generator.schedule_timetables(seed=3))
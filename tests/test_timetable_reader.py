@@ -0,0 +1,63 @@
+import os
+
+import timetable_reader
+
+DURATIONS = {'LEC': 3, 'LAB': 4, 'TUT': 2, 'SS': 2}
+
+CELLS = {
+    (0, 0): ("CS301 LEC\nC101\nDr. A", 3),
+    (0, 3): 'BREAK',
+    (0, 4): ("B1 Courses\nB1-101, B1-102\nB1-101: Dr. B (C102)\nB1-102: Dr. C & Dr. D (C103)", 2),
+    (1, 3): "CS302 LAB\nL1+L2\nDr. A",  # Unmerged: falls back to the LAB duration, clipped to the day
+}
+
+
+def summary(records):
+    return [(r.sheet, r.department, r.semester, r.section, r.day, r.start_slot, r.duration, r.type,
+             r.code, r.faculty, r.room, r.basket_group) for r in records]
+
+
+def test_parse_cell():
+    assert timetable_reader.parse_cell("CS301 TUT\nC101\nDr. A", None, DURATIONS) == \
+        [('TUT', 'CS301', 'Dr. A', 'C101', None, 2)]
+    assert timetable_reader.parse_cell("B2 Courses\nB2-1\nB2-1: Dr. (X) Y (R1)", 3, DURATIONS) == \
+        [('LEC', 'B2-1', 'Dr. (X) Y', 'R1', 'B2', 3)]
+    assert timetable_reader.parse_cell('BREAK', None, DURATIONS) == []
+    assert timetable_reader.parse_cell('', None, DURATIONS) == []
+
+
+def test_reads_merged_and_basket_cells(tmp_path, write_timetable):
+    path = write_timetable(tmp_path / 'timetable_CSE.xlsx', CELLS)
+    parsed = timetable_reader.parse_workbook(path, DURATIONS)
+    assert parsed['days'] == ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+    assert parsed['time_slots'][0] == '09:00-09:30' and len(parsed['time_slots']) == 6
+    assert summary(parsed['sessions']) == [
+        ('CSE_4_A', 'CSE', 4, 'A', 'Monday', 0, 3, 'LEC', 'CS301', 'Dr. A', 'C101', None),
+        ('CSE_4_A', 'CSE', 4, 'A', 'Monday', 4, 2, 'TUT', 'B1-101', 'Dr. B', 'C102', 'B1'),
+        ('CSE_4_A', 'CSE', 4, 'A', 'Monday', 4, 2, 'TUT', 'B1-102', 'Dr. C & Dr. D', 'C103', 'B1'),
+        ('CSE_4_A', 'CSE', 4, 'A', 'Tuesday', 3, 3, 'LAB', 'CS302', 'Dr. A', 'L1+L2', None),
+    ]
+
+
+def test_cache_follows_file_content(tmp_path, write_timetable):
+    path = write_timetable(tmp_path / 'timetable_CSE.xlsx', CELLS)
+    first = timetable_reader.read_workbook(path)
+    assert timetable_reader.read_workbook(path) is first
+
+    # Touched but unchanged: the content hash keeps the parse
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert timetable_reader.read_workbook(path) is first
+
+    write_timetable(path, {(2, 1): ("CS303 TUT\nC104\nDr. E", 2)})
+    os.utime(path, (stat.st_atime, stat.st_mtime + 20))
+    records = timetable_reader.read_workbook(path)['sessions']
+    assert [(r.day, r.code, r.duration) for r in records] == [('Wednesday', 'CS303', 2)]
+
+
+def test_read_timetables_skips_unreadable_files(tmp_path, write_timetable):
+    path = write_timetable(tmp_path / 'timetable_CSE.xlsx', CELLS)
+    broken = tmp_path / 'timetable_ECE.xlsx'
+    broken.write_bytes(b'not a workbook')
+    result = timetable_reader.read_timetables([str(broken), path])
+    assert result['days'][0] == 'Monday' and len(result['sessions']) == 4
@@ -1,13 +1,24 @@
 import pandas as pd
+import numpy as np
 import random
 from datetime import datetime, time, timedelta
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import PatternFill, Border, Side, Alignment, Font
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
-import csv
-import glob
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+from occupancy import Occupancy, window_mask, span_mask, lowest_slot, count_slots
+from room_index import RoomIndex
+import room_matching
+from run_metrics import RunMetrics, METRICS_FILE, save_metrics
+import csp_solver
+import schedule_store
+import input_cache
+from course_dataset import CourseDataset, get_course_dataset
 
 # Load duration constants from config
 def load_config():
@@ -35,10 +46,26 @@ TUTORIAL_DURATION = durations['tutorial_duration']
 SELF_STUDY_DURATION = durations['self_study_duration']
 BREAK_DURATION = durations['break_duration']
 
+# Teaching days and hours, optionally overridden by a "timings" section in config.json
+def load_timings():
+    timings = {
+        'days': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'],
+        'start_time': '09:00',
+        'end_time': '18:30'
+    }
+    try:
+        with open('config.json', 'r') as f:
+            timings.update(json.load(f).get('timings', {}))
+    except Exception:
+        pass
+    return timings
+
 # Constants
-DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-START_TIME = time(9, 0)
-END_TIME = time(18, 30)
+timings = load_timings()
+DAYS = list(timings['days'])
+START_TIME = datetime.strptime(timings['start_time'], '%H:%M').time()
+END_TIME = datetime.strptime(timings['end_time'], '%H:%M').time()
+SLOT_MINUTES = 60 // HOUR_SLOTS
 
 # Lunch break parameters
 LUNCH_WINDOW_START = time(12, 30)  # Lunch breaks can start from 12:30
@@ -96,7 +123,7 @@ def generate_time_slots():
     
     while current_time < end_time:
         current = current_time.time()
-        next_time = current_time + timedelta(minutes=30)
+        next_time = current_time + timedelta(minutes=SLOT_MINUTES)
         
         # Keep all time slots but we'll mark break times later
         slots.append((current, next_time.time()))
@@ -104,89 +131,107 @@ def generate_time_slots():
     
     return slots
 
+def time_slot_labels():
+    """'HH:MM-HH:MM' header label of every time slot"""
+    return [f"{slot[0].strftime('%H:%M')}-{slot[1].strftime('%H:%M')}" for slot in TIME_SLOTS]
+
 def load_rooms():
-    rooms = {}
     try:
-        with open('rooms.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                rooms[row['id']] = {
-                    'capacity': int(row['capacity']),
-                    'type': row['type'],
-                    'roomNumber': row['roomNumber'],
-                    'schedule': {day: set() for day in range(len(DAYS))}
-                }
+        records = input_cache.get_derived('rooms', 'records', lambda df: df.to_dict('records'))
     except FileNotFoundError:
         print("Warning: rooms.csv not found, using default room allocation")
         return None
+    # Fresh dicts on every call since each run books into its own room schedules
+    rooms = {}
+    for row in records:
+        rooms[row['id']] = {
+            'capacity': int(row['capacity']),
+            'type': row['type'],
+            'roomNumber': row['roomNumber'],
+            'schedule': [0] * len(DAYS)  # Occupied slot bitmask per day
+        }
+    # Pair up neighbouring labs once instead of on every allocation
+    link_adjacent_rooms(rooms)
     return rooms
 
+def parse_room_number(room_number):
+    """Digits of a room number such as 'L206' as an int, or None when it has none"""
+    digits = ''.join(filter(str.isdigit, str(room_number)))
+    return int(digits) if digits else None
+
+def link_adjacent_rooms(rooms):
+    """Set each room's 'adjacent' to the first room (rooms.csv order) of the same type and
+    floor whose number differs by one, recording the parsed 'number' and 'floor' as well"""
+    by_number = {}  # (type, number) -> [(file order, room id)]
+    for order, (room_id, room) in enumerate(rooms.items()):
+        room['number'] = parse_room_number(room['roomNumber'])
+        room['floor'] = room['number'] // 100 if room['number'] is not None else None
+        by_number.setdefault((room['type'], room['number']), []).append((order, room_id))
+
+    for room_id, room in rooms.items():
+        room['adjacent'] = None
+        if room['number'] is None:
+            continue
+        neighbours = [(order, other_id)
+                      for number in (room['number'] - 1, room['number'] + 1)
+                      for order, other_id in by_number.get((room['type'], number), [])
+                      if rooms[other_id]['floor'] == room['floor']]
+        if neighbours:
+            room['adjacent'] = min(neighbours)[1]
+
+def parse_batch_sizes(df):
+    """Section count and size per (department, semester) from updated_batches.csv"""
+    batch_info = {}
+    for _, row in df.iterrows():
+        total_students = row['Total_Students']
+        max_batch_size = row['MaxBatchSize']
+        
+        # Calculate number of sections needed
+        num_sections = (total_students + max_batch_size - 1) // max_batch_size
+        section_size = (total_students + num_sections - 1) // num_sections
+
+        batch_info[(row['Department'], row['Semester'])] = {
+            'total': total_students,
+            'num_sections': num_sections,
+            'section_size': section_size
+        }
+    return batch_info
+
+def parse_elective_registrations(df):
+    """Single-section batch entry per elective from elective_registrations.csv"""
+    return {('ELECTIVE', row['Course Code']): {
+                'total': row['Total Students'],
+                'num_sections': 1,  # Electives are typically single section
+                'section_size': row['Total Students']
+            } for _, row in df.iterrows()}
+
 def load_batch_data():
-    """Load batch information and calculate sections automatically"""
+    """Load batch information and calculate sections automatically.
+    
+    The entries are shared through input_cache, so callers must not modify them.
+    """
     batch_info = {}
     
     # Load regular batch sizes
     try:
-        df = pd.read_csv('tt data/updated_batches.csv')
-        for _, row in df.iterrows():
-            total_students = row['Total_Students']
-            max_batch_size = row['MaxBatchSize']
-            
-            # Calculate number of sections needed
-            num_sections = (total_students + max_batch_size - 1) // max_batch_size
-            section_size = (total_students + num_sections - 1) // num_sections
-
-            batch_info[(row['Department'], row['Semester'])] = {
-                'total': total_students,
-                'num_sections': num_sections,
-                'section_size': section_size
-            }
+        batch_info.update(input_cache.get_derived('batches', 'batch_info', parse_batch_sizes))
     except FileNotFoundError:
         print("Warning: updated_batches.csv not found, using default batch sizes")
         
     # Load elective course registrations
     try:
-        elective_df = pd.read_csv('tt data/elective_registrations.csv')
-        for _, row in elective_df.iterrows():
-            batch_info[('ELECTIVE', row['Course Code'])] = {
-                'total': row['Total Students'],
-                'num_sections': 1,  # Electives are typically single section
-                'section_size': row['Total Students']
-            }
+        batch_info.update(input_cache.get_derived('electives', 'batch_info', parse_elective_registrations))
     except FileNotFoundError:
         print("Warning: elective_registrations.csv not found")
         
     return batch_info
 
-def find_adjacent_lab_room(room_id, rooms):
-    """Find an adjacent lab room based on room numbering"""
-    if not room_id:
-        return None
-    
-    # Get room number and extract base info
-    current_num = int(''.join(filter(str.isdigit, rooms[room_id]['roomNumber'])))
-    current_floor = current_num // 100
-    
-    # Look for adjacent room with same type
-    for rid, room in rooms.items():
-        if rid != room_id and room['type'] == rooms[room_id]['type']:
-            room_num = int(''.join(filter(str.isdigit, room['roomNumber'])))
-            # Check if on same floor and adjacent number
-            if room_num // 100 == current_floor and abs(room_num - current_num) == 1:
-                return rid
-    return None
-
-def find_suitable_room(course_type, department, semester, day, start_slot, duration, rooms, batch_info, timetable, course_code="", used_rooms=None):
-    """Find suitable room(s) considering batch sizes and avoiding room conflicts"""
-    if not rooms:
-        return "DEFAULT_ROOM"
-    
+def get_required_capacity(batch_info, department, semester, course_code):
+    """Seats a session needs: elective registrations for baskets, section size otherwise"""
     required_capacity = 60  # Default fallback
-    is_basket = is_basket_course(course_code)
-    
     if batch_info:
         # For elective/basket courses, check elective registrations
-        if is_basket:
+        if is_basket_course(course_code):
             elective_info = batch_info.get(('ELECTIVE', course_code))
             if elective_info:
                 required_capacity = elective_info['section_size']
@@ -195,176 +240,87 @@ def find_suitable_room(course_type, department, semester, day, start_slot, durat
             dept_info = batch_info.get((department, semester))
             if dept_info:
                 required_capacity = dept_info['section_size']
+    return required_capacity
+
+def find_suitable_room(course_type, department, semester, day, start_slot, duration, room_index, batch_info, timetable, course_code="", used_rooms=None, booked=None):
+    """Find suitable room(s) considering batch sizes and avoiding room conflicts.
+    
+    Rooms come from a RoomIndex; ids of rooms this call books are appended
+    to `booked` (a basket course may instead share a room already holding it).
+    """
+    if not room_index:
+        return "DEFAULT_ROOM"
+    
+    required_capacity = get_required_capacity(batch_info, department, semester, course_code)
+    is_basket = is_basket_course(course_code)
 
     used_room_ids = set() if used_rooms is None else used_rooms
+    window = window_mask(start_slot, duration)
+    booked = [] if booked is None else booked
+
+    def take(room_id):
+        room_index.occupy(room_id, day, window)
+        booked.append(room_id)
+        return room_id
 
     # Special handling for labs to get adjacent rooms if needed
     if course_type in ['COMPUTER_LAB', 'HARDWARE_LAB']:
         dept_info = batch_info.get((department, semester))
         if dept_info and dept_info['total'] > 35:  # Standard lab capacity
-            # Try to find adjacent lab rooms
-            for room_id, room in rooms.items():
-                if room_id in used_room_ids or room['type'].upper() != course_type:
-                    continue
-                    
-                # Check if this room is available
-                slots_free = True
-                for i in range(duration):
-                    if start_slot + i in room['schedule'][day]:
-                        slots_free = False
-                        break
-                
-                if slots_free:
-                    # Try to find an adjacent room
-                    adjacent_room = find_adjacent_lab_room(room_id, rooms)
-                    if adjacent_room and adjacent_room not in used_room_ids:
-                        # Check if adjacent room is also available
-                        adjacent_free = True
-                        for i in range(duration):
-                            if start_slot + i in rooms[adjacent_room]['schedule'][day]:
-                                adjacent_free = False
-                                break
-                        
-                        if adjacent_free:
-                            # Mark both rooms as used
-                            for i in range(duration):
-                                room['schedule'][day].add(start_slot + i)
-                                rooms[adjacent_room]['schedule'][day].add(start_slot + i)
-                            return f"{room_id},{adjacent_room}"  # Return both room IDs
+            # Try to find a pair of adjacent lab rooms that are both free
+            pair = room_index.find_pair(course_type, day, window, used_room_ids)
+            if pair:
+                # Mark both rooms as used
+                room_id, adjacent_room = pair
+                take(room_id)
+                take(adjacent_room)
+                return f"{room_id},{adjacent_room}"  # Return both room IDs
                             
-        # If we don't need two rooms or couldn't find adjacent ones, use regular allocation
-        return try_room_allocation(rooms, course_type, required_capacity, day, start_slot, duration, used_room_ids)
-
-    # For lectures and basket courses, try different room types in priority order
-    if course_type in ['LEC', 'TUT', 'SS'] or is_basket:
-        # First try regular lecture rooms
-        lecture_rooms = {rid: room for rid, room in rooms.items() 
-                        if 'LECTURE_ROOM' in room['type'].upper()}
-        
-        # Then try large seater rooms 
-        seater_rooms = {rid: room for rid, room in rooms.items()
-                       if 'SEATER' in room['type'].upper()}
-        
-        # For basket courses, need special room allocation
-        if is_basket:
-            basket_group = get_basket_group(course_code)
-            basket_used_rooms = set()
-            basket_group_rooms = {}  # Track rooms already allocated to this basket group
-            
-            # Track room usage count
-            room_usage = {rid: sum(len(room['schedule'][d]) for d in range(len(DAYS))) 
-                         for rid, room in rooms.items()}
-            
-            # Sort lecture rooms by usage count
-            sorted_lecture_rooms = dict(sorted(lecture_rooms.items(), 
-                                             key=lambda x: room_usage[x[0]]))
-            sorted_seater_rooms = dict(sorted(seater_rooms.items(),
-                                            key=lambda x: room_usage[x[0]]))
-            
-            # Check room availability for the sorted rooms
-            for room_dict in [sorted_lecture_rooms, sorted_seater_rooms]:
-                for room_id, room in room_dict.items():
-                    is_used = False
-                    for slot in range(start_slot, start_slot + duration):
-                        if slot in rooms[room_id]['schedule'][day]:
-                            # Check if room is used by any course from same basket group
-                            if slot in timetable[day]:
-                                slot_data = timetable[day][slot]
-                                if (slot_data['classroom'] == room_id and 
-                                    slot_data['type'] is not None):
-                                    slot_code = slot_data.get('code', '')
-                                    if get_basket_group(slot_code) == basket_group:
-                                        basket_group_rooms[slot_code] = room_id
-                                    else:
-                                        basket_used_rooms.add(room_id)
-                            is_used = True
-                            break
-                    
-                    # Room is free for this time slot
-                    if not is_used and room_id not in basket_used_rooms:
-                        if 'capacity' in room and room['capacity'] >= required_capacity:
-                            # Mark slots as used
-                            for i in range(duration):
-                                room['schedule'][day].add(start_slot + i)
-                            return room_id
-            
-            # If no unused room found, try existing basket group rooms
-            if course_code in basket_group_rooms:
-                return basket_group_rooms[course_code]
-            
-            # Try remaining rooms through regular allocation
-            room_id = try_room_allocation(lecture_rooms, 'LEC', required_capacity,
-                                        day, start_slot, duration, basket_used_rooms)
-            
-            if not room_id:
-                room_id = try_room_allocation(seater_rooms, 'LEC', required_capacity,
-                                            day, start_slot, duration, basket_used_rooms)
-            
-            if room_id:
-                basket_group_rooms[course_code] = room_id
-            
-            return room_id
-
-        # For non-basket courses, use original logic
-        room_id = try_room_allocation(lecture_rooms, 'LEC', required_capacity,
-                                    day, start_slot, duration, used_room_ids)
-        if not room_id:
-            room_id = try_room_allocation(seater_rooms, 'LEC', required_capacity,
-                                        day, start_slot, duration, used_room_ids)
-        return room_id
-    
-    # For labs, use existing logic
-    return try_room_allocation(rooms, course_type, required_capacity,
-                             day, start_slot, duration, used_room_ids)
-
-def try_room_allocation(rooms, course_type, required_capacity, day, start_slot, duration, used_room_ids):
-    """Helper function to try allocating rooms of a certain type"""
-    for room_id, room in rooms.items():
-        if room_id in used_room_ids or room['type'].upper() == 'LIBRARY':
-            continue
-            
-        # For lectures and tutorials, only use lecture rooms and seater rooms
-        if course_type in ['LEC', 'TUT', 'SS']:
-            if not ('LECTURE_ROOM' in room['type'].upper() or 'SEATER' in room['type'].upper()):
-                continue
-        # For labs, match lab type exactly
-        elif course_type == 'COMPUTER_LAB' and room['type'].upper() != 'COMPUTER_LAB':
-            continue
-        elif course_type == 'HARDWARE_LAB' and room['type'].upper() != 'HARDWARE_LAB':
-            continue
-            
-        # Check capacity except for labs which can be split into batches
-        if course_type not in ['COMPUTER_LAB', 'HARDWARE_LAB'] and room['capacity'] < required_capacity:
-            continue
+        # If we don't need two rooms or couldn't find adjacent ones, use a single lab;
+        # labs skip the capacity check because batches can be split
+        room_id = room_index.find(course_type, 0, day, window, used_room_ids)
+        return take(room_id) if room_id else None
 
-        # Check availability
-        slots_free = True
-        for i in range(duration):
-            if start_slot + i in room['schedule'][day]:
-                slots_free = False
-                break
-                
-        if slots_free:
-            for i in range(duration):
-                room['schedule'][day].add(start_slot + i)
-            return room_id
+    # For basket courses, need special room allocation
+    if is_basket:
+        basket_group = get_basket_group(course_code)
+        basket_used_rooms = set()
+        basket_group_rooms = {}  # Track rooms already allocated to this basket group
+
+        # Least used lecture rooms first, then large seater rooms
+        for room_type in ['LECTURE_ROOM', 'SEATER']:
+            for room_id in room_index.rooms_by_usage(room_type):
+                room = room_index.rooms[room_id]
+                busy = room['schedule'][day] & window
+                if busy:
+                    # Check if room is used by any course from same basket group
+                    slot = lowest_slot(busy)
+                    if timetable and slot in timetable[day]:
+                        slot_data = timetable[day][slot]
+                        if (slot_data['classroom'] == room_id and 
+                            slot_data['type'] is not None):
+                            slot_code = slot_data.get('code', '')
+                            if get_basket_group(slot_code) == basket_group:
+                                basket_group_rooms[slot_code] = room_id
+                            else:
+                                basket_used_rooms.add(room_id)
                 
-    return None
+                # Room is free for this time slot
+                elif room_id not in basket_used_rooms:
+                    if room['capacity'] >= required_capacity:
+                        return take(room_id)
+        
+        # If no unused room found, try existing basket group rooms
+        if course_code in basket_group_rooms:
+            return basket_group_rooms[course_code]
+        return None
 
-def get_required_room_type(course):
-    """Determine required room type based on course attributes"""
-    if pd.notna(course['P']) and course['P'] > 0:
-        course_code = str(course['Course Code']).upper()
-        # For CS courses, use computer labs
-        if 'CS' in course_code or 'DS' in course_code:
-            return 'COMPUTER_LAB'
-        # For EC courses, use hardware labs
-        elif 'EC' in course_code:
-            return 'HARDWARE_LAB'
-        return 'COMPUTER_LAB'  # Default to computer lab if unspecified
-    else:
-        # For lectures, tutorials, and self-study
-        return 'LECTURE_ROOM'
+    # Lectures, tutorials and self-study: best-fit lecture room, then large seater rooms
+    for room_type in ['LECTURE_ROOM', 'SEATER']:
+        room_id = room_index.find(room_type, required_capacity, day, window, used_room_ids)
+        if room_id:
+            return take(room_id)
+    return None
 
 # Add this function to help identify basket courses
 def is_basket_course(code):
@@ -377,47 +333,6 @@ def get_basket_group(code):
         return code.split('-')[0]
     return None
 
-def get_basket_group_slots(timetable, day, basket_group):
-    """Find existing slots with courses from same basket group"""
-    basket_slots = []
-    for slot_idx, slot in timetable[day].items():
-        code = slot.get('code', '')
-        if code and get_basket_group(code) == basket_group:
-            basket_slots.append(slot_idx)
-    return basket_slots
-
-# Load data from CSV with robust error handling
-try:
-    # Try different encodings and handle BOM
-    encodings_to_try = ['utf-8-sig', 'utf-8', 'cp1252']
-    df = None
-    last_error = None
-    
-    for encoding in encodings_to_try:
-        try:
-            df = pd.read_csv('tt data/combined.csv', encoding=encoding)
-            # Convert empty strings and 'nan' strings to actual NaN
-            df = df.replace(r'^\s*$', pd.NA, regex=True)
-            df = df.replace('nan', pd.NA)
-            break
-        except UnicodeDecodeError:
-            continue
-        except Exception as e:
-            last_error = e
-            continue
-            
-    if df is None:
-        print(f"Error: Unable to read combined.csv. Please check the file format.\nDetails: {str(last_error)}")
-        exit()
-        
-except Exception as e:
-    print(f"Error: Failed to load combined.csv.\nDetails: {str(e)}")
-    exit()
-
-if df.empty:
-    print("Error: No data found in combined.csv")
-    exit()
-
 def is_break_time(slot, semester=None):
     """Check if a time slot falls within break times"""
     global lunch_breaks
@@ -440,134 +355,141 @@ def is_break_time(slot, semester=None):
     
     return morning_break or lunch_break
 
-def is_lecture_scheduled(timetable, day, start_slot, end_slot):
-    """Check if there's a lecture scheduled in the given time range"""
-    for slot in range(start_slot, end_slot):
-        if (slot < len(timetable[day]) and 
-            timetable[day][slot]['type'] and 
-            timetable[day][slot]['type'] in ['LEC', 'LAB', 'TUT']):
-            return True
-    return False
-
-def calculate_required_slots(course):
-    """Calculate how many slots needed based on L, T, P, S values and credits"""
-    l = float(course['L']) if pd.notna(course['L']) else 0  # Lecture credits
-    t = int(course['T']) if pd.notna(course['T']) else 0    # Tutorial hours
-    p = int(course['P']) if pd.notna(course['P']) else 0    # Lab hours
-    s = int(course['S']) if pd.notna(course['S']) else 0    # Self study hours
-    c = int(course['C']) if pd.notna(course['C']) else 0    # Total credits
-    
-    # Check if course is self-study only
-    if s > 0 and l == 0 and t == 0 and p == 0:
-        return 0, 0, 0, 0
-        
-    # Calculate number of lecture sessions based on credits
-    lecture_sessions = 0
-    if l > 0:
-        # For 3 credits = 2 sessions of 1.5 hours each
-        # For 2 credits = 1 session of 1.5 hours plus a 1 hour session
-        # For 1 credit = 1 session of 1.5 hours
-        lecture_sessions = max(1, round(l * 2/3))  # Scale credits to sessions
-    
-    # Other calculations remain the same
-    tutorial_sessions = t  
-    lab_sessions = p // 2  # 2 hours per lab session
-    self_study_sessions = s // 4 if (l > 0 or t > 0 or p > 0) else 0
-    
-    return lecture_sessions, tutorial_sessions, lab_sessions, self_study_sessions
+def create_section_state():
+    """Empty timetable for one section plus the occupancy bitmasks used for probes"""
+    return {
+        'timetable': {day: {slot: {'type': None, 'code': '', 'name': '', 'faculty': '', 'classroom': ''}
+                            for slot in range(len(TIME_SLOTS))} for day in range(len(DAYS))},
+        'busy': [0] * len(DAYS),          # Slots taken by any activity
+        'teaching': [0] * len(DAYS),      # Slots taken by LEC/LAB/TUT
+        'course_starts': Occupancy(len(DAYS)),  # Start slots of LEC/TUT sessions per course code
+        'faculty_components': {},         # (faculty, day) -> codes of LEC/LAB/TUT sessions
+        'basket_days': {}                 # basket group -> sessions per day
+    }
 
-def select_faculty(faculty_str):
-    """Select a faculty from potentially multiple options."""
-    if '/' in faculty_str:
-        # Split by slash and strip whitespace
-        faculty_options = [f.strip() for f in faculty_str.split('/')]
-        return faculty_options[0]  # Take first faculty as default
-    return faculty_str
+def mark_session(section_state, professor_schedule, faculty, day, start_slot, duration,
+                 activity_type, code, name, classroom):
+    """Write a session into the section timetable and update every occupancy mask"""
+    timetable = section_state['timetable']
+    for i in range(duration):
+        timetable[day][start_slot+i]['type'] = activity_type
+        timetable[day][start_slot+i]['code'] = code if i == 0 else ''
+        timetable[day][start_slot+i]['name'] = name if i == 0 else ''
+        timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
+        timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
+
+    window = window_mask(start_slot, duration)
+    professor_schedule.occupy(faculty, day, window)
+    section_state['busy'][day] |= window
+    if activity_type in ['LEC', 'LAB', 'TUT']:
+        section_state['teaching'][day] |= window
+        section_state['faculty_components'].setdefault((faculty, day), []).append(code)
+    if activity_type in ['LEC', 'TUT']:
+        section_state['course_starts'].occupy(code, day, window_mask(start_slot, 1))
+
+    basket_group = get_basket_group(code)
+    if basket_group:
+        counts = section_state['basket_days'].setdefault(basket_group, [0] * len(DAYS))
+        counts[day] += 1
+
+def unmark_session(section_state, professor_schedule, faculty, day, start_slot, duration,
+                   activity_type, code):
+    """Remove a session written by mark_session from the timetable and occupancy masks"""
+    timetable = section_state['timetable']
+    for i in range(duration):
+        timetable[day][start_slot+i] = {'type': None, 'code': '', 'name': '', 'faculty': '', 'classroom': ''}
+
+    window = window_mask(start_slot, duration)
+    professor_schedule.release(faculty, day, window)
+    section_state['busy'][day] &= ~window
+    if activity_type in ['LEC', 'LAB', 'TUT']:
+        section_state['teaching'][day] &= ~window
+        section_state['faculty_components'][(faculty, day)].remove(code)
+    if activity_type in ['LEC', 'TUT']:
+        section_state['course_starts'].release(code, day, window_mask(start_slot, 1))
+
+    basket_group = get_basket_group(code)
+    if basket_group:
+        section_state['basket_days'][basket_group][day] -= 1
+
+def is_lecture_scheduled(section_state, day, start_slot, end_slot):
+    """Check if there's a lecture scheduled in the given time range"""
+    return bool(section_state['teaching'][day] & span_mask(start_slot, end_slot, len(TIME_SLOTS)))
 
-def check_faculty_daily_components(professor_schedule, faculty, day, department, semester, section, timetable, course_code=None, activity_type=None):
+def check_faculty_daily_components(section_state, faculty, day, course_code=None):
     """Check faculty/course scheduling constraints for the day"""
     component_count = 0
-    faculty_courses = set()  # Track faculty's courses 
+    faculty_courses = set()  # Track faculty's basket courses
     
-    # Check all slots for this day
-    for slot in timetable[day].values():
-        if slot['faculty'] == faculty and slot['type'] in ['LEC', 'LAB', 'TUT']:
-            slot_code = slot.get('code', '')
-            if slot_code:
-                # For non-basket courses
-                if not is_basket_course(slot_code):
-                    component_count += 1
-                # For basket courses, only count if not already counted
-                elif slot_code not in faculty_courses:
-                    component_count += 1
-                    faculty_courses.add(slot_code)
+    for slot_code in section_state['faculty_components'].get((faculty, day), []):
+        if slot_code:
+            # For non-basket courses
+            if not is_basket_course(slot_code):
+                component_count += 1
+            # For basket courses, only count if not already counted
+            elif slot_code not in faculty_courses:
+                component_count += 1
+                faculty_courses.add(slot_code)
                     
     # Special handling for basket courses - allow parallel scheduling
     if course_code and is_basket_course(course_code):
         basket_group = get_basket_group(course_code)
-        existing_slots = get_basket_group_slots(timetable, day, basket_group)
-        if existing_slots:
+        if section_state['basket_days'].get(basket_group, [0] * len(DAYS))[day]:
             # For basket courses, check only non-basket components
             return component_count < 3  # Allow more flexibility for basket courses
     
     return component_count < 2  # Keep max 2 components per day limit for regular courses
 
-def check_faculty_course_gap(professor_schedule, timetable, faculty, course_code, day, start_slot):
+def check_faculty_course_gap(professor_schedule, section_state, faculty, course_code, day, start_slot):
     """Check if there is sufficient gap (3 hours) between sessions of same course"""
     min_gap_hours = 3
     slots_per_hour = 2  # Assuming 30-min slots
     required_gap = min_gap_hours * slots_per_hour
     
-    # Check previous slots
-    for i in range(max(0, start_slot - required_gap), start_slot):
-        if i in professor_schedule[faculty][day]:
-            slot_data = timetable[day][i]
-            if slot_data['code'] == course_code and slot_data['type'] in ['LEC', 'TUT']:
-                return False
-                
-    # Check next slots  
-    for i in range(start_slot + 1, min(len(TIME_SLOTS), start_slot + required_gap)):
-        if i in professor_schedule[faculty][day]:
-            slot_data = timetable[day][i]
-            if slot_data['code'] == course_code and slot_data['type'] in ['LEC', 'TUT']:
-                return False
+    # Previous and next slots within the gap, excluding the start slot itself
+    gap_window = (span_mask(start_slot - required_gap, start_slot, len(TIME_SLOTS)) |
+                  span_mask(start_slot + 1, start_slot + required_gap, len(TIME_SLOTS)))
+    course_starts = section_state['course_starts'].get(course_code, day)
+    return not (course_starts & gap_window & professor_schedule.get(faculty, day))
+
+def parse_reserved_slots(df):
+    """Reserved (start, end) times per day and (department, semesters) key"""
+    reserved = {day: {} for day in DAYS}
     
-    return True
+    for _, row in df.iterrows():
+        day = row['Day']
+        start = datetime.strptime(row['Start Time'], '%H:%M').time()
+        end = datetime.strptime(row['End Time'], '%H:%M').time()
+        department = str(row['Department'])
+        # Handle semester sections (e.g., "4" matches "4A" and "4B")
+        semesters = []
+        for s in str(row['Semester']).split(';'):
+            s = s.strip()
+            if s.isdigit():  # If just a number like "4"
+                base_sem = int(s)  
+                semesters.extend([f"{base_sem}A", f"{base_sem}B", str(base_sem)])
+            else:  # If already has section like "4A"
+                semesters.append(s)
+        
+        key = (department, tuple(semesters))
+        if day not in reserved:
+            reserved[day] = {}
+        if key not in reserved[day]:
+            reserved[day][key] = []
+            
+        reserved[day][key].append((start, end))
+    return reserved
 
 def load_reserved_slots():
-    """Load reserved time slots from CSV file"""
+    """Load reserved time slots from CSV file (shared through input_cache, do not modify)"""
     try:
         reserved_slots_path = os.path.join('tt data', 'reserved_slots.csv')
         if not os.path.exists(reserved_slots_path):
             print("Warning: reserved_slots.csv not found in uploads, no slots will be reserved")
             return {day: {} for day in DAYS}
             
-        df = pd.read_csv(reserved_slots_path)
-        reserved = {day: {} for day in DAYS}
-        
-        for _, row in df.iterrows():
-            day = row['Day']
-            start = datetime.strptime(row['Start Time'], '%H:%M').time()
-            end = datetime.strptime(row['End Time'], '%H:%M').time()
-            department = str(row['Department'])
-            # Handle semester sections (e.g., "4" matches "4A" and "4B")
-            semesters = []
-            for s in str(row['Semester']).split(';'):
-                s = s.strip()
-                if s.isdigit():  # If just a number like "4"
-                    base_sem = int(s)  
-                    semesters.extend([f"{base_sem}A", f"{base_sem}B", str(base_sem)])
-                else:  # If already has section like "4A"
-                    semesters.append(s)
-            
-            key = (department, tuple(semesters))
-            if day not in reserved:
-                reserved[day] = {}
-            if key not in reserved[day]:
-                reserved[day][key] = []
-                
-            reserved[day][key].append((start, end))
-        return reserved
+        # Keyed by DAYS as well since the empty per-day entries come from the config
+        return input_cache.get_derived('reserved', ('reserved', tuple(DAYS)), parse_reserved_slots)
     except Exception as e:
         print(f"Warning: Error loading reserved slots: {str(e)}")
         return {day: {} for day in DAYS}
@@ -591,31 +513,63 @@ def is_slot_reserved(slot, day, semester, department, reserved_slots):
                         return True
     return False
 
-def load_faculty_preferences():
-    """Load faculty scheduling preferences from CSV"""
+def build_break_masks(semesters):
+    """Precompute the break-time bitmask for each semester"""
+    break_masks = {}
+    for semester in semesters:
+        mask = 0
+        for slot_idx, slot in enumerate(TIME_SLOTS):
+            if is_break_time(slot, semester):
+                mask |= window_mask(slot_idx, 1)
+        break_masks[semester] = mask
+    return break_masks
+
+def build_blocked_masks(reserved_slots, department_semesters):
+    """Precompute per-(department, semester) day bitmasks of break and reserved slots.
+    
+    Must run after load_reserved_slots and calculate_lunch_breaks so later
+    checks are a single lookup instead of per-slot time comparisons.
+    """
+    break_masks = build_break_masks({semester for _, semester in department_semesters})
+    blocked = {}
+    for department, semester in department_semesters:
+        week = []
+        for day in range(len(DAYS)):
+            mask = break_masks[semester]
+            for slot_idx, slot in enumerate(TIME_SLOTS):
+                if is_slot_reserved(slot, DAYS[day], semester, department, reserved_slots):
+                    mask |= window_mask(slot_idx, 1)
+            week.append(mask)
+        blocked[(department, semester)] = week
+    return blocked
+
+def parse_faculty_preferences(df):
+    """Preferred days and (start, end) time ranges per faculty name"""
     preferences = {}
+    for row in df.to_dict('records'):
+        preferred_days = [d.strip() for d in row['Preferred Days'].split(';')] if row['Preferred Days'] else []
+        preferred_times = []
+        if row['Preferred Times']:
+            time_ranges = row['Preferred Times'].split(';')
+            for time_range in time_ranges:
+                start, end = time_range.split('-')
+                start_time = datetime.strptime(start.strip(), '%H:%M').time()
+                end_time = datetime.strptime(end.strip(), '%H:%M').time()
+                preferred_times.append((start_time, end_time))
+        
+        preferences[row['Name']] = {
+            'preferred_days': preferred_days,
+            'preferred_times': preferred_times
+        }
+    return preferences
+
+def load_faculty_preferences():
+    """Load faculty scheduling preferences from CSV (shared through input_cache, do not modify)"""
     try:
-        with open('tt data/FACULTY.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                preferred_days = [d.strip() for d in row['Preferred Days'].split(';')] if row['Preferred Days'] else []
-                preferred_times = []
-                if row['Preferred Times']:
-                    time_ranges = row['Preferred Times'].split(';')
-                    for time_range in time_ranges:
-                        start, end = time_range.split('-')
-                        start_time = datetime.strptime(start.strip(), '%H:%M').time()
-                        end_time = datetime.strptime(end.strip(), '%H:%M').time()
-                        preferred_times.append((start_time, end_time))
-                
-                preferences[row['Name']] = {
-                    'preferred_days': preferred_days,
-                    'preferred_times': preferred_times
-                }
+        return input_cache.get_derived('faculty', 'preferences', parse_faculty_preferences)
     except FileNotFoundError:
         print("Warning: FACULTY.csv not found, proceeding without faculty preferences")
         return {}
-    return preferences
 
 def is_preferred_slot(faculty, day, time_slot, faculty_preferences):
     """Check if a time slot is within faculty's preferences"""
@@ -638,55 +592,29 @@ def is_preferred_slot(faculty, day, time_slot, faculty_preferences):
         
     return True  # No time preferences specified
 
-def get_course_priority(course):
-    """Calculate course scheduling priority based on constraints"""
-    priority = 0
-    code = str(course['Course Code'])
-    
-    # Give regular course labs highest priority with much higher weight
-    if pd.notna(course['P']) and course['P'] > 0 and not is_basket_course(code):
-        priority += 10  # Increased from 5 to 10 for regular labs
-        if 'CS' in code or 'EC' in code:  # Extra priority for CS/EC labs
-            priority += 2
-    elif is_basket_course(code):
-        priority += 1  # Keep lowest priority for basket courses
-    elif pd.notna(course['L']) and course['L'] > 2:
-        priority += 3  # Regular lectures priority
-    elif pd.notna(course['T']) and course['T'] > 0:
-        priority += 2  # Tutorial priority
-    return priority
-
-def get_best_slots(timetable, professor_schedule, faculty, day, duration, reserved_slots, semester, department, faculty_preferences):
+def get_best_slots(section_state, professor_schedule, faculty, day, duration, blocked_slots, semester, department, faculty_preferences):
     """Find best available consecutive slots in a day considering faculty preferences"""
     best_slots = []
     preferred_slots = []
+    timetable = section_state['timetable']
+    
+    # Different handling for LAB vs other activities
+    if duration == LAB_DURATION:
+        # For labs, block slots even if they have basket courses
+        # This ensures labs get priority over basket courses
+        section_busy = section_state['busy'][day]
+    else:
+        # Original logic for lectures/tutorials: basket course starts don't block
+        section_busy = section_state['busy'][day]
+        for slot, slot_data in timetable[day].items():
+            if slot_data['type'] is not None and is_basket_course(slot_data.get('code', '')):
+                section_busy &= ~window_mask(slot, 1)
+    # Breaks and reservations come from the precomputed mask
+    blocked = (section_busy | professor_schedule.get(faculty, day) |
+               blocked_slots[(department, semester)][day])
     
     for start_slot in range(len(TIME_SLOTS) - duration + 1):
-        slots_free = True
-        # Check each slot in the duration
-        for i in range(duration):
-            current_slot = start_slot + i
-            # Different handling for LAB vs other activities
-            if duration == LAB_DURATION:
-                # For labs, block slots even if they have basket courses
-                # This ensures labs get priority over basket courses
-                if (current_slot in professor_schedule[faculty][day] or
-                    timetable[day][current_slot]['type'] is not None or  # Block any existing schedule
-                    is_break_time(TIME_SLOTS[current_slot], semester) or
-                    is_slot_reserved(TIME_SLOTS[current_slot], DAYS[day], semester, department, reserved_slots)):
-                    slots_free = False
-                    break
-            else:
-                # Original logic for lectures/tutorials
-                if (current_slot in professor_schedule[faculty][day] or
-                    (timetable[day][current_slot]['type'] is not None and
-                     not is_basket_course(timetable[day][current_slot].get('code', ''))) or
-                    is_break_time(TIME_SLOTS[current_slot], semester) or 
-                    is_slot_reserved(TIME_SLOTS[current_slot], DAYS[day], semester, department, reserved_slots)):
-                    slots_free = False
-                    break
-
-        if slots_free:
+        if not blocked & window_mask(start_slot, duration):
             # Prioritize morning slots (before lunch) for labs
             if duration == LAB_DURATION:
                 slot_time = TIME_SLOTS[start_slot][0]
@@ -703,6 +631,233 @@ def get_best_slots(timetable, professor_schedule, faculty, day, duration, reserv
     
     return preferred_slots + best_slots
 
+# Slot search modes: enumerate every feasible slot once, or sample randomly
+SEARCH_MODES = ['enumerate', 'random']
+MAX_RANDOM_ATTEMPTS = 1000
+
+# Scheduling engines: greedy commits each session immediately, csp backtracks
+ENGINES = ['greedy', 'csp']
+CSP_MAX_NODES = 20000      # Search nodes before the solver keeps its best result
+CSP_MAX_VALUES = 3         # Successful placements tried per session before leaving it out
+
+# Faculty load balancing after scheduling
+BALANCE_MAX_PASSES = 3     # Passes over all faculty; the first gives most of the gain
+BALANCE_TRIALS_PER_SESSION = 1.5  # Default trial budget per movable session, over all passes
+IDLE_SLOT_WEIGHT = 2       # Cost of one idle slot between a faculty member's sessions
+
+# Color palette for subjects (will cycle through these)
+SUBJECT_COLORS = [
+    "FFB6C1", "98FB98", "87CEFA", "DDA0DD", "F0E68C", 
+    "E6E6FA", "FFDAB9", "B0E0E6", "FFA07A", "D8BFD8",
+    "AFEEEE", "F08080", "90EE90", "ADD8E6", "FFB6C1"
+]
+
+# Add specific colors for basket groups
+BASKET_GROUP_COLORS = {
+    'B1': "FF9999",  # Light red
+    'B2': "99FF99",  # Light green  
+    'B3': "9999FF",  # Light blue
+    'B4': "FFFF99",  # Light yellow
+    'B5': "FF99FF",  # Light magenta
+    'B6': "99FFFF",  # Light cyan
+    'B7': "FFB366",  # Light orange
+    'B8': "B366FF",  # Light purple
+    'B9': "66FFB3"   # Light mint
+}
+
+def slot_rejection(context, section, session, day, start_slot):
+    """Why a session cannot start at (day, start_slot) ignoring rooms, or None when it can"""
+    section_state = section['state']
+    professor_schedule = context['professor_schedule']
+    faculty = session['faculty']
+    code = session['code']
+    activity_type = session['type']
+    window = window_mask(start_slot, session['duration'])
+    if activity_type in ['LEC', 'TUT']:
+        # Sessions of the same course need a gap and faculty have a daily limit
+        if not check_faculty_course_gap(professor_schedule, section_state, faculty, code, day, start_slot):
+            return 'gap_rule'
+        if not check_faculty_daily_components(section_state, faculty, day, code):
+            return 'daily_limit'
+    if section['blocked'][day] & window:
+        # The blocked mask combines lunch breaks with reserved slots
+        return 'break' if context['break_masks'][section['semester']] & window else 'reserved'
+    if section_state['busy'][day] & window:
+        return 'section_busy'
+    if not professor_schedule.is_free(faculty, day, window):
+        return 'faculty_busy'
+    # Ensure breaks between lectures
+    if activity_type == 'LEC' and is_lecture_scheduled(section_state, day,
+                                                       start_slot - BREAK_DURATION,
+                                                       start_slot + session['duration'] + BREAK_DURATION):
+        return 'lecture_gap'
+    return None
+
+def is_slot_feasible(context, section, session, day, start_slot):
+    """Check every non-room constraint for placing a session at (day, start_slot)"""
+    reason = slot_rejection(context, section, session, day, start_slot)
+    if reason:
+        context['metrics'].count(f"rejected_{reason}")
+    return reason is None
+
+def find_candidate_slots(context, section, session):
+    """Enumerate all feasible (day, start_slot) pairs once, best scored first.
+    
+    Labs keep the get_best_slots ordering over shuffled days. Other sessions
+    put faculty-preferred slots first, then lighter days for the section;
+    ties are broken by the seeded random generator so runs are reproducible.
+    """
+    rng = context['rng']
+    if session['type'] == 'LAB':
+        days = list(range(len(DAYS)))
+        rng.shuffle(days)
+        return [(day, start_slot) for day in days
+                for start_slot in get_best_slots(section['state'], context['professor_schedule'],
+                                                 session['faculty'], day, LAB_DURATION,
+                                                 context['blocked_slots'], section['semester'],
+                                                 section['department'], context['faculty_preferences'])]
+
+    scored = []
+    for day in range(len(DAYS)):
+        # Daily limit doesn't depend on the start slot, so check it once per day
+        if (session['type'] in ['LEC', 'TUT'] and
+                not check_faculty_daily_components(section['state'], session['faculty'], day, session['code'])):
+            context['metrics'].count('rejected_daily_limit')
+            continue
+        day_load = count_slots(section['state']['busy'][day])
+        for start_slot in range(len(TIME_SLOTS) - session['duration'] + 1):
+            if is_slot_feasible(context, section, session, day, start_slot):
+                preferred = is_preferred_slot(session['faculty'], day, TIME_SLOTS[start_slot],
+                                              context['faculty_preferences'])
+                scored.append(((0 if preferred else 1, day_load, rng.random()), day, start_slot))
+    scored.sort()
+    return [(day, start_slot) for _, day, start_slot in scored]
+
+def sample_candidate_slots(context, section, session):
+    """Legacy search: yield randomly sampled feasible slots up to MAX_RANDOM_ATTEMPTS"""
+    rng = context['rng']
+    for _ in range(MAX_RANDOM_ATTEMPTS):
+        day = rng.randint(0, len(DAYS)-1)
+        start_slot = rng.randint(0, len(TIME_SLOTS)-session['duration'])
+        if is_slot_feasible(context, section, session, day, start_slot):
+            yield day, start_slot
+
+def book_room(room_index, batch_info, room_type, department, semester, day, start_slot, duration,
+              timetable, course_code):
+    """Allocate a room for a window; returns (room_id, ids of rooms this call booked)"""
+    # Only rooms booked here are freed again on release
+    booked = []
+    room_id = find_suitable_room(room_type, department, semester, day, start_slot, duration,
+                                 room_index, batch_info, timetable, course_code, booked=booked)
+    if not room_id:
+        return None, []
+    return room_id, booked
+
+def basket_window(timetable, session, day, start_slot):
+    """Section timetable cells covering a basket session's window, in timetable shape.
+
+    find_suitable_room only reads these cells to let a basket course share a
+    room its group already holds, so they are all a broker claim needs to
+    apply the same rule; None for other courses.
+    """
+    if not is_basket_course(session['code']):
+        return None
+    return {day: {slot: timetable[day][slot]
+                  for slot in range(start_slot, start_slot + session['duration'])}}
+
+def assign_session(context, section, session, day, start_slot, tentative=False, prefix=''):
+    """Find a room for a session at (day, start_slot) and commit it; returns True on success.
+
+    Tentative assignments, which a search may still undo, count as attempts
+    but not as placements; their caller counts the ones it keeps. `prefix`
+    keeps a later phase's attempts apart from the scheduling counters.
+    """
+    room_type = session['room_type'] if session['type'] == 'LAB' else 'LECTURE_ROOM'
+    broker = context.get('broker')
+    metrics = context['metrics']
+    metrics.count(f'{prefix}placement_attempts')
+    if broker is not None:
+        # Faculty and rooms are shared with other departments: claim them centrally
+        claim = broker.claim(session['faculty'], section['department'], section['semester'],
+                             day, start_slot, session['duration'], room_type, session['code'],
+                             basket_window(section['state']['timetable'], session, day, start_slot))
+        if not claim['ok']:
+            # Learn about the other departments' bookings for later candidates
+            context['professor_schedule'].occupy(session['faculty'], day, claim['faculty_mask'])
+            metrics.count(f'{prefix}rejected_claim_conflict')
+            return False
+        room_id, booked_rooms = claim['room_id'], claim['rooms']
+    else:
+        with metrics.timer('room_search'):
+            room_id, booked_rooms = book_room(context['room_index'], context['batch_info'], room_type,
+                                              section['department'], section['semester'], day, start_slot,
+                                              session['duration'], section['state']['timetable'],
+                                              session['code'])
+        if not room_id:
+            metrics.count(f'{prefix}rejected_no_room')
+            return False
+
+    classroom = room_id if ',' not in str(room_id) else f"{room_id.split(',')[0]}+{room_id.split(',')[1]}"
+    # Mark slots as used
+    mark_session(section['state'], context['professor_schedule'], session['faculty'], day, start_slot,
+                 session['duration'], session['type'], session['code'], session['name'], classroom)
+    session['placement'] = {
+        'day': day,
+        'start_slot': start_slot,
+        'classroom': classroom,
+        'rooms': booked_rooms
+    }
+    if not tentative:
+        metrics.count('placed')
+    return True
+
+def release_session(context, section, session):
+    """Undo assign_session, freeing the section, faculty and room slots"""
+    placement = session.get('placement')
+    if not placement:
+        return
+    day, start_slot = placement['day'], placement['start_slot']
+    window = window_mask(start_slot, session['duration'])
+    unmark_session(section['state'], context['professor_schedule'], session['faculty'], day, start_slot,
+                   session['duration'], session['type'], session['code'])
+    if context.get('broker') is not None:
+        context['broker'].release(session['faculty'], day, start_slot, session['duration'],
+                                  placement['rooms'])
+    else:
+        for rid in placement['rooms']:
+            context['room_index'].release(rid, day, window)
+    session['placement'] = None
+
+def place_session(context, section, session, tentative=False):
+    """Place one session in the best feasible slot with a free room; returns True on success"""
+    if context['search_mode'] == 'random' and session['type'] != 'LAB':
+        candidates = sample_candidate_slots(context, section, session)
+    else:
+        candidates = find_candidate_slots(context, section, session)
+    
+    for day, start_slot in candidates:
+        if assign_session(context, section, session, day, start_slot, tentative):
+            return True
+    return False
+
+def has_free_room(context, section, session, day, start_slot):
+    """Whether book_room could find any room, as a cheap check before assigning.
+
+    Mirrors find_suitable_room's lookups without booking; basket courses may
+    share a room with their group and broker bookings are only known to the
+    broker, so both always pass.
+    """
+    if context.get('broker') is not None or is_basket_course(session['code']):
+        return True
+    room_index = context['room_index']
+    window = window_mask(start_slot, session['duration'])
+    room_type = session['room_type'] if session['type'] == 'LAB' else 'LECTURE_ROOM'
+    if room_type in ['COMPUTER_LAB', 'HARDWARE_LAB']:
+        return room_index.find(room_type, 0, day, window) is not None
+    capacity = get_required_capacity(context['batch_info'], section['department'], section['semester'],
+                                     session['code'])
+    return any(room_index.find(bucket, capacity, day, window) for bucket in ['LECTURE_ROOM', 'SEATER'])
+
 class UnscheduledComponent:
     def __init__(self, department, semester, code, name, faculty, component_type, sessions, section='', reason=''):
         self.department = department
@@ -727,659 +882,1156 @@ class UnscheduledComponent:
     def __hash__(self):
         return hash((self.department, self.semester, self.code, self.component_type, self.section))
 
-def generate_all_timetables():
-    global lunch_breaks
-    initialize_time_slots()  # Initialize time slots before using
-    reserved_slots = load_reserved_slots()
-    faculty_preferences = load_faculty_preferences()
-    workbooks = {}  # Dictionary to store workbook for each department
-    professor_schedule = {}   # Track professor assignments
-    rooms = load_rooms()
-    batch_info = load_batch_data()
-
-    # Add tracking for unscheduled components using a set
-    unscheduled_components = set()
-
-    # Color palette for subjects (will cycle through these)
-    subject_colors = [
-        "FFB6C1", "98FB98", "87CEFA", "DDA0DD", "F0E68C", 
-        "E6E6FA", "FFDAB9", "B0E0E6", "FFA07A", "D8BFD8",
-        "AFEEEE", "F08080", "90EE90", "ADD8E6", "FFB6C1"
-    ]
-
-    # Add specific colors for basket groups
-    basket_group_colors = {
-        'B1': "FF9999",  # Light red
-        'B2': "99FF99",  # Light green  
-        'B3': "9999FF",  # Light blue
-        'B4': "FFFF99",  # Light yellow
-        'B5': "FF99FF",  # Light magenta
-        'B6': "99FFFF",  # Light cyan
-        'B7': "FFB366",  # Light orange
-        'B8': "B366FF",  # Light purple
-        'B9': "66FFB3"   # Light mint
-    }
-
-    # Add a list to track self-study only courses
-    self_study_courses = []
-
-    # Get all unique semester numbers
-    all_semesters = sorted(set(int(str(sem)[0]) for sem in df['Semester'].unique()))
-    # Calculate lunch breaks dynamically
-    lunch_breaks = calculate_lunch_breaks(all_semesters)
-
+def prepare_courses(df):
+    """Add the per-course values the scheduler needs as columns, computed once for the whole catalog.
+
+    Columns: code, name, faculty_options (raw Faculty), faculty (first option),
+    lectures/tutorials/labs/self_study session counts, self_study_only,
+    priority, basket_group, room_type and scheduled (Schedule is Yes or blank).
+    """
+    courses = df.copy()
+    code = df['Course Code'].map(str)
+    faculty = df['Faculty'].map(str)
+    l = pd.to_numeric(df['L'], errors='coerce').fillna(0)                 # Lecture credits
+    t = np.trunc(pd.to_numeric(df['T'], errors='coerce').fillna(0)).astype(int)  # Tutorial hours
+    p = np.trunc(pd.to_numeric(df['P'], errors='coerce').fillna(0)).astype(int)  # Lab hours
+    s = np.trunc(pd.to_numeric(df['S'], errors='coerce').fillna(0)).astype(int)  # Self study hours
+
+    courses['code'] = code
+    courses['name'] = df['Course Name'].map(str)
+    courses['faculty_options'] = faculty
+    # Take the first of several slash-separated faculty as default
+    courses['faculty'] = faculty.where(~faculty.str.contains('/', regex=False),
+                                       faculty.str.split('/').str[0].str.strip())
+
+    # Self-study only courses get no sessions; they are listed under the timetable
+    self_study_only = (s > 0) & (l == 0) & (t == 0) & (p == 0)
+    courses['self_study_only'] = self_study_only
+    # 3 credits = 2 sessions of 1.5 hours, 2 credits = 1 session, 1 credit = 1 session
+    courses['lectures'] = np.where((l > 0) & ~self_study_only, np.maximum(1, np.round(l * 2 / 3)), 0).astype(int)
+    courses['tutorials'] = np.where(self_study_only, 0, t)
+    courses['labs'] = np.where(self_study_only, 0, p // 2)  # 2 hours per lab session
+    courses['self_study'] = np.where((l > 0) | (t > 0) | (p > 0), s // 4, 0)
+
+    # Basket courses look like B1-XXX; the group is the part before the dash
+    basket = code.str.startswith('B') & code.str.contains('-', regex=False)
+    courses['basket_group'] = code.str.split('-').str[0].where(basket, None)
+
+    # Regular labs first (CS/EC labs highest), then lectures, tutorials and baskets last
+    labs = (p > 0) & ~basket
+    cs_ec = code.str.contains('CS', regex=False) | code.str.contains('EC', regex=False)
+    courses['priority'] = np.select([labs & cs_ec, labs, basket, l > 2, t > 0], [12, 10, 1, 3, 2], 0)
+
+    # Labs need computer labs (hardware labs for EC courses); everything else a lecture room
+    upper_code = code.str.upper()
+    courses['room_type'] = np.select(
+        [p <= 0, upper_code.str.contains('CS', regex=False) | upper_code.str.contains('DS', regex=False),
+         upper_code.str.contains('EC', regex=False)],
+        ['LECTURE_ROOM', 'COMPUTER_LAB', 'HARDWARE_LAB'], 'COMPUTER_LAB')
+
+    courses['scheduled'] = (df['Schedule'].fillna('Yes').str.upper() == 'YES') | df['Schedule'].isna()
+    return courses
+
+# Prepared columns read by the scheduling loops, in itertuples order
+COURSE_FIELDS = ['code', 'name', 'faculty_options', 'faculty', 'lectures', 'tutorials', 'labs', 'self_study',
+                 'self_study_only', 'basket_group', 'room_type']
+
+def build_section_sessions(courses, section_title, course_faculty_assignments):
+    """Expand a section's prepared courses into the sessions to place, in greedy scheduling order"""
+    sessions = []
+
+    def add_sessions(count, activity_type, duration, code, name, faculty, room_type=None):
+        for _ in range(count):
+            sessions.append({
+                'section': section_title,
+                'code': code,
+                'name': name,
+                'faculty': faculty,
+                'type': activity_type,
+                'duration': duration,
+                'room_type': room_type,
+                'placement': None
+            })
+
+    # Process all courses - both lab and non-lab
+    for course in courses:
+        code = course.code
+        faculty = course.faculty
+
+        # Skip basket courses (B1, B2, etc)
+        if not any(code.startswith(f'B{i}') for i in range(1, 10)):
+            # For same course in different sections, try to use different faculty
+            if code in course_faculty_assignments:
+                # If multiple faculty available, try to pick a different one
+                if '/' in course.faculty_options:
+                    faculty_options = [f.strip() for f in course.faculty_options.split('/')]
+                    # Remove already assigned faculty
+                    available_faculty = [f for f in faculty_options
+                                         if f not in course_faculty_assignments[code]]
+                    if available_faculty:
+                        faculty = available_faculty[0]
+            else:
+                course_faculty_assignments[code] = [faculty]
+
+        add_sessions(course.lectures, 'LEC', LECTURE_DURATION, code, course.name, faculty)
+        add_sessions(course.tutorials, 'TUT', TUTORIAL_DURATION, code, course.name, faculty)
+        if course.labs > 0:
+            add_sessions(course.labs, 'LAB', LAB_DURATION, code, course.name, faculty, course.room_type)
+
+    # Self-study sessions (1 hour each) go after every other component
+    for course in courses:
+        add_sessions(course.self_study, 'SS', SELF_STUDY_DURATION, course.code, course.name,
+                     course.faculty_options)
+
+    return sessions
+
+def build_sections(df, batch_info, blocked_slots, self_study_courses):
+    """Create every department/semester/section with its sessions and legend colors"""
+    df = prepare_courses(df)[['Department', 'Semester', 'P', 'priority', 'scheduled'] + COURSE_FIELDS]
+    # Filter out courses marked as not to be scheduled and split the rest by department/semester once
+    semester_courses = dict(list(df[df['scheduled']].groupby(['Department', 'Semester'], sort=False)))
+    sections = []
     for department in df['Department'].unique():
-        # Create new workbook for each department
-        wb = Workbook()
-        wb.remove(wb.active)  # Remove default sheet
-        workbooks[department] = wb
-        
         # Track assigned faculty for courses
         course_faculty_assignments = {}
         
         # Process all semesters for this department
         for semester in df[df['Department'] == department]['Semester'].unique():
-            # Filter out courses marked as not to be scheduled
-            courses = df[(df['Department'] == department) & 
-                        (df['Semester'] == semester) &
-                        ((df['Schedule'].fillna('Yes').str.upper() == 'YES') | 
-                         (df['Schedule'].isna()))].copy()
-            
-            if courses.empty:
+            courses = semester_courses.get((department, semester))
+            if courses is None:
                 continue
 
-            # First handle lab scheduling as a separate pass
-            lab_courses = courses[courses['P'] > 0].copy()
-            lab_courses['priority'] = lab_courses.apply(get_course_priority, axis=1)
-            lab_courses = lab_courses.sort_values('priority', ascending=False)
-
-            # Handle remaining courses after labs
-            non_lab_courses = courses[courses['P'] == 0].copy()
-            non_lab_courses['priority'] = non_lab_courses.apply(get_course_priority, axis=1)
-            non_lab_courses = non_lab_courses.sort_values('priority', ascending=False)
+            # First handle lab scheduling as a separate pass, then the remaining courses
+            lab_courses = courses[courses['P'] > 0].sort_values('priority', ascending=False)
+            non_lab_courses = courses[courses['P'] == 0].sort_values('priority', ascending=False)
 
             # Combine sorted courses with labs first
             courses = pd.concat([lab_courses, non_lab_courses])
+            ordered = list(courses[COURSE_FIELDS].itertuples(index=False, name='Course'))
 
             # Get section info
             dept_info = batch_info.get((department, semester))
             num_sections = dept_info['num_sections'] if dept_info else 1
 
             # First identify self-study only courses
-            for _, course in courses.iterrows():
-                l = int(course['L']) if pd.notna(course['L']) else 0
-                t = int(course['T']) if pd.notna(course['T']) else 0
-                p = int(course['P']) if pd.notna(course['P']) else 0
-                s = int(course['S']) if pd.notna(course['S']) else 0
-                
-                if s > 0 and l == 0 and t == 0 and p == 0:
+            for course in ordered:
+                if course.self_study_only:
                     self_study_courses.append({
-                        'code': str(course['Course Code']),
-                        'name': str(course['Course Name']),
-                        'faculty': str(course['Faculty']),
+                        'code': course.code,
+                        'name': course.name,
+                        'faculty': course.faculty_options,
                         'department': department,
                         'semester': semester
                     })
 
+            # Create a mapping for subject colors
+            subject_color_map = {}
+            course_faculty_map = {}  # For legend
+            color_idx = 0
+            
+            # Assign colors to each unique subject
+            for course in ordered:
+                code = course.code
+                if code not in subject_color_map and code and code != 'nan':
+                    if course.basket_group:
+                        # Use predefined basket group color
+                        subject_color_map[code] = BASKET_GROUP_COLORS.get(course.basket_group, SUBJECT_COLORS[color_idx % len(SUBJECT_COLORS)])
+                    else:
+                        subject_color_map[code] = SUBJECT_COLORS[color_idx % len(SUBJECT_COLORS)]
+                    course_faculty_map[code] = {
+                        'name': course.name,
+                        'faculty': course.faculty_options
+                    }
+                    color_idx += 1
+
+            # Sort courses by priority
+            courses = courses.sort_values('priority', ascending=False)
+            scheduled = list(courses[COURSE_FIELDS].itertuples(index=False, name='Course'))
+
             for section in range(num_sections):
                 section_title = f"{department}_{semester}" if num_sections == 1 else f"{department}_{semester}_{chr(65+section)}"
-                ws = wb.create_sheet(title=section_title)
-                
-                # Initialize timetable structure
-                timetable = {day: {slot: {'type': None, 'code': '', 'name': '', 'faculty': '', 'classroom': ''} 
-                         for slot in range(len(TIME_SLOTS))} for day in range(len(DAYS))}
-                
-                # Create a mapping for subject colors
-                subject_color_map = {}
-                course_faculty_map = {}  # For legend
-                color_idx = 0
-                
-                # Assign colors to each unique subject
-                for _, course in courses.iterrows():
-                    code = str(course['Course Code'])
-                    if code not in subject_color_map and code and code != 'nan':
-                        if is_basket_course(code):
-                            basket_group = get_basket_group(code)
-                            # Use predefined basket group color
-                            subject_color_map[code] = basket_group_colors.get(basket_group, subject_colors[color_idx % len(subject_colors)])
-                        else:
-                            subject_color_map[code] = subject_colors[color_idx % len(subject_colors)]
-                        course_faculty_map[code] = {
-                            'name': str(course['Course Name']),
-                            'faculty': str(course['Faculty'])
-                        }
-                        color_idx += 1
-
-                # Sort courses by priority
-                courses['priority'] = courses.apply(get_course_priority, axis=1)
-                courses = courses.sort_values('priority', ascending=False)
-
-                # Process all courses - both lab and non-lab
-                for _, course in courses.iterrows():
-                    code = str(course['Course Code'])
-                    name = str(course['Course Name'])
-                    faculty = str(course['Faculty'])
-                    
-                    # Skip basket courses (B1, B2, etc)
-                    if not any(code.startswith(f'B{i}') for i in range(1, 10)):
-                        # For same course in different sections, try to use different faculty
-                        if code in course_faculty_assignments:
-                            # If multiple faculty available, try to pick a different one
-                            if '/' in faculty:
-                                faculty_options = [f.strip() for f in faculty.split('/')] 
-                                # Remove already assigned faculty
-                                available_faculty = [f for f in faculty_options 
-                                                     if f not in course_faculty_assignments[code]]
-                                if available_faculty:
-                                    faculty = available_faculty[0]
-                                else:
-                                    faculty = select_faculty(faculty)
-                        else:
-                            faculty = select_faculty(faculty)
-                            course_faculty_assignments[code] = [faculty]
-                    else:
-                        faculty = select_faculty(faculty)
-                    
-                    lecture_sessions, tutorial_sessions, lab_sessions, _ = calculate_required_slots(course)
-                    
-                    if faculty not in professor_schedule:
-                        professor_schedule[faculty] = {day: set() for day in range(len(DAYS))}
-
-                    # Schedule lectures with tracking
-                    for _ in range(lecture_sessions):
-                        scheduled = False
-                        attempts = 0
-                        while not scheduled and attempts < 1000:
-                            day = random.randint(0, len(DAYS)-1)
-                            start_slot = random.randint(0, len(TIME_SLOTS)-LECTURE_DURATION)
-                            
-                            # Add check for faculty-course gap
-                            if not check_faculty_course_gap(professor_schedule, timetable, faculty, code, day, start_slot):
-                                attempts += 1
-                                continue
-                            
-                            # Check if any slot in the range is reserved
-                            slots_reserved = any(is_slot_reserved(TIME_SLOTS[start_slot + i], 
-                                                                DAYS[day],
-                                                                semester,
-                                                                department,
-                                                                reserved_slots) 
-                                               for i in range(LECTURE_DURATION))
-                            
-                            if slots_reserved:
-                                attempts += 1
-                                continue
-                            
-                            # Check faculty daily component limit and lecture constraints
-                            if not check_faculty_daily_components(professor_schedule, faculty, day, 
-                                                               department, semester, section, timetable,
-                                                               code, 'LEC'):
-                                attempts += 1
-                                continue
-                                
-                            # Check availability and ensure breaks between lectures
-                            slots_free = True
-                            for i in range(LECTURE_DURATION):
-                                current_slot = start_slot + i
-                                if (current_slot in professor_schedule[faculty][day] or 
-                                    timetable[day][current_slot]['type'] is not None or
-                                    is_break_time(TIME_SLOTS[current_slot], semester)):
-                                    slots_free = False
-                                    break
-                                
-                                # Check for lectures before this slot
-                                if current_slot > 0:
-                                    if is_lecture_scheduled(timetable, day, 
-                                                         max(0, current_slot - BREAK_DURATION), 
-                                                         current_slot):
-                                        slots_free = False
-                                        break
-                                
-                                # Check for lectures after this slot
-                                if current_slot < len(TIME_SLOTS) - 1:
-                                    if is_lecture_scheduled(timetable, day,
-                                                         current_slot + 1,
-                                                         min(len(TIME_SLOTS), 
-                                                             current_slot + BREAK_DURATION + 1)):
-                                        slots_free = False
-                                        break
-                            
-                            if slots_free:
-                                room_id = find_suitable_room('LECTURE_ROOM', department, semester, 
-                                                          day, start_slot, LECTURE_DURATION, 
-                                                          rooms, batch_info, timetable, code)
-                                
-                                if room_id:
-                                    classroom = room_id
-                                    
-                                    # Mark slots as used
-                                    for i in range(LECTURE_DURATION):
-                                        professor_schedule[faculty][day].add(start_slot+i)
-                                        timetable[day][start_slot+i]['type'] = 'LEC'
-                                        timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                        timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                        timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                        timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                    scheduled = True
-                            attempts += 1
-                        if not scheduled:
-                            unscheduled_components.add(
-                                UnscheduledComponent(department, semester, code, name, 
-                                                   faculty, 'LEC', 1, section)
-                            )
-
-                    # Schedule tutorials with tracking
-                    for _ in range(tutorial_sessions):
-                        scheduled = False
-                        attempts = 0
-                        while not scheduled and attempts < 1000:
-                            day = random.randint(0, len(DAYS)-1)
-                            
-                            # Add check for faculty-course gap
-                            if not check_faculty_course_gap(professor_schedule, timetable, faculty, code, day, start_slot):
-                                attempts += 1
-                                continue
-                            
-                            # Check faculty daily component limit for tutorials
-                            if not check_faculty_daily_components(professor_schedule, faculty, day,
-                                                               department, semester, section, timetable,
-                                                               code, 'TUT'):
-                                attempts += 1
-                                continue
-                                
-                            start_slot = random.randint(0, len(TIME_SLOTS)-TUTORIAL_DURATION)
-                            
-                            # Check if any slot in the range is reserved
-                            slots_reserved = any(is_slot_reserved(TIME_SLOTS[start_slot + i], 
-                                                                DAYS[day],
-                                                                semester,
-                                                                department,
-                                                                reserved_slots) 
-                                               for i in range(TUTORIAL_DURATION))
-                            
-                            if slots_reserved:
-                                attempts += 1
-                                continue
-                            
-                            # Check availability
-                            slots_free = True
-                            for i in range(TUTORIAL_DURATION):
-                                if (start_slot+i in professor_schedule[faculty][day] or 
-                                    timetable[day][start_slot+i]['type'] is not None or
-                                    is_break_time(TIME_SLOTS[start_slot+i], semester)):
-                                    slots_free = False
-                                    break
-                            
-                            if slots_free:
-                                room_id = find_suitable_room('LECTURE_ROOM', department, semester, 
-                                                          day, start_slot, TUTORIAL_DURATION, 
-                                                          rooms, batch_info, timetable, code)
-                                
-                                if room_id:
-                                    classroom = room_id
-                                    
-                                    # Mark slots as used
-                                    for i in range(TUTORIAL_DURATION):
-                                        professor_schedule[faculty][day].add(start_slot+i)
-                                        timetable[day][start_slot+i]['type'] = 'TUT'
-                                        timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                        timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                        timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                        timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                    scheduled = True
-                            attempts += 1
-                        if not scheduled:
-                            unscheduled_components.add(
-                                UnscheduledComponent(department, semester, code, name,
-                                                   faculty, 'TUT', 1, section)
-                            )
-
-                    # Schedule labs with tracking
-                    if lab_sessions > 0:
-                        room_type = get_required_room_type(course)
-                        for _ in range(lab_sessions):
-                            scheduled = False
-                            attempts = 0
-                            scheduling_reason = ""
-                            
-                            # Try each day in random order
-                            days = list(range(len(DAYS)))
-                            random.shuffle(days)
-                            
-                            for day in days:
-                                # Get all possible slots for this day
-                                possible_slots = get_best_slots(timetable, professor_schedule, 
-                                                              faculty, day, LAB_DURATION, 
-                                                              reserved_slots, semester, department, faculty_preferences)
-                                
-                                for start_slot in possible_slots:
-                                    room_id = find_suitable_room(room_type, department, semester,
-                                                               day, start_slot, LAB_DURATION,
-                                                               rooms, batch_info, timetable, code)
-                                    
-                                    if room_id:
-                                        classroom = room_id if ',' not in str(room_id) else f"{room_id.split(',')[0]}+{room_id.split(',')[1]}"
-                                        
-                                        # Mark slots as used
-                                        for i in range(LAB_DURATION):
-                                            professor_schedule[faculty][day].add(start_slot+i)
-                                            timetable[day][start_slot+i]['type'] = 'LAB'
-                                            timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                            timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                            timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                            timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                        scheduled = True
-                                        break
-                                
-                                if scheduled:
-                                    break
-                                
-                            if not scheduled:
-                                unscheduled_components.add(
-                                    UnscheduledComponent(department, semester, code, name,
-                                                       faculty, 'LAB', 1, section,
-                                                       "Could not find suitable room and time slot combination")
-                                )
-
-                # Schedule self-study sessions
-                for _, course in courses.iterrows():
-                    code = str(course['Course Code'])
-                    name = str(course['Course Name'])
-                    faculty = str(course['Faculty'])
-                    _, _, _, self_study_sessions = calculate_required_slots(course)
-                    
-                    if self_study_sessions > 0:
-                        if faculty not in professor_schedule:
-                            professor_schedule[faculty] = {day: set() for day in range(len(DAYS))}
-                        
-                        # Schedule each self-study session (1 hour each)
-                        for _ in range(self_study_sessions):
-                            scheduled = False
-                            attempts = 0
-                            while not scheduled and attempts < 1000:
-                                day = random.randint(0, len(DAYS)-1)
-                                start_slot = random.randint(0, len(TIME_SLOTS)-SELF_STUDY_DURATION)
-                                
-                                # Check if any slot in the range is reserved
-                                slots_reserved = any(is_slot_reserved(TIME_SLOTS[start_slot + i], 
-                                                                    DAYS[day],
-                                                                    semester,
-                                                                    department,
-                                                                    reserved_slots) 
-                                                   for i in range(SELF_STUDY_DURATION))
-                                
-                                if slots_reserved:
-                                    attempts += 1
-                                    continue
-                                
-                                # Check availability
-                                slots_free = True
-                                for i in range(SELF_STUDY_DURATION):
-                                    if (start_slot+i in professor_schedule[faculty][day] or 
-                                        timetable[day][start_slot+i]['type'] is not None or
-                                        is_break_time(TIME_SLOTS[start_slot+i], semester)):
-                                        slots_free = False
-                                        break
-                                
-                                if slots_free:
-                                    room_id = find_suitable_room('LECTURE_ROOM', department, semester, 
-                                                              day, start_slot, SELF_STUDY_DURATION, 
-                                                              rooms, batch_info, timetable, code)
-                                    
-                                    if room_id:
-                                        classroom = room_id
-                                        
-                                        # Mark slots as used
-                                        for i in range(SELF_STUDY_DURATION):
-                                            professor_schedule[faculty][day].add(start_slot+i)
-                                            timetable[day][start_slot+i]['type'] = 'SS'  # SS for Self Study
-                                            timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                            timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                            timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                            timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                        scheduled = True
-                                attempts += 1
-
-                # Write timetable to worksheet
-                header = ['Day'] + [f"{slot[0].strftime('%H:%M')}-{slot[1].strftime('%H:%M')}" for slot in TIME_SLOTS]
-                ws.append(header)
-                
-                header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-                header_font = Font(bold=True)
-                header_alignment = Alignment(horizontal='center', vertical='center')
-                
-                for cell in ws[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = header_alignment
-                
-                lec_fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-                lab_fill = PatternFill(start_color="98FB98", end_color="98FB98", fill_type="solid")
-                tut_fill = PatternFill(start_color="FFE4E1", end_color="FFE4E1", fill_type="solid")
-                ss_fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
-                break_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-                border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                              top=Side(style='thin'), bottom=Side(style='thin'))
-                
-                for day_idx, day in enumerate(DAYS):
-                    row_num = day_idx + 2
-                    ws.append([day])
-                    
-                    merge_ranges = []  # Track merge ranges for this row
-                    
-                    for slot_idx in range(len(TIME_SLOTS)):
-                        cell_value = ''
-                        cell_fill = None
-                        
-                        if is_break_time(TIME_SLOTS[slot_idx], semester):
-                            cell_value = "BREAK"
-                            cell_fill = break_fill
-                        elif timetable[day_idx][slot_idx]['type']:
-                            activity_type = timetable[day_idx][slot_idx]['type']
-                            code = timetable[day_idx][slot_idx]['code']
-                            classroom = timetable[day_idx][slot_idx]['classroom']
-                            faculty = timetable[day_idx][slot_idx]['faculty']
-                            
-                            # Only create content for start of activity
-                            if code:
-                                # Get duration based on activity type
-                                duration = {
-                                    'LEC': LECTURE_DURATION,
-                                    'LAB': LAB_DURATION,
-                                    'TUT': TUTORIAL_DURATION,
-                                    'SS': SELF_STUDY_DURATION
-                                }.get(activity_type, 1)
-                                
-                                # Use subject-specific color
-                                if code in subject_color_map:
-                                    cell_fill = PatternFill(start_color=subject_color_map[code],
-                                                          end_color=subject_color_map[code],
-                                                          fill_type="solid")
-                                else:
-                                    cell_fill = {
-                                        'LAB': lab_fill,
-                                        'TUT': tut_fill,
-                                        'SS': ss_fill,
-                                        'LEC': lec_fill
-                                    }.get(activity_type, lec_fill)
-                                
-                                if code and is_basket_course(code):
-                                    basket_group = get_basket_group(code)
-                                    # Get all courses from same basket in this slot
-                                    basket_codes = set()  # Use set to avoid duplicates
-                                    basket_details = {}
-                                    
-                                    # First collect all courses in this basket group
-                                    for slot_id, slot_data in timetable[day_idx].items():
-                                        slot_code = slot_data.get('code', '')
-                                        if (slot_data.get('type') == activity_type and 
-                                            get_basket_group(slot_code) == basket_group):
-                                            basket_codes.add(slot_code)  # Add to set instead of list
-                                            # Only store details if not already present
-                                            if slot_code not in basket_details:
-                                                basket_details[slot_code] = {
-                                                    'faculty': slot_data['faculty'],
-                                                    'room': slot_data['classroom']
-                                                }
-                                    
-                                    if basket_codes:
-                                        # Group header
-                                        basket_header = f"{basket_group} Courses\n"
-                                        # List of all unique course codes
-                                        codes_str = ', '.join(sorted(basket_codes))
-                                        # Course details with rooms (unique entries)
-                                        course_details = [
-                                            f"{code}: {details['faculty']} ({details['room']})"
-                                            for code, details in sorted(basket_details.items())
-                                            if code and details['faculty'] and details['room']
-                                        ]
-                                        
-                                        cell_value = f"{basket_header}{codes_str}\n" + "\n".join(course_details)
-                                else:
-                                    cell_value = f"{code} {activity_type}\n{classroom}\n{faculty}"
-                                
-                                # Create merge range
-                                if duration > 1:
-                                    start_col = get_column_letter(slot_idx + 2)
-                                    end_col = get_column_letter(slot_idx + duration + 1)
-                                    merge_range = f"{start_col}{row_num}:{end_col}{row_num}"
-                                    merge_ranges.append((merge_range, cell_fill))
-                        
-                        cell = ws.cell(row=row_num, column=slot_idx+2, value=cell_value)
-                        if cell_fill:
-                            cell.fill = cell_fill
-                        cell.border = border
-                        cell.alignment = Alignment(wrap_text=True, vertical='center', horizontal='center')
-                    
-                    # Apply merges after creating all cells in the row
-                    for merge_range, fill in merge_ranges:
-                        ws.merge_cells(merge_range)
-                        # Ensure merged cell has consistent formatting
-                        merged_cell = ws[merge_range.split(':')[0]]
-                        merged_cell.fill = fill
-                        merged_cell.alignment = Alignment(wrap_text=True, vertical='center', horizontal='center')
-
-                for col_idx in range(1, len(TIME_SLOTS)+2):
-                    col_letter = get_column_letter(col_idx)
-                    ws.column_dimensions[col_letter].width = 15
-                
-                for row in ws.iter_rows(min_row=2, max_row=len(DAYS)+1):
-                    ws.row_dimensions[row[0].row].height = 40
+                sections.append({
+                    'title': section_title,
+                    'department': department,
+                    'semester': semester,
+                    'index': section,
+                    'num_sections': num_sections,
+                    # Initialize timetable structure and its occupancy masks
+                    'state': create_section_state(),
+                    'blocked': blocked_slots[(department, semester)],
+                    'sessions': build_section_sessions(scheduled, section_title, course_faculty_assignments),
+                    'subject_color_map': subject_color_map,
+                    'course_faculty_map': course_faculty_map
+                })
+    return sections
+
+def record_unscheduled(sections, unscheduled_components):
+    """Add an UnscheduledComponent for every LEC/TUT/LAB session left without a slot"""
+    for section in sections:
+        for session in section['sessions']:
+            if session['placement'] is None and session['type'] != 'SS':
+                reason = "Could not find suitable room and time slot combination" if session['type'] == 'LAB' else ''
+                unscheduled_components.add(
+                    UnscheduledComponent(section['department'], section['semester'], session['code'],
+                                         session['name'], session['faculty'], session['type'], 1,
+                                         section['index'], reason)
+                )
+
+def schedule_greedy(context, sections, tentative=False):
+    """Commit each session to its best slot in priority order, never revisiting a choice"""
+    metrics = context['metrics']
+    for section in sections:
+        with metrics.timer(section['title'], metrics.sections):
+            for session in section['sessions']:
+                with metrics.timer(f"schedule_{session['type']}"):
+                    place_session(context, section, session, tentative)
+        report_progress(context.get('progress'), [section], 'scheduled')
+
+def report_progress(progress, sections, status):
+    """Tell an optional progress callback that sections reached a status"""
+    if progress:
+        for section in sections:
+            progress(section['title'], status)
+
+def schedule_csp(context, sections):
+    """Place sessions with the backtracking CSP solver, minimizing unscheduled components.
+
+    The greedy result is the incumbent: the search starts from its
+    unscheduled count as the bound and only replaces it with an assignment
+    that leaves fewer sessions out, so the engine never does worse than
+    greedy. Slots without a free room are dropped from the domains up front.
+    """
+    variables = [(section_idx, session_idx)
+                 for section_idx, section in enumerate(sections)
+                 for session_idx in range(len(section['sessions']))]
+    metrics = context['metrics']
+
+    def lookup(var):
+        section = sections[var[0]]
+        return section, section['sessions'][var[1]]
+
+    with metrics.timer('csp_incumbent'):
+        schedule_greedy(context, sections, tentative=True)
+    # Greedy placement order, so replaying it rebuilds the same room bookings
+    incumbent = []
+    for var in variables:
+        section, session = lookup(var)
+        if session['placement']:
+            incumbent.append((var, (session['placement']['day'], session['placement']['start_slot'])))
+    for var, _ in reversed(incumbent):
+        release_session(context, *lookup(var))
+    incumbent_missing = len(variables) - len(incumbent)
+
+    # Sessions constrain each other when they share a section or a faculty member
+    by_key = {}
+    for var in variables:
+        section, session = lookup(var)
+        by_key.setdefault(('section', var[0]), []).append(var)
+        by_key.setdefault(('faculty', session['faculty']), []).append(var)
+
+    def neighbors(var):
+        section, session = lookup(var)
+        return set(by_key[('section', var[0])]) | set(by_key[('faculty', session['faculty'])])
+
+    def domain(var):
+        section, session = lookup(var)
+        return [value for value in find_candidate_slots(context, section, session)
+                if has_free_room(context, section, session, *value)]
+
+    def still_feasible(var, value):
+        section, session = lookup(var)
+        return is_slot_feasible(context, section, session, *value) and has_free_room(context, section, session,
+                                                                                      *value)
+
+    def assign(var, value):
+        section, session = lookup(var)
+        # Search assignments may be undone; the kept ones are counted after solving
+        return assign_session(context, section, session, *value, tentative=True)
+
+    def unassign(var):
+        release_session(context, *lookup(var))
+
+    # Every constraint is per day, so a placement only rules out same-day values
+    solver = csp_solver.CSPSolver(variables, domain, assign, unassign, neighbors, still_feasible,
+                                  related=lambda value, other: value[0] == other[0],
+                                  max_nodes=CSP_MAX_NODES, max_values=CSP_MAX_VALUES, incumbent=incumbent_missing)
+    with metrics.timer('schedule_csp'):
+        placements = solver.solve()
+    metrics.count('csp_nodes', solver.nodes)
+    if solver.replay_failures:
+        # Left unplaced, so record_unscheduled reports them with the rest
+        metrics.count('csp_replay_failures', len(solver.replay_failures))
+        print(f"CSP solver could not restore {len(solver.replay_failures)} placements of its best result")
+    missing = solver.best_missing
+    if missing >= incumbent_missing:
+        # Nothing better than greedy was found: put the greedy result back
+        for var in placements:
+            release_session(context, *lookup(var))
+        placements = {}
+        for var, value in incumbent:
+            if assign_session(context, *lookup(var), *value, tentative=True):
+                placements[var] = value
+        missing = len(variables) - len(placements)
+        metrics.count('csp_kept_greedy')
+    metrics.count('placed', len(placements))
+    report_progress(context.get('progress'), sections, 'scheduled')
+    if solver.exhausted:
+        print(f"CSP solver proved the minimum of {missing} unscheduled sessions")
+    elif solver.completed:
+        print(f"CSP solver finished its bounded search (at most {CSP_MAX_VALUES} values per session) "
+              f"with {missing} unscheduled sessions")
+    else:
+        print(f"CSP solver stopped after {solver.nodes} nodes with {missing} unscheduled sessions")
+
+# Shared cell styles: built once and reused by every streamed cell
+THIN_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                     top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_FILL = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
+BREAK_FILL = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+UNSCHEDULED_HEADER_FILL = PatternFill(start_color="FFE0E0", end_color="FFE0E0", fill_type="solid")
+LEGEND_HEADER_FILL = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
+ACTIVITY_FILLS = {
+    'LEC': PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid"),
+    'LAB': PatternFill(start_color="98FB98", end_color="98FB98", fill_type="solid"),
+    'TUT': PatternFill(start_color="FFE4E1", end_color="FFE4E1", fill_type="solid"),
+    'SS': PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
+}
+BOLD_FONT = Font(bold=True)
+CENTER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+SLOT_ALIGNMENT = Alignment(wrap_text=True, vertical='center', horizontal='center')
+LEFT_WRAP_ALIGNMENT = Alignment(horizontal='left', vertical='center', wrap_text=True)
+SOLID_FILLS = {}  # Subject color -> PatternFill
+
+def solid_fill(color):
+    """Shared solid PatternFill for a color"""
+    if color not in SOLID_FILLS:
+        SOLID_FILLS[color] = PatternFill(start_color=color, end_color=color, fill_type="solid")
+    return SOLID_FILLS[color]
+
+def styled_cell(ws, value=None, fill=None, font=None, border=None, alignment=None):
+    """Write-only cell carrying the given shared styles"""
+    cell = WriteOnlyCell(ws, value=value)
+    if fill:
+        cell.fill = fill
+    if font:
+        cell.font = font
+    if border:
+        cell.border = border
+    if alignment:
+        cell.alignment = alignment
+    return cell
+
+def format_slot_cell(timetable, day_idx, slot_idx):
+    """Cell text for the session starting at a slot"""
+    slot = timetable[day_idx][slot_idx]
+    code, activity_type = slot['code'], slot['type']
+    if not is_basket_course(code):
+        return f"{code} {activity_type}\n{slot['classroom']}\n{slot['faculty']}"
+
+    basket_group = get_basket_group(code)
+    # Get all courses from same basket in this slot
+    basket_details = {}
+    for slot_data in timetable[day_idx].values():
+        slot_code = slot_data.get('code', '')
+        if (slot_data.get('type') == activity_type and
+            get_basket_group(slot_code) == basket_group and slot_code not in basket_details):
+            basket_details[slot_code] = {
+                'faculty': slot_data['faculty'],
+                'room': slot_data['classroom']
+            }
 
-                # Add Self-Study Only Courses section
-                current_row = len(DAYS) + 4  # Initialize current_row here, before any sections
+    # Group header, unique course codes, then course details with rooms
+    codes_str = ', '.join(sorted(basket_details))
+    course_details = [
+        f"{basket_code}: {details['faculty']} ({details['room']})"
+        for basket_code, details in sorted(basket_details.items())
+        if basket_code and details['faculty'] and details['room']
+    ]
+    return f"{basket_group} Courses\n{codes_str}\n" + "\n".join(course_details)
 
-                if self_study_courses:
-                    ws.cell(row=current_row, column=1, value="Self-Study Only Courses")
-                    ws.cell(row=current_row, column=1).font = Font(bold=True)
-                    current_row += 1
-                    
-                    headers = ['Course Code', 'Course Name', 'Faculty']
-                    for col, header in enumerate(headers, 1):
-                        ws.cell(row=current_row, column=col, value=header)
-                        ws.cell(row=current_row, column=col).font = Font(bold=True)
-                    current_row += 1
-                    
-                    for course in self_study_courses:
-                        if course['department'] == department and course['semester'] == semester:
-                            ws.cell(row=current_row, column=1, value=course['code'])
-                            ws.cell(row=current_row, column=2, value=course['name'])
-                            ws.cell(row=current_row, column=3, value=course['faculty'])
-                            current_row += 1
-                    
-                    current_row += 2  # Add extra spacing after self-study courses
-
-                # Handle unscheduled components section
-                dept_unscheduled = [c for c in unscheduled_components 
-                                    if c.department == department and 
-                                    c.semester == semester and
-                                    (c.section == section if num_sections > 1 else True)]
-
-                if dept_unscheduled:  # Changed from unscheduled_components to dept_unscheduled
-                    current_row += 2  # Add spacing after previous section
-                    unsch_title = ws.cell(row=current_row, column=1, value="Unscheduled Components")
-                    unsch_title.font = Font(bold=True, size=12, color="FF0000")
-                    current_row += 2
-
-                    headers = ['Course Code', 'Course Name', 'Faculty', 'Component', 'Sessions', 'Reason']
-                    for col, header in enumerate(headers, 1):
-                        cell = ws.cell(row=current_row, column=col, value=header)
-                        cell.font = Font(bold=True)
-                        cell.border = border
-                        cell.fill = PatternFill(start_color="FFE0E0", end_color="FFE0E0", fill_type="solid")
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
-                        # Set column widths for better readability
-                        ws.column_dimensions[get_column_letter(col)].width = 20
-                    current_row += 1
-
-                    for comp in dept_unscheduled:
-                        cells = [
-                            (comp.code, None),
-                            (comp.name, None),
-                            (comp.faculty, None),
-                            (comp.component_type, None),
-                            (comp.sessions, None),
-                            (comp.reason or "Could not find suitable slot", None)
-                        ]
-                        
-                        for col, (value, fill) in enumerate(cells, 1):
-                            cell = ws.cell(row=current_row, column=col, value=value)
-                            cell.border = border
-                            cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-                        current_row += 1
-                    
-                    current_row += 2  # Add spacing before legend
-
-                # Improved legend formatting
-                legend_title = ws.cell(row=current_row, column=1, value="Legend")
-                legend_title.font = Font(bold=True, size=12)
-                current_row += 2
-
-                # Wider columns for legend
-                ws.column_dimensions['A'].width = 20  # Subject Code
-                ws.column_dimensions['B'].width = 40  # Subject Name
-                ws.column_dimensions['C'].width = 30  # Faculty
-                ws.column_dimensions['D'].width = 15  # Color
-
-                # Add legend headers with better formatting
-                legend_headers = ['Subject Code', 'Subject Name', 'Faculty', 'Color']
-                for col, header in enumerate(legend_headers, 1):
-                    cell = ws.cell(row=current_row, column=col, value=header)
-                    cell.font = Font(bold=True)
-                    cell.border = border
-                    cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                current_row += 1
-
-                # Add subject entries with improved spacing
-                for code, color in subject_color_map.items():
-                    if code in course_faculty_map:
-                        # Add spacing between rows
-                        ws.row_dimensions[current_row].height = 25
-                        
-                        cells = [
-                            (code, None),
-                            (course_faculty_map[code]['name'], None),
-                            (course_faculty_map[code]['faculty'], None),
-                            ('', PatternFill(start_color=color, end_color=color, fill_type="solid"))
-                        ]
-                        
-                        for col, (value, fill) in enumerate(cells, 1):
-                            cell = ws.cell(row=current_row, column=col, value=value)
-                            cell.border = border
-                            if fill:
-                                cell.fill = fill
-                            cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-                        
-                        current_row += 1
-
-    # Save separate workbook for each department
-    for department, wb in workbooks.items():
-        filename = f"timetable_{department}.xlsx"
-        wb.save(filename)
+def write_section_sheet(ws, section, break_masks, self_study_courses, unscheduled_components):
+    """Stream one section's timetable, self-study list, unscheduled table and legend.
+    
+    `ws` is a write-only worksheet, so column widths, row heights and merged
+    ranges are all set up front and rows are appended strictly in order.
+    """
+    department = section['department']
+    semester = section['semester']
+    num_sections = section['num_sections']
+    timetable = section['state']['timetable']
+    subject_color_map = section['subject_color_map']
+    course_faculty_map = section['course_faculty_map']
+    section = section['index']
+
+    # Handle unscheduled components section
+    dept_unscheduled = [c for c in unscheduled_components 
+                        if c.department == department and 
+                        c.semester == semester and
+                        (c.section == section if num_sections > 1 else True)]
+    # Stable order so seeded runs produce identical workbooks
+    dept_unscheduled.sort(key=lambda c: (c.code, c.component_type, str(c.section)))
+
+    # Column widths: slot columns, unscheduled table, then the wider legend columns
+    widths = {get_column_letter(col_idx): 15 for col_idx in range(1, len(TIME_SLOTS)+2)}
+    if dept_unscheduled:
+        widths.update({get_column_letter(col): 20 for col in range(1, 7)})
+    widths.update({'A': 20, 'B': 40, 'C': 30, 'D': 15})
+    for col_letter, width in widths.items():
+        ws.column_dimensions[col_letter].width = width
+
+    rows = []
+
+    # Write timetable to worksheet
+    header = ['Day'] + time_slot_labels()
+    rows.append([styled_cell(ws, value, HEADER_FILL, BOLD_FONT, alignment=CENTER_ALIGNMENT)
+                 for value in header])
+
+    durations = {
+        'LEC': LECTURE_DURATION,
+        'LAB': LAB_DURATION,
+        'TUT': TUTORIAL_DURATION,
+        'SS': SELF_STUDY_DURATION
+    }
+    for day_idx, day in enumerate(DAYS):
+        row_num = day_idx + 2
+        ws.row_dimensions[row_num].height = 40
+        row = [day]
+        merged_until = -1  # Last slot covered by a merged session cell
+        for slot_idx in range(len(TIME_SLOTS)):
+            slot = timetable[day_idx][slot_idx]
+            if slot_idx <= merged_until:
+                # Covered by the merge: keep the border only
+                row.append(styled_cell(ws, border=THIN_BORDER))
+            elif break_masks[semester] & window_mask(slot_idx, 1):
+                row.append(styled_cell(ws, "BREAK", BREAK_FILL, border=THIN_BORDER, alignment=SLOT_ALIGNMENT))
+            elif slot['type'] and slot['code']:
+                # Only create content for start of activity
+                activity_type = slot['type']
+                if slot['code'] in subject_color_map:
+                    cell_fill = solid_fill(subject_color_map[slot['code']])
+                else:
+                    cell_fill = ACTIVITY_FILLS.get(activity_type, ACTIVITY_FILLS['LEC'])
+                row.append(styled_cell(ws, format_slot_cell(timetable, day_idx, slot_idx), cell_fill,
+                                       border=THIN_BORDER, alignment=SLOT_ALIGNMENT))
+                duration = durations.get(activity_type, 1)
+                if duration > 1:
+                    ws.merged_cells.add(f"{get_column_letter(slot_idx + 2)}{row_num}:"
+                                        f"{get_column_letter(slot_idx + duration + 1)}{row_num}")
+                    merged_until = slot_idx + duration - 1
+            else:
+                row.append(styled_cell(ws, '', border=THIN_BORDER, alignment=SLOT_ALIGNMENT))
+        rows.append(row)
+
+    rows.extend([[], []])  # Spacing before the course lists
+
+    # Add Self-Study Only Courses section
+    if self_study_courses:
+        rows.append([styled_cell(ws, "Self-Study Only Courses", font=BOLD_FONT)])
+        rows.append([styled_cell(ws, header, font=BOLD_FONT)
+                     for header in ['Course Code', 'Course Name', 'Faculty']])
+        for course in self_study_courses:
+            if course['department'] == department and course['semester'] == semester:
+                rows.append([course['code'], course['name'], course['faculty']])
+        rows.extend([[], []])  # Add extra spacing after self-study courses
+
+    if dept_unscheduled:
+        rows.extend([[], []])  # Add spacing after previous section
+        rows.append([styled_cell(ws, "Unscheduled Components", font=Font(bold=True, size=12, color="FF0000"))])
+        rows.append([])
+        rows.append([styled_cell(ws, header, UNSCHEDULED_HEADER_FILL, BOLD_FONT, THIN_BORDER, CENTER_ALIGNMENT)
+                     for header in ['Course Code', 'Course Name', 'Faculty', 'Component', 'Sessions', 'Reason']])
+        for comp in dept_unscheduled:
+            values = [comp.code, comp.name, comp.faculty, comp.component_type, comp.sessions,
+                      comp.reason or "Could not find suitable slot"]
+            rows.append([styled_cell(ws, value, border=THIN_BORDER, alignment=LEFT_WRAP_ALIGNMENT)
+                         for value in values])
+        rows.extend([[], []])  # Add spacing before legend
+
+    # Legend with one colored row per subject
+    rows.append([styled_cell(ws, "Legend", font=Font(bold=True, size=12))])
+    rows.append([])
+    rows.append([styled_cell(ws, header, LEGEND_HEADER_FILL, BOLD_FONT, THIN_BORDER, CENTER_ALIGNMENT)
+                 for header in ['Subject Code', 'Subject Name', 'Faculty', 'Color']])
+    for code, color in subject_color_map.items():
+        if code in course_faculty_map:
+            # Add spacing between rows
+            ws.row_dimensions[len(rows) + 1].height = 25
+            values = [code, course_faculty_map[code]['name'], course_faculty_map[code]['faculty'], '']
+            row = [styled_cell(ws, value, border=THIN_BORDER, alignment=LEFT_WRAP_ALIGNMENT)
+                   for value in values]
+            row[3].fill = solid_fill(color)
+            rows.append(row)
+
+    for row in rows:
+        ws.append(row)
+
+def optimize_room_assignment(sections, rooms, batch_info):
+    """Re-pick rooms for sessions sharing a (day, window) to minimize empty seats.
+
+    Room occupancy is rebuilt from the placements, then each window's
+    single-room LEC/TUT/SS/LAB sessions give their rooms back and are
+    matched to the free rooms they fit by min-cost assignment. Basket
+    sessions and lab pairs keep their rooms. Returns the number of sessions
+    that moved.
+    """
+    if not rooms:
+        return 0
+    room_index = RoomIndex({rid: dict(room, schedule=[0] * len(DAYS)) for rid, room in rooms.items()},
+                           len(DAYS))
+    windows = {}  # (day, start_slot, duration) -> [(section, session, required capacity)]
+    for section in sections:
+        for session in section['sessions']:
+            placement = session['placement']
+            if not placement:
+                continue
+            window = window_mask(placement['start_slot'], session['duration'])
+            for room_id in placement['classroom'].split('+'):
+                if room_id in room_index.rooms:
+                    room_index.occupy(room_id, placement['day'], window)
+            if placement['rooms'] == [placement['classroom']] and not is_basket_course(session['code']):
+                required = get_required_capacity(batch_info, section['department'], section['semester'],
+                                                 session['code'])
+                key = (placement['day'], placement['start_slot'], session['duration'])
+                windows.setdefault(key, []).append((section, session, required))
+
+    moved = 0
+    for (day, start_slot, duration), entries in sorted(windows.items(), key=lambda item: item[0]):
+        window = window_mask(start_slot, duration)
+        for _, session, _ in entries:
+            room_index.release(session['placement']['classroom'], day, window)
+
+        candidates = []
+        for room_type in ['LECTURE_ROOM', 'SEATER', 'COMPUTER_LAB', 'HARDWARE_LAB']:
+            candidates.extend(rid for rid in room_index.rooms_of_type(room_type)
+                              if room_index.is_free(rid, day, window))
+
+        # Cost is wasted seats (doubled) plus one for leaving the current room, so ties stay put
+        cost = []
+        for _, session, required in entries:
+            current = session['placement']['classroom']
+            row = []
+            for room_id in candidates:
+                room = room_index.rooms[room_id]
+                if session['type'] == 'LAB':
+                    # Labs split large batches, so any lab of the right type will do
+                    fits = room_index.room_types[room_id] == session['room_type']
+                else:
+                    fits = (room_index.room_types[room_id] in ['LECTURE_ROOM', 'SEATER'] and
+                            room['capacity'] >= required)
+                if room_id == current or fits:
+                    row.append(2 * max(0, room['capacity'] - required) + (room_id != current))
+                else:
+                    row.append(None)
+            cost.append(row)
+
+        assignment = room_matching.min_cost_assignment(cost)
+        for idx, (section, session, _) in enumerate(entries):
+            placement = session['placement']
+            room_id = candidates[assignment[idx]] if assignment else placement['classroom']
+            if room_id != placement['classroom']:
+                placement['classroom'] = room_id
+                placement['rooms'] = [room_id]
+                section['state']['timetable'][day][start_slot]['classroom'] = room_id
+                moved += 1
+            room_index.occupy(room_id, day, window)
+    return moved
+
+def faculty_day_cost(mask):
+    """Load cost of one faculty day: squared busy slots plus weighted idle slots between sessions"""
+    busy = count_slots(mask)
+    if not busy:
+        return 0
+    idle = mask.bit_length() - lowest_slot(mask) - busy
+    return busy * busy + IDLE_SLOT_WEIGHT * idle
+
+def faculty_load_cost(professor_schedule, faculty, changes=()):
+    """Week cost of a faculty member, with (day, add_mask, remove_mask) changes applied"""
+    masks = list(professor_schedule.week(faculty))
+    for day, add, remove in changes:
+        masks[day] = (masks[day] & ~remove) | add
+    return sum(faculty_day_cost(mask) for mask in masks)
+
+def faculty_cost_delta(professor_schedule, faculty, changes):
+    """Change in a faculty member's week cost from (day, add_mask, remove_mask) changes, touching only those days"""
+    masks = professor_schedule.week(faculty)
+    changed = {}
+    for day, add, remove in changes:
+        changed[day] = (changed.get(day, masks[day]) & ~remove) | add
+    return sum(faculty_day_cost(mask) - faculty_day_cost(masks[day]) for day, mask in changed.items())
+
+def is_movable(session):
+    """Sessions the load balancer may move: placed, non-basket teaching sessions"""
+    return (session['placement'] is not None and session['type'] in ['LEC', 'LAB', 'TUT'] and
+            not is_basket_course(session['code']))
+
+def restore_placement(context, section, session, placement):
+    """Put a released session back exactly where it was, rooms included"""
+    day, start_slot = placement['day'], placement['start_slot']
+    mark_session(section['state'], context['professor_schedule'], session['faculty'], day, start_slot,
+                 session['duration'], session['type'], session['code'], session['name'], placement['classroom'])
+    for rid in placement['rooms']:
+        context['room_index'].occupy(rid, day, window_mask(start_slot, session['duration']))
+    session['placement'] = placement
+
+def balance_rejection(context, section, session, day, start_slot):
+    """slot_rejection plus the checks it leaves to placement order, so moves never break a rule.
+
+    Greedy places labs first, so labs skip the daily component limit and
+    only lectures look for a break around themselves; a moved lab or
+    tutorial must respect both from the other side too.
+    """
+    if (session['type'] == 'LAB' and
+            not check_faculty_daily_components(section['state'], session['faculty'], day, session['code'])):
+        return 'daily_limit'
+    if session['type'] != 'LEC':
+        timetable = section['state']['timetable'][day]
+        end_slot = start_slot + session['duration']
+        for slot in (list(range(start_slot - BREAK_DURATION, start_slot)) +
+                     list(range(end_slot, end_slot + BREAK_DURATION))):
+            if slot in timetable and timetable[slot]['type'] == 'LEC':
+                return 'lecture_gap'
+    return slot_rejection(context, section, session, day, start_slot)
+
+def keeps_preference(context, session, placement, day, start_slot):
+    """A session in a faculty-preferred slot may only move to another preferred slot"""
+    preferences = context['faculty_preferences']
+    return (not is_preferred_slot(session['faculty'], placement['day'], TIME_SLOTS[placement['start_slot']],
+                                  preferences) or
+            is_preferred_slot(session['faculty'], day, TIME_SLOTS[start_slot], preferences))
+
+def keeps_course_gaps(context, taught, section, session, day):
+    """True when the LEC/TUT sessions a placement can affect still have their course gaps.
+
+    The gap rule reads the faculty's whole day and the section's course starts,
+    so a session landing on a day can break the gap of its faculty's lectures
+    in other sections and of same-course sessions taught by someone else.
+    """
+    affected = taught.get(session['faculty'], []) + \
+        [(section, other) for other in section['sessions'] if other['code'] == session['code']]
+    for owner, other in affected:
+        placement = other['placement']
+        if (placement and placement['day'] == day and other['type'] in ['LEC', 'TUT'] and
+                not check_faculty_course_gap(context['professor_schedule'], owner['state'], other['faculty'],
+                                             other['code'], day, placement['start_slot'])):
+            return False
+    return True
+
+def try_balance_move(context, section, session, taught):
+    """Move a session to the feasible slot that most lowers its faculty's load cost"""
+    professor_schedule = context['professor_schedule']
+    faculty, duration = session['faculty'], session['duration']
+    placement = session['placement']
+    before = faculty_load_cost(professor_schedule, faculty)
+    release_session(context, section, session)
+    # Cost deltas only need the faculty's day masks, so rank every slot before running any rule check
+    masks = professor_schedule.week(faculty)
+    day_costs = [faculty_day_cost(mask) for mask in masks]
+    base = sum(day_costs)
+    candidates = []
+    for day, mask in enumerate(masks):
+        for start_slot in range(len(TIME_SLOTS) - duration + 1):
+            window = window_mask(start_slot, duration)
+            if mask & window or (day, start_slot) == (placement['day'], placement['start_slot']):
+                continue
+            cost = base - day_costs[day] + faculty_day_cost(mask | window)
+            if cost < before:
+                candidates.append((cost, day, start_slot))
+    for _, day, start_slot in sorted(candidates):
+        if (balance_rejection(context, section, session, day, start_slot) or
+                not keeps_preference(context, session, placement, day, start_slot)):
+            continue
+        if assign_session(context, section, session, day, start_slot, tentative=True, prefix='balance_'):
+            if keeps_course_gaps(context, taught, section, session, day):
+                return True
+            release_session(context, section, session)
+    restore_placement(context, section, session, placement)
+    return False
+
+def try_balance_swap(context, section, session, taught):
+    """Swap a session with a same-length session of another faculty in its section if both loads improve"""
+    professor_schedule = context['professor_schedule']
+    for other in section['sessions']:
+        if (other is session or not is_movable(other) or other['faculty'] == session['faculty'] or
+                other['duration'] != session['duration'] or
+                other['placement']['day'] == session['placement']['day']):
+            continue
+        first, second = session['placement'], other['placement']
+        first_window = window_mask(first['start_slot'], session['duration'])
+        second_window = window_mask(second['start_slot'], other['duration'])
+        delta = (faculty_cost_delta(professor_schedule, session['faculty'],
+                                    [(first['day'], 0, first_window), (second['day'], second_window, 0)]) +
+                 faculty_cost_delta(professor_schedule, other['faculty'],
+                                    [(second['day'], 0, second_window), (first['day'], first_window, 0)]))
+        if delta >= 0 or not (keeps_preference(context, session, first, second['day'], second['start_slot']) and
+                                   keeps_preference(context, other, second, first['day'], first['start_slot'])):
+            continue
+        release_session(context, section, session)
+        release_session(context, section, other)
+        # Place one, then check the other against the updated state
+        if (not balance_rejection(context, section, session, second['day'], second['start_slot']) and
+                assign_session(context, section, session, second['day'], second['start_slot'],
+                               tentative=True, prefix='balance_')):
+            if (not balance_rejection(context, section, other, first['day'], first['start_slot']) and
+                    assign_session(context, section, other, first['day'], first['start_slot'],
+                                   tentative=True, prefix='balance_')):
+                if (keeps_course_gaps(context, taught, section, session, second['day']) and
+                        keeps_course_gaps(context, taught, section, other, first['day'])):
+                    return True
+                release_session(context, section, other)
+            release_session(context, section, session)
+        restore_placement(context, section, session, first)
+        restore_placement(context, section, other, second)
+    return False
+
+def balance_faculty_load(context, sections, max_trials=None, time_budget=None):
+    """Local search that spreads each faculty member's sessions over the week.
+
+    Faculty are visited most loaded first. Each of their movable sessions is
+    moved to a better slot or swapped with another faculty's session in the
+    same section, and a change is kept only if it passes every slot and room
+    check and lowers the faculty load cost (see faculty_day_cost). Stops
+    after BALANCE_MAX_PASSES passes, a pass without changes, or max_trials
+    sessions tried in total (by default BALANCE_TRIALS_PER_SESSION per
+    movable session), so the work grows with the schedule and a fixed seed
+    gives the same result. time_budget (seconds) is an optional safety cap
+    that gives that up.
+    Returns the number of moves and swaps made.
+    """
+    deadline = perf_counter() + time_budget if time_budget else None
+    metrics = context['metrics']
+    professor_schedule = context['professor_schedule']
+    movable = {}  # Faculty -> [(section, session)] the search may move
+    taught = {}   # Faculty -> every (section, session) they teach, for the gap re-check
+    for section in sections:
+        for session in section['sessions']:
+            taught.setdefault(session['faculty'], []).append((section, session))
+            if is_movable(session):
+                movable.setdefault(session['faculty'], []).append((section, session))
+
+    if max_trials is None:
+        max_trials = int(BALANCE_TRIALS_PER_SESSION * sum(len(items) for items in movable.values()))
+    changes = 0
+    trials = 0
+    for _ in range(BALANCE_MAX_PASSES):
+        changed = False
+        order = [item for faculty in sorted(movable, key=lambda name: (-faculty_load_cost(professor_schedule, name),
+                                                                       name))
+                 for item in movable[faculty]]
+        if trials + len(order) > max_trials:
+            metrics.count('balance_trial_limits')
+            order = order[:max_trials - trials]
+        trials += len(order)
+        for section, session in order:
+            if deadline is not None and perf_counter() > deadline:
+                print(f"Faculty balancing stopped after {time_budget}s; the result depends on machine speed")
+                metrics.count('balance_timeouts')
+                return changes
+            if try_balance_move(context, section, session, taught):
+                metrics.count('balance_moves')
+            elif try_balance_swap(context, section, session, taught):
+                metrics.count('balance_swaps')
+            else:
+                continue
+            changes += 1
+            changed = True
+        if not changed or trials >= max_trials:
+            break
+    return changes
+
+def score_schedule(context, sections, unscheduled_components):
+    """Quality figures for one run: unscheduled components, preference hits, room fill"""
+    rooms = context['rooms'] or {}
+    preference_hits = 0
+    room_fill = []
+    for section in sections:
+        for session in section['sessions']:
+            placement = session['placement']
+            if not placement:
+                continue
+            if is_preferred_slot(session['faculty'], placement['day'],
+                                 TIME_SLOTS[placement['start_slot']], context['faculty_preferences']):
+                preference_hits += 1
+            required = get_required_capacity(context['batch_info'], section['department'],
+                                             section['semester'], session['code'])
+            for room_id in placement['classroom'].split('+'):
+                if room_id in rooms and rooms[room_id]['capacity'] > 0:
+                    room_fill.append(min(1.0, required / rooms[room_id]['capacity']))
+    return {
+        'unscheduled': len(unscheduled_components),
+        'preference_hits': preference_hits,
+        'room_utilization': sum(room_fill) / len(room_fill) if room_fill else 0.0
+    }
+
+def score_key(score):
+    """Sort key for run scores: fewest unscheduled, then most preference hits, then best room fill"""
+    return (-score['unscheduled'], score['preference_hits'], score['room_utilization'])
+
+def create_schedule_context(df, seed=None, search_mode='enumerate', broker=None):
+    """Load shared inputs, lunch breaks and blocked-slot masks for the courses in df"""
+    global lunch_breaks
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{search_mode}', expected one of {SEARCH_MODES}")
+    metrics = RunMetrics()
+    initialize_time_slots()  # Initialize time slots before using
+    with metrics.timer('load_input'):
+        reserved_slots = load_reserved_slots()
+        rooms = load_rooms()
+        batch_info = load_batch_data()
+        faculty_preferences = load_faculty_preferences()
+
+    with metrics.timer('lunch_breaks'):
+        # Get all unique semester numbers
+        all_semesters = sorted(set(int(str(sem)[0]) for sem in df['Semester'].unique()))
+        # Calculate lunch breaks dynamically
+        lunch_breaks = calculate_lunch_breaks(all_semesters)
+        # Precompute break and reservation masks for every department/semester
+        blocked_slots = build_blocked_masks(reserved_slots, set(zip(df['Department'], df['Semester'])))
+        break_masks = build_break_masks(set(df['Semester']))
+
+    return {
+        'professor_schedule': Occupancy(len(DAYS)),  # Track professor assignments as slot bitmasks
+        # With a broker, rooms are allocated centrally and this copy only supplies capacities
+        'rooms': rooms,
+        'room_index': RoomIndex(rooms, len(DAYS)) if rooms else None,
+        'batch_info': batch_info,
+        'blocked_slots': blocked_slots,
+        'break_masks': break_masks,
+        'faculty_preferences': faculty_preferences,
+        'rng': random.Random(seed),
+        'search_mode': search_mode,
+        'broker': broker,
+        'metrics': metrics  # Phase timings and placement counters
+    }
+
+def schedule_timetables(seed=None, search_mode='enumerate', engine='greedy', departments=None, broker=None,
+                        progress=None, dataset=None, balance_trials=None, balance_seconds=None):
+    """Run one scheduling pass without writing Excel output.
+    
+    `dataset` is the CourseDataset to schedule (the shared combined.csv one
+    by default). `departments` limits the pass to some departments and
+    `broker` routes faculty/room bookings through a shared
+    ReservationBroker. `progress` is called as progress(section_title,
+    status) while sections are scheduled; it must be picklable to be used
+    with multiple runs. Faculty loads are then rebalanced, trying up to
+    `balance_trials` sessions (by default in proportion to the sessions
+    placed; 0 skips it); `balance_seconds` optionally caps that in
+    wall-clock time at the cost of reproducibility.
+    Returns the scheduled sections plus everything write_timetables needs.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    df = (dataset or get_course_dataset()).frame
+    context = create_schedule_context(df, seed, search_mode, broker)
+    context['progress'] = progress
+
+    # Add tracking for unscheduled components using a set
+    unscheduled_components = set()
+
+    # Add a list to track self-study only courses
+    self_study_courses = []
+
+    metrics = context['metrics']
+    courses = df if departments is None else df[df['Department'].isin(departments)]
+    with metrics.timer('build_sections'):
+        sections = build_sections(courses, context['batch_info'], context['blocked_slots'], self_study_courses)
+    report_progress(progress, sections, 'pending')
+
+    if engine == 'csp':
+        schedule_csp(context, sections)
+    else:
+        schedule_greedy(context, sections)
+    if broker is None:
+        # Department workers only see their own bookings; the merged result is re-packed instead
+        if balance_trials is None or balance_trials > 0:
+            with metrics.timer('faculty_balancing'):
+                balance_faculty_load(context, sections, balance_trials, balance_seconds)
+        with metrics.timer('room_matching'):
+            metrics.count('room_matching_moves',
+                          optimize_room_assignment(sections, context['rooms'], context['batch_info']))
+    record_unscheduled(sections, unscheduled_components)
+    metrics.count('unscheduled', len(unscheduled_components))
+
+    return {
+        'seed': seed,
+        'engine': engine,
+        'sections': sections,
+        'unscheduled_components': unscheduled_components,
+        'self_study_courses': self_study_courses,
+        'break_masks': context['break_masks'],
+        'score': score_schedule(context, sections, unscheduled_components),
+        'metrics': metrics
+    }
+
+def _schedule_department(department, seed, search_mode, engine, broker, progress, dataset):
+    """Process pool entry point: schedule one department against the shared broker"""
+    return schedule_timetables(seed, search_mode, engine, departments=[department], broker=broker,
+                               progress=progress, dataset=dataset)
+
+def schedule_departments_parallel(seed=None, search_mode='enumerate', engine='greedy', workers=None,
+                                  progress=None, dataset=None):
+    """Schedule every department in its own worker process.
+    
+    Faculty and room claims are serialized by a ReservationBroker; a claim
+    that loses a race is retried at the session's next candidate slot. The
+    interleaving of claims depends on timing, so runs are not bit-for-bit
+    reproducible even with a seed. The workers' phase timings are summed, so
+    they measure total CPU time rather than elapsed time.
+    """
+    # Imported here because the broker module builds on this one
+    from reservation_broker import BrokerManager
+
+    dataset = dataset or get_course_dataset()
+    departments = list(dataset.frame['Department'].unique())
+    base_seed = seed if seed is not None else random.SystemRandom().randrange(2**31)
+    with BrokerManager() as manager:
+        broker = manager.ReservationBroker()
+        with ProcessPoolExecutor(max_workers=workers or len(departments)) as executor:
+            futures = [executor.submit(_schedule_department, department, base_seed + idx,
+                                       search_mode, engine, broker, progress, dataset)
+                       for idx, department in enumerate(departments)]
+            results = [future.result() for future in futures]
+        stats = broker.stats()
+    print(f"Broker handled {stats['claims']} claims with {stats['conflicts']} conflicts "
+          f"across {len(departments)} departments")
+    sections = [section for result in results for section in result['sections']]
+    metrics = RunMetrics()
+    for result in results:
+        metrics.merge(result['metrics'])
+    with metrics.timer('room_matching'):
+        moved = optimize_room_assignment(sections, load_rooms(), load_batch_data())
+    metrics.count('room_matching_moves', moved)
+    print(f"Room matching moved {moved} sessions to better fitting rooms")
+
+    # Merge per-department results back in department order
+    scores = [result['score'] for result in results]
+    return {
+        'seed': base_seed,
+        'engine': engine,
+        'metrics': metrics,
+        'sections': sections,
+        'unscheduled_components': set().union(*(result['unscheduled_components'] for result in results)),
+        'self_study_courses': [course for result in results for course in result['self_study_courses']],
+        'break_masks': results[0]['break_masks'] if results else {},
+        'score': {
+            'unscheduled': sum(score['unscheduled'] for score in scores),
+            'preference_hits': sum(score['preference_hits'] for score in scores),
+            'room_utilization': sum(score['room_utilization'] for score in scores) / len(scores) if scores else 0.0
+        }
+    }
+
+def run_multi_start(runs, workers=None, seed=None, search_mode='enumerate', engine='greedy', progress=None,
+                    dataset=None, balance_trials=None, balance_seconds=None):
+    """Schedule `runs` independently seeded passes across a process pool and keep the best"""
+    base_seed = seed if seed is not None else random.SystemRandom().randrange(2**31)
+    seeds = [base_seed + i for i in range(runs)]
+    # Load once here so every run schedules the same catalog
+    dataset = CourseDataset.from_frame((dataset or get_course_dataset()).frame)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(schedule_timetables, seeds, repeat(search_mode), repeat(engine),
+                                    repeat(None), repeat(None), repeat(progress), repeat(dataset),
+                                    repeat(balance_trials), repeat(balance_seconds)))
+
+    for result in results:
+        score = result['score']
+        print(f"Seed {result['seed']}: {score['unscheduled']} unscheduled, "
+              f"{score['preference_hits']} preferred slots, "
+              f"{score['room_utilization']:.0%} room fill")
+    best = max(results, key=lambda result: score_key(result['score']))
+    print(f"Keeping seed {best['seed']} out of {runs} runs")
+    return best
+
+def write_timetables(result, output_dir='.', progress=None):
+    """Stream one workbook per department from a scheduling result into output_dir.
+    
+    Each department file is saved as soon as its last sheet is written, so
+    only one department's workbook is held in memory at a time.
+    """
+    if not TIME_SLOTS:
+        initialize_time_slots()
+    # Group sections by department, keeping first-seen order
+    department_sections = {}
+    for section in result['sections']:
+        department_sections.setdefault(section['department'], []).append(section)
+
+    metrics = result.get('metrics') or RunMetrics()
+    filenames = []
+    for department, sections in department_sections.items():
+        wb = Workbook(write_only=True)
+        with metrics.timer('render'):
+            for section in sections:
+                ws = wb.create_sheet(title=section['title'])
+                write_section_sheet(ws, section, result['break_masks'], result['self_study_courses'],
+                                    result['unscheduled_components'])
+        filename = os.path.join(output_dir, f"timetable_{department}.xlsx")
+        # Write-only workbooks serialize cells on save, so this includes part of the rendering
+        with metrics.timer('save'):
+            wb.save(filename)
         print(f"Timetable for {department} saved as {filename}")
+        filenames.append(filename)
+        report_progress(progress, sections, 'written')
+
+    # Machine-readable copy of the same schedule for analytics and faculty views
+    slot_labels = time_slot_labels()
+    schedule_path = os.path.join(output_dir, schedule_store.SCHEDULE_FILE)
+    with metrics.timer('save'):
+        schedule_store.save_schedule(schedule_store.schedule_rows(result['sections']), DAYS, slot_labels,
+                                     schedule_path)
+    print(f"Schedule data saved as {schedule_path}")
+
+    return filenames
+
+def generate_all_timetables(seed=None, search_mode='enumerate', engine='greedy', runs=1, workers=None,
+                            parallel_departments=False, output_dir='.', progress=None, dataset=None,
+                            balance_trials=None, balance_seconds=None):
+    """Generate department timetables; a fixed seed makes the run reproducible.
+    
+    `dataset` is the CourseDataset to schedule, by default the shared one
+    over tt data/combined.csv. With runs > 1, that many seeded runs are
+    spread over a process pool and only the best scoring one is written.
+    With parallel_departments, each department is scheduled in its own
+    process against a shared broker (faculty load balancing needs the whole
+    schedule in one process, so it only runs without parallel_departments;
+    see schedule_timetables for `balance_trials` and `balance_seconds`).
+    `progress(section_title, status)` hears
+    about each section going from 'pending' to 'scheduled' to 'written'.
+    Phase timings and placement counters are saved to timetable_metrics.json
+    in output_dir.
+    """
+    if parallel_departments and runs > 1:
+        raise ValueError("parallel_departments cannot be combined with multiple runs")
+    started = datetime.now()
+    load_metrics = RunMetrics()
+    with load_metrics.timer('load_input'):
+        dataset = CourseDataset.from_frame((dataset or get_course_dataset()).frame)
+    if parallel_departments:
+        result = schedule_departments_parallel(seed, search_mode, engine, workers, progress, dataset)
+    elif runs > 1:
+        result = run_multi_start(runs, workers, seed, search_mode, engine, progress, dataset, balance_trials,
+                                 balance_seconds)
+    else:
+        result = schedule_timetables(seed, search_mode, engine, progress=progress, dataset=dataset,
+                                     balance_trials=balance_trials, balance_seconds=balance_seconds)
+    result['metrics'].merge(load_metrics)
+    filenames = write_timetables(result, output_dir, progress)
+
+    save_metrics(result['metrics'], os.path.join(output_dir, METRICS_FILE), started=started.isoformat(),
+                 total_seconds=round((datetime.now() - started).total_seconds(), 4), seed=result['seed'],
+                 engine=engine, search_mode=search_mode, runs=runs, parallel_departments=parallel_departments,
+                 balance_trials=balance_trials, balance_seconds=balance_seconds, score=result['score'])
+    return filenames
+
+def load_fixed_commitments(context, schedule, skip):
+    """Occupy faculty and rooms for every saved session outside the (dept, sem, section) keys in skip"""
+    room_index = context['room_index']
+    for row in schedule_store.iter_sessions(schedule):
+        if (row['department'], row['semester'], row['section']) in skip:
+            continue
+        window = window_mask(row['start_slot'], row['duration'])
+        context['professor_schedule'].occupy(row['faculty'], row['day'], window)
+        # Lab pairs are stored as "ROOM1+ROOM2"
+        for room_id in row['room'].split('+'):
+            if room_index and room_id in room_index.rooms:
+                room_index.occupy(room_id, row['day'], window)
+
+def reschedule_section(department, semester, section=None, seed=None, search_mode='enumerate',
+                       engine='greedy', output_dir='.', dataset=None):
+    """Re-place one department/semester (or one of its sections) around the saved schedule.
+
+    Every other session in output_dir's schedule file stays where it is and
+    keeps its faculty and rooms booked. Only the affected sheets of
+    timetable_<department>.xlsx are rewritten, and the schedule file's rows
+    for them are replaced. Returns the workbook path.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    schedule_path = os.path.join(output_dir, schedule_store.SCHEDULE_FILE)
+    if not os.path.exists(schedule_path):
+        raise ValueError(f"No saved schedule at {schedule_path}; generate all timetables first")
+    schedule = schedule_store.load_schedule(schedule_path)
+
+    df = (dataset or get_course_dataset()).frame
+    context = create_schedule_context(df, seed, search_mode)
+    self_study_courses = []
+
+    # Build the whole department so faculty choices match a full run
+    sections = build_sections(df[df['Department'] == department], context['batch_info'],
+                              context['blocked_slots'], self_study_courses)
+    sections = [s for s in sections if int(s['semester']) == int(semester) and
+                (section is None or schedule_store.section_label(s) == section.upper())]
+    if not sections:
+        raise ValueError(f"No section {department}_{semester}{'_' + section if section else ''} in the course data")
+    targets = {(department, int(semester), schedule_store.section_label(s)) for s in sections}
+
+    load_fixed_commitments(context, schedule, targets)
+    if engine == 'csp':
+        schedule_csp(context, sections)
+    else:
+        schedule_greedy(context, sections)
+    unscheduled_components = set()
+    record_unscheduled(sections, unscheduled_components)
 
-    return [f"timetable_{dept}.xlsx" for dept in workbooks.keys()]
+    # Swap only the affected sheets, keeping their position in the workbook
+    filename = os.path.join(output_dir, f"timetable_{department}.xlsx")
+    if os.path.exists(filename):
+        wb = load_workbook(filename)
+    else:
+        wb = Workbook()
+        wb.remove(wb.active)
+    for target in sections:
+        index = len(wb.sheetnames)
+        if target['title'] in wb.sheetnames:
+            index = wb.sheetnames.index(target['title'])
+            wb.remove(wb[target['title']])
+        ws = wb.create_sheet(title=target['title'], index=index)
+        write_section_sheet(ws, target, context['break_masks'], self_study_courses, unscheduled_components)
+    wb.save(filename)
+    print(f"Rescheduled {', '.join(target['title'] for target in sections)} in {filename} "
+          f"({len(unscheduled_components)} unscheduled)")
+
+    rows = [tuple(row[name] for name in schedule_store.SCHEDULE_COLUMNS)
+            for row in schedule_store.iter_sessions(schedule)
+            if (row['department'], row['semester'], row['section']) not in targets]
+    rows.extend(schedule_store.schedule_rows(sections))
+    schedule_store.save_schedule(rows, schedule['days'].tolist(), schedule['time_slots'].tolist(),
+                                 schedule_path)
+    return filename
 
 if __name__ == "__main__":
-    generate_all_timetables()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate department timetables")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument('--search-mode', choices=SEARCH_MODES, default='enumerate',
+                        help="Slot search strategy for lectures, tutorials and self-study")
+    parser.add_argument('--engine', choices=ENGINES, default='greedy',
+                        help="Scheduling engine: greedy placement or backtracking CSP solver")
+    parser.add_argument('--runs', type=int, default=1,
+                        help="Independent seeded runs to compare; the best one is written")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for multi-run generation (default: all cores)")
+    parser.add_argument('--parallel-departments', action='store_true',
+                        help="Schedule departments concurrently with a shared faculty/room broker")
+    parser.add_argument('--balance-trials', type=int, default=None,
+                        help=f"Sessions tried when rebalancing faculty loads (default: {BALANCE_TRIALS_PER_SESSION} "
+                             "per movable session, 0 to skip)")
+    parser.add_argument('--balance-seconds', type=float, default=None,
+                        help="Optional wall-clock cap on rebalancing; runs may then differ between machines")
+    parser.add_argument('--reschedule', nargs=2, metavar=('DEPT', 'SEM'),
+                        help="Re-place only DEPT SEM around the previously saved schedule")
+    parser.add_argument('--section', default=None,
+                        help="With --reschedule, limit it to one section letter")
+    args = parser.parse_args()
+    try:
+        if args.reschedule:
+            department, semester = args.reschedule
+            if not semester.isdigit():
+                raise ValueError(f"Semester must be a number, got '{semester}'")
+            reschedule_section(department, int(semester), args.section, seed=args.seed,
+                               search_mode=args.search_mode, engine=args.engine)
+        else:
+            generate_all_timetables(seed=args.seed, search_mode=args.search_mode, engine=args.engine,
+                                    runs=args.runs, workers=args.workers,
+                                    parallel_departments=args.parallel_departments,
+                                    balance_trials=args.balance_trials, balance_seconds=args.balance_seconds)
+    except ValueError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
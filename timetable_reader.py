@@ -0,0 +1,204 @@
+"""Read department timetable workbooks back into session records.
+
+Each workbook file is read once and every timetable sheet
+(a "DEPT_SEM[_SECTION]" sheet headed "Day" followed by the slot labels) is parsed
+into SessionRecord tuples. A session's length is the width of its merged
+cell, falling back to the configured duration of its type; basket cells
+("B1 Courses" followed by one "CODE: faculty (room)" line per course) give
+one record per course. Results are cached per path while the file's mtime
+and size (or, when only the mtime moved, its content hash) are unchanged,
+so the analytics and faculty views share a single parse of each upload.
+"""
+import os
+import json
+import hashlib
+import posixpath
+from io import BytesIO
+from zipfile import ZipFile
+from xml.etree.ElementTree import iterparse, parse, ParseError
+from collections import OrderedDict, namedtuple
+from openpyxl import load_workbook
+from openpyxl.utils import range_boundaries
+import schedule_store
+
+CACHE_SIZE = 32  # Parsed workbooks kept in memory, least recently used dropped first
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+RELS_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+DOC_RELS_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+SessionRecord = namedtuple('SessionRecord', ['file', 'sheet', 'department', 'semester', 'section', 'day',
+                                             'start_slot', 'duration', 'type', 'code', 'faculty', 'room',
+                                             'basket_group'])
+
+_cache = OrderedDict()  # path -> {'mtime', 'size', 'md5', 'parsed'}
+
+def load_duration_constants(config_path='config.json'):
+    """The generator's duration_constants from config, with its defaults"""
+    constants = {'hour_slots': 2, 'lecture_duration': 3, 'lab_duration': 4, 'tutorial_duration': 2,
+                 'self_study_duration': 2}
+    try:
+        with open(config_path) as f:
+            constants.update(json.load(f).get('duration_constants', {}))
+    except (OSError, ValueError):
+        pass
+    return constants
+
+def load_durations(config_path='config.json'):
+    """Slots per session type"""
+    constants = load_duration_constants(config_path)
+    return {'LEC': constants['lecture_duration'], 'LAB': constants['lab_duration'],
+            'TUT': constants['tutorial_duration'], 'SS': constants['self_study_duration']}
+
+def file_hash(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def sheet_parts(archive):
+    """{sheet title: part name of its XML} from the workbook manifest of an xlsx archive"""
+    with archive.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {rel.get('Id'): rel.get('Target') for rel in parse(f).getroot().iter(f'{RELS_NS}Relationship')}
+    with archive.open('xl/workbook.xml') as f:
+        sheets = parse(f).getroot().iter(f'{MAIN_NS}sheet')
+        parts = {}
+        for sheet in sheets:
+            target = targets.get(sheet.get(f'{DOC_RELS_NS}id'), '')
+            # Targets are relative to xl/ unless absolute
+            parts[sheet.get('name')] = target.lstrip('/') if target.startswith('/') else \
+                posixpath.normpath(posixpath.join('xl', target))
+    return parts
+
+def merged_spans(archive, part):
+    """{(row, column): width} of the merged ranges in one sheet of an xlsx archive.
+
+    Read-only worksheets don't expose merged cells, so the mergeCell entries
+    are read straight from the sheet XML.
+    """
+    spans = {}
+    try:
+        with archive.open(part) as source:
+            for _, element in iterparse(source):
+                if element.tag == f'{MAIN_NS}mergeCell':
+                    min_col, min_row, max_col, _ = range_boundaries(element.get('ref'))
+                    spans[(min_row, min_col)] = max_col - min_col + 1
+                element.clear()
+    except (KeyError, ParseError) as e:
+        print(f"Could not read merged cells of {part}: {str(e)}")
+    return spans
+
+def parse_cell(value, span, durations):
+    """(type, code, faculty, room, basket_group, duration) for each session starting in a cell"""
+    if not value or 'BREAK' in str(value):
+        return []
+    lines = str(value).strip().split('\n')
+    if len(lines) < 3:
+        return []
+    if lines[0].endswith(' Courses'):
+        # Basket cells don't name the type: match the merged width against the durations
+        duration = span or durations['LEC']
+        activity_type = next((t for t in ['LEC', 'LAB', 'TUT'] if durations[t] == duration), 'LEC')
+        basket_group = lines[0][:-len(' Courses')]
+        sessions = []
+        for detail in lines[2:]:
+            code, _, rest = detail.partition(':')
+            faculty, _, room = rest.rpartition('(')
+            sessions.append((activity_type, code.strip(), faculty.strip(), room.rstrip(')').strip(),
+                             basket_group, duration))
+        return sessions
+    code, _, activity_type = lines[0].partition(' ')
+    activity_type = activity_type.strip()
+    duration = span or durations.get(activity_type, 1)
+    return [(activity_type, code.strip(), lines[2].strip(), lines[1].strip(), None, duration)]
+
+def parse_workbook(path, durations, source=None):
+    """Days, slot labels and session records of every timetable sheet in a workbook.
+
+    `source` is the workbook as a binary file object (path is opened when
+    it is None); cells and merged ranges are both read through it.
+    """
+    if source is None:
+        with open(path, 'rb') as f:
+            return parse_workbook(path, durations, BytesIO(f.read()))
+    parsed = {'days': [], 'time_slots': [], 'sessions': []}
+    wb = load_workbook(source, read_only=True)
+    try:
+        # Merged cells come from the raw sheet XML in the same archive
+        with ZipFile(source) as archive:
+            parts = sheet_parts(archive)
+            for sheet in wb.worksheets:
+                # A timetable sheet starts with a "Day | slot labels" header and one row per day
+                rows = sheet.iter_rows(values_only=True)
+                grid = [next(rows, None)]
+                if not grid[0] or grid[0][0] != 'Day':
+                    continue  # Legends, summaries
+                for row in rows:
+                    if not row or not row[0]:
+                        break
+                    grid.append(row)
+                if not parsed['time_slots']:
+                    parsed['time_slots'] = [str(value) for value in grid[0][1:] if value]
+                    parsed['days'] = [row[0] for row in grid[1:] if row[0]]
+                num_slots = len(parsed['time_slots'])
+                department, _, rest = sheet.title.partition('_')
+                semester, _, section = rest.partition('_')
+                semester = int(semester) if semester.isdigit() else 0
+                spans = merged_spans(archive, parts[sheet.title]) if sheet.title in parts else {}
+                for row_num, row in enumerate(grid[1:], 2):
+                    if row[0] not in parsed['days']:
+                        continue
+                    for slot, value in enumerate(row[1:num_slots + 1]):
+                        for activity_type, code, faculty, room, basket_group, duration in \
+                                parse_cell(value, spans.get((row_num, slot + 2)), durations):
+                            parsed['sessions'].append(SessionRecord(
+                                path, sheet.title, department, semester, section, row[0], slot,
+                                min(duration, num_slots - slot), activity_type, code, faculty, room,
+                                basket_group))
+    finally:
+        wb.close()
+    return parsed
+
+def read_workbook(path, config_path='config.json'):
+    """Parsed workbook (see parse_workbook), reused while the file is unchanged"""
+    stat = os.stat(path)
+    entry = _cache.get(path)
+    if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        _cache.move_to_end(path)
+        return entry['parsed']
+    # One read serves both the hash and, when the content did change, the parse
+    with open(path, 'rb') as f:
+        data = f.read()
+    md5 = hashlib.md5(data).hexdigest()
+    if entry and entry['md5'] == md5:
+        entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size  # Touched but unchanged
+        _cache.move_to_end(path)
+        return entry['parsed']
+    parsed = parse_workbook(path, load_durations(config_path), BytesIO(data))
+    _cache[path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'md5': md5, 'parsed': parsed}
+    _cache.move_to_end(path)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return parsed
+
+def read_timetables(paths, config_path='config.json'):
+    """Days, slot labels and the session records of several workbooks; unreadable files are skipped"""
+    result = {'days': [], 'time_slots': [], 'sessions': []}
+    for path in paths:
+        try:
+            parsed = read_workbook(path, config_path)
+        except Exception as e:
+            print(f"Error processing file {path}: {str(e)}")
+            continue
+        if not result['time_slots']:
+            result['days'], result['time_slots'] = parsed['days'], parsed['time_slots']
+        result['sessions'].extend(parsed['sessions'])
+    return result
+
+def schedule_columns(timetables):
+    """read_timetables() output in the column layout of schedule_store.load_schedule"""
+    days = timetables['days']
+    rows = [(record.department, record.semester, record.section, days.index(record.day), record.start_slot,
+             record.duration, record.type, record.code, record.faculty, record.room)
+            for record in timetables['sessions'] if record.day in days]
+    return schedule_store.schedule_columns(rows, days, timetables['time_slots'])